@@ -1,5 +1,10 @@
 {{ config(
-    materialized='table'
+    materialized='table',
+    indexes=[
+        {'columns': ['accident_date']},
+        {'columns': ['borough', 'accident_date']},
+        {'columns': ['vehicle_types'], 'type': 'gin'}
+    ]
 ) }}
 
 WITH accident_data AS (
@@ -11,12 +16,24 @@ WITH accident_data AS (
         a.latitude,
         a.borough,
         a.accident_severity,
+        a.source_year,
         COUNT(DISTINCT v.vehicle_type) AS vehicle_count,
         COUNT(*) AS casualty_count
     FROM {{ ref('accidents') }} a
     LEFT JOIN {{ ref('vehicles') }} v ON a.accident_id = v.accident_id
     LEFT JOIN {{ ref('casualties') }} c ON a.accident_id = c.accident_id
-    GROUP BY a.accident_id, a.location, a.longitude, a.latitude, a.date, a.borough, a.accident_severity
+    GROUP BY a.accident_id, a.location, a.longitude, a.latitude, a.date, a.borough, a.accident_severity, a.source_year
+),
+
+-- Vehicle types of each accident, one element per vehicle, so filtering by vehicle type
+-- (`vehicle_types @> ARRAY[...]`, GIN indexed) and the transport breakdown need no join
+accident_vehicles AS (
+    SELECT 
+        accident_id,
+        ARRAY_AGG(vehicle_type ORDER BY vehicle_type) AS vehicle_types
+    FROM {{ ref('vehicles') }}
+    WHERE vehicle_type IS NOT NULL
+    GROUP BY accident_id
 ),
 
 weather_data AS (
@@ -28,7 +45,7 @@ weather_data AS (
         precipitation,
         sunshine_duration,
         snow_depth
-    FROM public.london_weather
+    FROM {{ source('tfl_data', 'london_weather') }}
 ),
 
 accident_weather AS (
@@ -39,10 +56,13 @@ accident_weather AS (
         COALESCE(wd.wind_speed, 0) AS wind_speed,
         COALESCE(wd.precipitation, 0) AS precipitation,
         COALESCE(wd.sunshine_duration, 0) AS sunshine_duration,
-        COALESCE(wd.snow_depth, 0) AS snow_depth
+        COALESCE(wd.snow_depth, 0) AS snow_depth,
+        COALESCE(av.vehicle_types, CAST(ARRAY[] AS TEXT[])) AS vehicle_types
     FROM accident_data ad
     LEFT JOIN weather_data wd
     ON ad.accident_date = wd.weather_date
+    LEFT JOIN accident_vehicles av
+    ON ad.accident_id = av.accident_id
 )
 
 SELECT * FROM accident_weather
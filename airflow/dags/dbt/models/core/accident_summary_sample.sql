@@ -0,0 +1,50 @@
+{% set sample_rate = var('sample_rate', 0.02) %}
+{% set sample_min_rows = var('sample_min_rows', 30) %}
+
+{{ config(
+    materialized='table',
+    indexes=[
+        {'columns': ['accident_year', 'borough', 'accident_severity']}
+    ]
+) }}
+
+-- Stratified sample of `accident_summary` for the dashboard's approximate previews.
+-- Strata are year x borough x severity, the dashboard filter dimensions, so every
+-- filter selects whole strata. Each stratum keeps `sample_rate` of its accidents
+-- (at least `sample_min_rows`, or all of them), picked by a hash of accident_id.
+WITH ranked AS (
+    SELECT
+        *,
+        CAST(EXTRACT(YEAR FROM accident_date) AS INTEGER) AS accident_year,
+        COUNT(*) OVER strata AS stratum_rows,
+        ROW_NUMBER() OVER (strata ORDER BY MD5(CAST(accident_id AS VARCHAR))) AS stratum_rank
+    FROM {{ ref('accident_summary') }}
+    WHERE accident_date IS NOT NULL
+    WINDOW strata AS (PARTITION BY EXTRACT(YEAR FROM accident_date), borough, accident_severity)
+),
+
+sized AS (
+    SELECT
+        *,
+        LEAST(stratum_rows, GREATEST({{ sample_min_rows }}, CEIL(stratum_rows * {{ sample_rate }}))) AS stratum_sample_rows
+    FROM ranked
+)
+
+SELECT
+    accident_id,
+    accident_date,
+    accident_year,
+    location,
+    latitude,
+    longitude,
+    borough,
+    accident_severity,
+    precipitation,
+    snow_depth,
+    sunshine_duration,
+    vehicle_types,
+    stratum_rows,
+    CAST(stratum_sample_rows AS INTEGER) AS stratum_sample_rows,
+    CAST(stratum_rows AS DOUBLE PRECISION) / stratum_sample_rows AS sampling_weight
+FROM sized
+WHERE stratum_rank <= stratum_sample_rows
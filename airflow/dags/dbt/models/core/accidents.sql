@@ -19,7 +19,7 @@ weather_data AS (
         radiation,
         snow_depth,
         sunshine_duration
-    FROM public.london_weather
+    FROM {{ source('tfl_data', 'london_weather') }}
 ),
 
 cleaned_accidents AS (
@@ -32,6 +32,7 @@ cleaned_accidents AS (
         s.lat AS latitude,
         s.borough,
         s.severity AS accident_severity,
+        s.source_year,  -- API year the loader fetched the row for
 
         -- Join Weather Data
         COALESCE(wd.temperature, 0) AS temperature,
@@ -0,0 +1,32 @@
+{% set changed_years = var('changed_years', []) %}
+
+{{ config(
+    materialized='incremental',
+    incremental_strategy='delete+insert',
+    unique_key='source_year',
+    pre_hook="{% if is_incremental() and var('changed_years', []) %}DELETE FROM {{ this }} WHERE source_year IN ({{ var('changed_years') | join(', ') }}){% endif %}",
+    indexes=[
+        {'columns': ['accident_year', 'borough']},
+        {'columns': ['period_start']}
+    ]
+) }}
+
+-- Daily accident counts by borough and severity: the base of every temporal chart.
+-- Incremental runs rebuild only the loader partitions reported as changed (`changed_years`
+-- holds their `source_year`, the API year an accident was fetched for, which can differ
+-- from its date's year). The pre-hook deletes those partitions first, so one left
+-- without rows is emptied too; delete+insert alone only replaces keys it inserts.
+SELECT 
+    accident_date AS period_start,
+    CAST(EXTRACT(YEAR FROM accident_date) AS INTEGER) AS accident_year,
+    source_year,
+    CAST(EXTRACT(DOW FROM accident_date) AS INTEGER) AS day_of_week,  -- 0 = Sunday
+    borough,
+    accident_severity,
+    COUNT(accident_id) AS accident_count
+FROM {{ ref('accident_summary') }}
+WHERE accident_date IS NOT NULL
+{% if is_incremental() and changed_years %}
+  AND source_year IN ({{ changed_years | join(', ') }})
+{% endif %}
+GROUP BY period_start, accident_year, source_year, day_of_week, borough, accident_severity
@@ -0,0 +1,17 @@
+{{ config(
+    materialized='table',
+    indexes=[
+        {'columns': ['accident_year', 'borough']}
+    ]
+) }}
+
+-- Weekly rollup of `accidents_daily`, by borough and severity. A week spanning New Year
+-- is split: its days of the new year start on January 1st, matching `accident_year`.
+SELECT 
+    GREATEST(CAST(DATE_TRUNC('week', period_start) AS DATE), MAKE_DATE(accident_year, 1, 1)) AS period_start,
+    accident_year,
+    borough,
+    accident_severity,
+    SUM(accident_count) AS accident_count
+FROM {{ ref('accidents_daily') }}
+GROUP BY 1, accident_year, borough, accident_severity
@@ -0,0 +1,16 @@
+{{ config(
+    materialized='table',
+    indexes=[
+        {'columns': ['accident_year', 'borough']}
+    ]
+) }}
+
+-- Yearly rollup of `accidents_daily`, by borough and severity
+SELECT 
+    CAST(DATE_TRUNC('year', period_start) AS DATE) AS period_start,
+    accident_year,
+    borough,
+    accident_severity,
+    SUM(accident_count) AS accident_count
+FROM {{ ref('accidents_daily') }}
+GROUP BY 1, accident_year, borough, accident_severity
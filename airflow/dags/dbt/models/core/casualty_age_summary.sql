@@ -0,0 +1,47 @@
+{{ config(
+    materialized='table',
+    indexes=[
+        {'columns': ['accident_year', 'borough', 'accident_severity']}
+    ]
+) }}
+
+-- Casualties pre-aggregated by year x borough x severities x age band, so the
+-- dashboard age charts follow its filters with a small indexed lookup.
+WITH casualty_ages AS (
+    SELECT 
+        accident_id,
+        casualty_severity,
+        CASE WHEN age ~ '^[0-9]+$' THEN CAST(age AS INTEGER) END AS age
+    FROM {{ ref('casualties') }}
+),
+
+casualty_accidents AS (
+    SELECT 
+        CAST(EXTRACT(YEAR FROM a.accident_date) AS INTEGER) AS accident_year,
+        a.borough,
+        a.accident_severity,
+        c.casualty_severity,
+        CASE 
+            WHEN c.age BETWEEN 0 AND 10 THEN '0-10'
+            WHEN c.age BETWEEN 11 AND 20 THEN '11-20'
+            WHEN c.age BETWEEN 21 AND 30 THEN '21-30'
+            WHEN c.age BETWEEN 31 AND 40 THEN '31-40'
+            WHEN c.age BETWEEN 41 AND 50 THEN '41-50'
+            WHEN c.age BETWEEN 51 AND 60 THEN '51-60'
+            WHEN c.age BETWEEN 61 AND 70 THEN '61-70'
+            WHEN c.age > 70 THEN '70+'
+            ELSE 'Unknown'
+        END AS age_group
+    FROM casualty_ages c
+    JOIN {{ ref('accident_summary') }} a ON c.accident_id = a.accident_id
+)
+
+SELECT 
+    accident_year,
+    borough,
+    accident_severity,
+    casualty_severity,
+    age_group,
+    COUNT(*) AS casualty_count
+FROM casualty_accidents
+GROUP BY accident_year, borough, accident_severity, casualty_severity, age_group
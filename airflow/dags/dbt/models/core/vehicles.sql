@@ -1,3 +1,10 @@
+{{ config(
+    materialized='table',
+    indexes=[
+        {'columns': ['accident_id']}
+    ]
+) }}
+
 WITH vehicle_data AS (
     SELECT 
         unique_accident_id,  -- Ensures correct accident correlation
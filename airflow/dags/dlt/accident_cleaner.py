@@ -0,0 +1,132 @@
+import ast
+import json
+import logging
+import resource
+import time
+
+import pandas as pd
+
+# Declared schema of the raw TfL CSV: only these columns are parsed, with fixed dtypes,
+# so chunks skip type inference. Repetitive labels are categoricals and coordinates
+# float32, which keeps a 10k-row chunk to a few MB.
+ACCIDENT_CSV_DTYPES = {
+    "id": "string",
+    "lat": "float32",
+    "lon": "float32",
+    "location": "string",
+    "date": "string",
+    "severity": "category",
+    "borough": "category",
+    "casualties": "object",
+    "vehicles": "object",
+}
+
+ACCIDENT_RENAME = {
+    "id": "accident_id",
+    "date": "accident_date",
+}
+
+# Column order of the COPY into `stg_tfl_accidents`
+COPY_COLUMNS = [
+    "accident_id", "lat", "lon", "location", "accident_date",
+    "severity", "borough", "casualties", "vehicles", "source_year",
+]
+# NULL marker of the COPY: an empty field is not NULL for a JSONB or TIMESTAMP column
+COPY_NULL = "NULL"
+
+
+def sanitize_json_field(field):
+    """Sanitize and clean JSON-like fields, removing unnecessary keys."""
+    if pd.isna(field) or field.strip() == "":
+        return None
+    try:
+        parsed = ast.literal_eval(field)  # Convert to Python object
+        if isinstance(parsed, list):
+            cleaned_data = [{k: v for k, v in item.items() if k != "$type"} for item in parsed]
+            return json.dumps(cleaned_data)
+        return json.dumps(parsed)
+    except (ValueError, SyntaxError):
+        logging.warning(f"⚠️ Could not parse JSON field: {field}")
+        return None
+
+
+def clean_and_transform_data(df):
+    """Transform a raw chunk in place to match the PostgreSQL schema.
+
+    Rows with a missing or non-numeric id are dropped as whole rows, so every
+    remaining column stays aligned with its accident.
+    """
+    df.rename(columns=ACCIDENT_RENAME, inplace=True)
+
+    accident_ids = pd.to_numeric(df["accident_id"], errors="coerce")
+    invalid = accident_ids.isna()
+    if invalid.any():
+        logging.warning(f"⚠️ Dropping {int(invalid.sum())} rows with an invalid accident id.")
+        df.drop(index=df.index[invalid], inplace=True)
+        accident_ids = accident_ids[~invalid]
+    df["accident_id"] = accident_ids.astype("int64")
+    df["accident_date"] = pd.to_datetime(df["accident_date"], errors="coerce")
+
+    for json_col in ["casualties", "vehicles"]:
+        if json_col in df.columns:
+            df[json_col] = df[json_col].map(sanitize_json_field)
+
+    return df
+
+
+def write_copy_rows(chunk, buffer):
+    """Write a cleaned chunk to `buffer` as the tab-separated rows of the COPY.
+
+    Missing coordinates, unparsable dates (NaT) and dropped JSON are written as COPY_NULL.
+    """
+    chunk.to_csv(buffer, columns=COPY_COLUMNS, index=False, header=False, sep="\t", na_rep=COPY_NULL)
+
+
+def process_peak_rss_mb():
+    """Highest resident set size of this process since it started, in MB (Linux reports KB).
+
+    Never decreases, so it shows the worst chunk so far rather than the current one.
+    """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def current_rss_mb():
+    """Resident set size of this process right now, in MB, or the process peak without /proc."""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return process_peak_rss_mb()
+    return resident_pages * resource.getpagesize() / 2**20
+
+
+def iter_clean_chunks(file_path, batch_size=10000, skip_chunks=0):
+    """Yield cleaned chunks of a raw accident CSV with bounded memory.
+
+    Only one chunk is alive at a time. Each chunk is yielded with its stats:
+    {"rows", "seconds", "rows_per_second", "rss_mb", "process_peak_rss_mb"}, where `seconds` covers
+    parsing and cleaning, `rss_mb` is sampled with the chunk in memory and `process_peak_rss_mb`
+    is the highest RSS of the process so far.
+    The first `skip_chunks` chunks (of `batch_size` raw rows) are skipped without being parsed.
+    """
+    chunk_iterator = pd.read_csv(
+        file_path,
+        chunksize=batch_size,
+        skiprows=range(1, skip_chunks * batch_size + 1) if skip_chunks else None,
+        usecols=lambda column: column in ACCIDENT_CSV_DTYPES,
+        dtype=ACCIDENT_CSV_DTYPES,
+    )
+
+    started = time.perf_counter()
+    for chunk in chunk_iterator:
+        chunk = clean_and_transform_data(chunk)
+        elapsed = time.perf_counter() - started
+        yield chunk, {
+            "rows": len(chunk),
+            "seconds": elapsed,
+            "rows_per_second": len(chunk) / elapsed if elapsed else 0.0,
+            "rss_mb": current_rss_mb(),
+            "process_peak_rss_mb": process_peak_rss_mb(),
+        }
+        del chunk
+        started = time.perf_counter()
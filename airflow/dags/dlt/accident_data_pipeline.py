@@ -1,132 +1,257 @@
 import os
+import sys
+import argparse
+import functools
 import logging
-import requests
-import yaml
+import time
 import json
-import pandas as pd
 import gzip
-import shutil
-import psycopg2
-import psycopg2.extras
-import ast
-from google.cloud import storage
-from datetime import datetime
+import io
+from dataclasses import dataclass
 from io import StringIO
-from dotenv import load_dotenv
+from load_state import (
+    checkpoint_chunk,
+    ensure_state_table,
+    file_digest,
+    forget_loads,
+    get_checkpoint,
+    get_chunk_failure,
+    get_loaded_digest,
+    record_chunk_failure,
+    record_load,
+    start_load,
+)
+from raw_cache import RawPayloadCache
 
+# Heavy dependencies (pandas, psycopg2, requests, google-cloud-storage, yaml) are imported
+# where they are used, so importing this module - e.g. when Airflow parses the DAG or in
+# tests - has no side effects and needs no environment.
 
-# Load configuration
-try:
-    config_path = os.path.join(os.path.dirname(__file__), "config.yaml")
-    with open(config_path, "r") as f:
-        config = yaml.safe_load(f)
-        if config is None:
-            raise ValueError("Configuration file is empty")
-except FileNotFoundError:
-    print("❌ Configuration file 'config.yaml' not found.")
-    exit(1)
-except ValueError as e:
-    print(f"❌ {e}")
-    exit(1)
-
-# Extract config values
-TFL_API_URL = config["tfl_api_url"]
-START_YEAR = config["start_year"]
-END_YEAR = config["end_year"]
-GCS_BUCKET = config["gcs_bucket"],
-LOCAL_STORAGE = config["local_storage"]
-RAW_JSONL_STORAGE = os.path.join(LOCAL_STORAGE, "raw/jsonl")
-RAW_CSV_STORAGE = os.path.join(LOCAL_STORAGE, "raw/csv")
-
-# Ensure directories exist
-os.makedirs(RAW_JSONL_STORAGE, exist_ok=True)
-os.makedirs(RAW_CSV_STORAGE, exist_ok=True)
-
-# Load environment variables
-env_path = os.path.join(os.path.dirname(__file__), ".env")
-load_dotenv(dotenv_path=env_path)
-
-GCS_BUCKET = os.getenv('GCS_BUCKET')
-if not GCS_BUCKET:
-    raise ValueError("GCS_BUCKET environment variable is not set.")
-
-# Load database credentials
-#FIXME: CHECK IF THIS IS CAUSING THE POSTRES ISSUE
-DB_PARAMS = {
-    "dbname": os.getenv("DB_NAME"),
-    "user": os.getenv("DB_USER"),
-    "password": os.getenv("DB_PASSWORD"),
-    "host": os.getenv("DB_HOST"),
-    "port": os.getenv("DB_PORT")
-}
-
-# Logging configuration
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
-
-logging.basicConfig(
-    format='%(asctime)s [%(levelname)s] %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S',
-    level=logging.INFO
-)
+MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+@dataclass(frozen=True)
+class PipelineSettings:
+    """Pipeline configuration, from `config.yaml` and the environment (`.env`)."""
+    tfl_api_url: str
+    start_year: int
+    end_year: int
+    local_storage: str
+    gcs_bucket: str
+    db_params: dict
+
+    @property
+    def years(self):
+        return range(self.start_year, self.end_year + 1)
+
+    @property
+    def raw_jsonl_storage(self):
+        return os.path.join(self.local_storage, "raw/jsonl")
+
+    @property
+    def raw_csv_storage(self):
+        return os.path.join(self.local_storage, "raw/csv")
 
-logging.info("🚀 Starting data ingestion pipeline...")
+    @property
+    def raw_cache_storage(self):
+        return os.path.join(self.local_storage, "cache")
 
+    def require_gcs_bucket(self):
+        if not self.gcs_bucket:
+            raise ValueError("GCS_BUCKET environment variable is not set.")
+        return self.gcs_bucket
 
-def fetch_tfl_data(year):
-    """Fetch accident data for a specific year from the TFL API."""
-    url = f"{TFL_API_URL}/{year}"
-    response = requests.get(url)
-    
+
+@functools.lru_cache(maxsize=None)
+def get_settings():
+    """Load the configuration on first use and create the local storage folders."""
+    import yaml
+    from dotenv import load_dotenv
+
+    config_path = os.path.join(MODULE_DIR, "config.yaml")
+    if not os.path.exists(config_path):
+        raise FileNotFoundError("❌ Configuration file 'config.yaml' not found.")
+    with open(config_path, "r") as f:
+        config = yaml.safe_load(f)
+    if config is None:
+        raise ValueError("❌ Configuration file is empty")
+
+    # Load environment variables
+    load_dotenv(dotenv_path=os.path.join(MODULE_DIR, ".env"))
+
+    local_storage = config["local_storage"]
+    if not os.path.isabs(local_storage):
+        # Resolve next to this module so Airflow workers and manual runs share the same files
+        local_storage = os.path.join(MODULE_DIR, local_storage)
+
+    settings = PipelineSettings(
+        tfl_api_url=config["tfl_api_url"],
+        start_year=config["start_year"],
+        end_year=config["end_year"],
+        local_storage=local_storage,
+        gcs_bucket=(os.getenv("GCS_BUCKET") or "").strip(),
+        db_params={
+            "dbname": os.getenv("DB_NAME"),
+            "user": os.getenv("DB_USER"),
+            "password": os.getenv("DB_PASSWORD"),
+            "host": os.getenv("DB_HOST"),
+            "port": os.getenv("DB_PORT")
+        },
+    )
+
+    # Ensure directories exist
+    os.makedirs(settings.raw_jsonl_storage, exist_ok=True)
+    os.makedirs(settings.raw_csv_storage, exist_ok=True)
+    return settings
+
+
+@functools.lru_cache(maxsize=None)
+def get_raw_cache():
+    """Return the raw payload cache under the configured local storage."""
+    return RawPayloadCache(get_settings().raw_cache_storage)
+
+
+def get_uploader():
+    """Return the shared upload manager of the configured bucket."""
+    from gcs_uploader import get_upload_manager
+    return get_upload_manager(get_settings().require_gcs_bucket())
+
+
+def fetch_tfl_data(year, offline=False):
+    """Fetch accident data for a specific year from the TFL API, through the raw payload cache.
+
+    Refreshes are conditional, so an unchanged year costs a 304 instead of a download.
+    With `offline=True` only the cache is read and the network is never touched.
+    """
+    raw_cache = get_raw_cache()
+    entry = raw_cache.lookup(year)
+    if offline:
+        if not entry:
+            print(f"❌ No cached payload for {year}, cannot replay it offline.")
+            return []
+        print(f"♻️ Replaying {year} from cached payload {entry['digest'][:12]}.")
+        return raw_cache.load(entry["digest"])
+
+    import requests
+
+    url = f"{get_settings().tfl_api_url}/{year}"
+    response = requests.get(url, headers=raw_cache.conditional_headers(year))
+
+    if response.status_code >= 500:
+        # Server-side failures are transient: raise so the caller (or Airflow) can retry the year
+        response.raise_for_status()
+    if response.status_code == 304 and entry:
+        print(f"♻️ {year} is unchanged on the API, using cached payload {entry['digest'][:12]}.")
+        raw_cache.touch(year)
+        return raw_cache.load(entry["digest"])
     if response.status_code == 200:
+        raw_cache.store(
+            year,
+            response.content,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+        )
         return response.json()
     else:
         print(f"❌ Failed to fetch data for {year}. Status: {response.status_code}")
         return []
 
+def _open_gzip_text(file_path):
+    """Open a gzip file for text writing with a fixed header timestamp.
+
+    Identical data then produces byte-identical files, so file digests detect real changes.
+    """
+    return io.TextIOWrapper(gzip.GzipFile(file_path, mode="wb", mtime=0), encoding="utf-8")
+
 def save_jsonl(data, file_path):
     """Saves data in JSONL format without modification."""
-    with gzip.open(file_path, "wt", encoding="utf-8") as f:
+    with _open_gzip_text(file_path) as f:
         for record in data:
             f.write(json.dumps(record) + "\n")
     print(f"✅ Stored RAW JSONL: {file_path}")
 
 def save_csv(data, file_path):
     """Saves data in CSV format and compresses it."""
+    import pandas as pd
+
     df = pd.DataFrame(data)
     compressed_file_path = file_path + ".gz"
-    with gzip.open(compressed_file_path, "wt", encoding="utf-8") as f:
+    with _open_gzip_text(compressed_file_path) as f:
         df.to_csv(f, index=False)
     print(f"✅ Stored RAW CSV: {compressed_file_path}")
     return compressed_file_path
 
+def gcs_blob_name(data_type, year):
+    """Return the GCS object name of a raw file, organized per year."""
+    if data_type == "jsonl":
+        return f"raw/jsonl/tfl_accidents_{year}.jsonl.gz"
+    if data_type == "csv":
+        return f"raw/csv/tfl_accidents_{year}.csv.gz"
+    raise ValueError(f"Invalid data type specified for upload: {data_type}")
+
 def upload_to_gcs(data_type="jsonl", file_path=None, year=None):
     """Uploads JSONL and CSV data to Google Cloud Storage, organized per year."""
-    client = storage.Client()
-    bucket = client.bucket(GCS_BUCKET.strip())
-    if data_type == "jsonl":
-        folder = f"raw/jsonl/tfl_accidents_{year}.jsonl.gz"
-    elif data_type == "csv":
-        folder = f"raw/csv/tfl_accidents_{year}.csv.gz"
-    else:
+    try:
+        folder = gcs_blob_name(data_type, year)
+    except ValueError:
         print("❌ Invalid data type specified for upload.")
         return
 
-    blob = bucket.blob(folder)
-    blob.chunk_size = 10 * 1024 * 1024  # ✅ Set chunk size correctly
-    blob.upload_from_filename(file_path, timeout=300)
+    status = get_uploader().upload(file_path, folder)
+    print(f"✅ {data_type.upper()} file: {file_path} -> GCS ({folder}): {status}.")
 
-    print(f"✅ Uploaded {data_type.upper()} file: {file_path} to GCS ({folder}).")
+def year_uploads(year):
+    """(local path, GCS object name) pairs of the raw files of a year."""
+    jsonl_file_path, csv_file_path = year_file_paths(year)
+    return [
+        (jsonl_file_path, gcs_blob_name("jsonl", year)),
+        (csv_file_path, gcs_blob_name("csv", year)),
+    ]
 
 def connect_db():
     """Establish a connection to PostgreSQL."""
+    import psycopg2
+
     try:
-        conn = psycopg2.connect(**DB_PARAMS)
+        conn = psycopg2.connect(**get_settings().db_params)
         logging.info(f"✅ Connected to PostgreSQL")
         return conn
     except Exception as e:
         logging.error(f"❌ Database connection failed: {e}")
         return None
 
+def _create_table_sql(table_name, if_not_exists=False):
+    """Return the DDL for the accidents staging table."""
+    return f"""
+        CREATE TABLE {"IF NOT EXISTS " if if_not_exists else ""}{table_name} (
+            accident_id INTEGER PRIMARY KEY,
+            lat FLOAT,
+            lon FLOAT,
+            location TEXT,
+            accident_date TIMESTAMP,
+            severity TEXT,
+            borough TEXT,
+            casualties JSONB, -- Stored as structured JSON
+            vehicles JSONB, -- Stored as structured JSON
+            source_year SMALLINT -- API year the row was fetched for, used for per-year reloads
+        );
+    """
+
+def duplicates_table_name(table_name):
+    """Return the table collecting the rows rejected for an already loaded accident_id."""
+    return f"{table_name}_duplicates"
+
+def _create_duplicates_table_sql(table_name, if_not_exists=False):
+    """Return the DDL for the duplicates report table of the accidents staging table."""
+    return f"""
+        CREATE TABLE {"IF NOT EXISTS " if if_not_exists else ""}{duplicates_table_name(table_name)} (
+            LIKE {table_name},
+            kept_source_year SMALLINT, -- Year of the row that holds the accident_id
+            same_accident BOOLEAN, -- Same date and position as the kept row
+            detected_at TIMESTAMP DEFAULT NOW()
+        );
+    """
+
 def recreate_table(table_name="public.stg_tfl_accidents"):
     """Drop and recreate the PostgreSQL table to ensure the correct schema."""
     conn = connect_db()
@@ -134,23 +259,13 @@ def recreate_table(table_name="public.stg_tfl_accidents"):
         return
 
     try:
-        drop_table_sql = f"DROP TABLE IF EXISTS {table_name};"
-        create_table_sql = f"""
-            CREATE TABLE {table_name} (
-                accident_id INTEGER PRIMARY KEY,
-                lat FLOAT,
-                lon FLOAT,
-                location TEXT,
-                accident_date TIMESTAMP,
-                severity TEXT,
-                borough TEXT,
-                casualties JSONB, -- Stored as structured JSON
-                vehicles JSONB -- Stored as structured JSON
-            );
-        """
+        drop_table_sql = f"DROP TABLE IF EXISTS {duplicates_table_name(table_name)}, {table_name};"
         cur = conn.cursor()
         cur.execute(drop_table_sql)
-        cur.execute(create_table_sql)
+        cur.execute(_create_table_sql(table_name))
+        cur.execute(_create_duplicates_table_sql(table_name))
+        ensure_state_table(conn)
+        forget_loads(conn, table_name.split(".")[-1])  # Nothing is loaded, nothing to resume
         conn.commit()
         cur.close()
         logging.info(f"✅ Table `{table_name}` recreated successfully.")
@@ -159,148 +274,412 @@ def recreate_table(table_name="public.stg_tfl_accidents"):
     finally:
         conn.close()
 
-def sanitize_json_field(field):
-    """Sanitize and clean JSON-like fields, removing unnecessary keys."""
-    if pd.isna(field) or field.strip() == "":
-        return None
+def ensure_table(table_name="public.stg_tfl_accidents"):
+    """Create the PostgreSQL table if missing, keeping already loaded years in place.
+
+    Also creates the load-state table. Runs once before the per-year loads, whose
+    queries would otherwise queue behind these DDL locks.
+    """
+    conn = connect_db()
+    if not conn:
+        raise RuntimeError("Database connection failed.")
+
     try:
-        parsed = ast.literal_eval(field)  # Convert to Python object
-        if isinstance(parsed, list):
-            cleaned_data = [{k: v for k, v in item.items() if k != "$type"} for item in parsed]
-            return json.dumps(cleaned_data)
-        return json.dumps(parsed)
-    except (ValueError, SyntaxError):
-        logging.warning(f"⚠️ Could not parse JSON field: {field}")
-        return None   
+        cur = conn.cursor()
+        cur.execute(_create_table_sql(table_name, if_not_exists=True))
+        # Tables created before per-year loading lack the partition column
+        cur.execute(f"ALTER TABLE {table_name} ADD COLUMN IF NOT EXISTS source_year SMALLINT;")
+        cur.execute(
+            f"CREATE INDEX IF NOT EXISTS {table_name.split('.')[-1]}_source_year_idx "
+            f"ON {table_name} (source_year);"
+        )
+        cur.execute(_create_duplicates_table_sql(table_name, if_not_exists=True))
+        ensure_state_table(conn)
+        conn.commit()
+        cur.close()
+        logging.info(f"✅ Table `{table_name}` is ready.")
+    finally:
+        conn.close()
 
 def get_local_files():
     """List all GZipped CSV files in the RAW_CSV_STORAGE directory."""
-    local_files = [f for f in os.listdir(RAW_CSV_STORAGE) if f.endswith(".csv.gz")]
-    logging.info(f"📂 Found {len(local_files)} compressed CSV files in `{RAW_CSV_STORAGE}`.")
+    raw_csv_storage = get_settings().raw_csv_storage
+    local_files = [f for f in os.listdir(raw_csv_storage) if f.endswith(".csv.gz")]
+    logging.info(f"📂 Found {len(local_files)} compressed CSV files in `{raw_csv_storage}`.")
     return local_files
 
-def extract_gz_file(gz_file_path):
-    """Extract a GZipped CSV file."""
-    local_csv_path = gz_file_path.replace(".gz", "")
-
-    try:
-        with gzip.open(gz_file_path, "rb") as f_in, open(local_csv_path, "wb") as f_out:
-            shutil.copyfileobj(f_in, f_out)
-        os.remove(gz_file_path)  # Remove compressed file after extraction
-        logging.info(f"✅ Extracted `{local_csv_path}`.")
-        return local_csv_path
-    except Exception as e:
-        logging.error(f"❌ Failed to extract `{gz_file_path}`: {e}")
-        return None
-
-def clean_and_transform_data(df):
-    """Transform data to match PostgreSQL schema."""
-    if "$type" in df.columns:
-        df.drop(columns=["$type"], inplace=True)
-
-    rename_mapping = {
-        "id": "accident_id",
-        "date": "accident_date"
-    }
-    df.rename(columns=rename_mapping, inplace=True)
-
-    expected_columns = [
-        "accident_id", "lat", "lon", "location", "accident_date",
-        "severity", "borough", "casualties", "vehicles"
-    ]
-    df = df[[col for col in expected_columns if col in df.columns]]
-
-    df["accident_id"] = pd.to_numeric(df["accident_id"], errors="coerce").dropna().astype(int)
-    df["accident_date"] = pd.to_datetime(df["accident_date"], errors="coerce")
-
-    for json_col in ["casualties", "vehicles"]:
-        if json_col in df.columns:
-            df[json_col] = df[json_col].apply(sanitize_json_field)
-
-    return df
+def load_csv_in_batches(
+    file_path,
+    table_name="public.stg_tfl_accidents",
+    batch_size=10000,
+    source_year=None,
+    start_chunk=0,
+    rows_loaded=0,
+    checkpoint=None,
+    failure=None,
+):
+    """Load CSV file into PostgreSQL in batches.
+
+    Each batch is COPied into an unconstrained temporary table and merged with
+    `INSERT ... ON CONFLICT DO NOTHING` and an UPDATE, so an accident_id that is already
+    loaded (or repeated in the batch) never fails the COPY. Whatever order the parallel
+    year loads commit in, an accident_id keeps the row of the lowest source_year (the
+    first one of the file within a year); the other rows go to the duplicates table.
+
+    To resume an interrupted load, the first `start_chunk` batches (holding `rows_loaded`
+    rows) are skipped. `checkpoint(cursor, chunks_committed, total_rows)` runs in each
+    batch's transaction, so a batch and its checkpoint are committed together.
+    Raises on failure after rolling back the current batch, so callers can resume the file;
+    `failure(chunk_number, error)` is called first with the batch that failed.
+    Returns the number of rows inserted, including the skipped batches.
+    """
+    from accident_cleaner import COPY_COLUMNS, COPY_NULL, iter_clean_chunks, write_copy_rows
 
-def load_csv_in_batches(file_path, table_name="public.stg_tfl_accidents", batch_size=10000):
-    """Load CSV file into PostgreSQL in batches."""
     conn = connect_db()
     if not conn:
-        return
+        raise RuntimeError("Database connection failed.")
+
+    columns = ", ".join(COPY_COLUMNS)
+    batch_table = "tfl_accidents_batch"
+    copy_sql = f"""
+        COPY {batch_table} ({columns})
+        FROM STDIN WITH CSV DELIMITER E'\t' NULL '{COPY_NULL}' QUOTE '"';
+    """
+    duplicates_table = duplicates_table_name(table_name)
+    # The first row per accident_id of the batch is offered to the table
+    first_rows_sql = f"""
+        first_rows AS (
+            SELECT DISTINCT ON (accident_id) *
+            FROM {batch_table}
+            ORDER BY accident_id, batch_row
+        )
+    """
+    # Each statement sees the rows other year loads committed before it started:
+    # 1. New accident_ids are inserted; a concurrent insert of the same id waits for ours
+    insert_sql = f"""
+        WITH {first_rows_sql}, inserted AS (
+            INSERT INTO {table_name} ({columns})
+            SELECT {columns} FROM first_rows
+            ON CONFLICT (accident_id) DO NOTHING
+            RETURNING accident_id
+        )
+        UPDATE {batch_table} b SET kept = true
+        FROM first_rows f
+        JOIN inserted i ON i.accident_id = f.accident_id
+        WHERE b.batch_row = f.batch_row;
+    """
+    # 2. Existing rows of a later year are locked until the commit and reported as replaced
+    displace_sql = f"""
+        WITH {first_rows_sql}, displaced AS (
+            SELECT {", ".join(f"t.{column}" for column in COPY_COLUMNS)}, f.source_year AS kept_source_year,
+                f.accident_date IS NOT DISTINCT FROM t.accident_date
+                    AND f.lat IS NOT DISTINCT FROM t.lat
+                    AND f.lon IS NOT DISTINCT FROM t.lon AS same_accident
+            FROM {table_name} t
+            JOIN first_rows f ON f.accident_id = t.accident_id
+            WHERE f.source_year < t.source_year
+            FOR UPDATE OF t
+        )
+        INSERT INTO {duplicates_table} ({columns}, kept_source_year, same_accident)
+        SELECT {columns}, kept_source_year, same_accident FROM displaced;
+    """
+    # 3. ... and replaced by the batch rows
+    replace_sql = f"""
+        WITH {first_rows_sql}, replaced AS (
+            UPDATE {table_name} t
+            SET ({columns}) = ({", ".join(f"f.{column}" for column in COPY_COLUMNS)})
+            FROM first_rows f
+            WHERE t.accident_id = f.accident_id AND f.source_year < t.source_year
+            RETURNING t.accident_id
+        )
+        UPDATE {batch_table} b SET kept = true
+        FROM first_rows f
+        JOIN replaced r ON r.accident_id = f.accident_id
+        WHERE b.batch_row = f.batch_row;
+    """
+    # 4. The other batch rows are reported against the row the table kept
+    duplicates_sql = f"""
+        INSERT INTO {duplicates_table} ({columns}, kept_source_year, same_accident)
+        SELECT {", ".join(f"b.{column}" for column in COPY_COLUMNS)},
+            t.source_year,
+            t.accident_date IS NOT DISTINCT FROM b.accident_date
+                AND t.lat IS NOT DISTINCT FROM b.lat
+                AND t.lon IS NOT DISTINCT FROM b.lon
+        FROM {batch_table} b
+        LEFT JOIN {table_name} t ON t.accident_id = b.accident_id
+        WHERE NOT b.kept;
+    """
 
     try:
-        chunk_iterator = pd.read_csv(file_path, chunksize=batch_size)
-
-        total_rows = 0
-        for chunk in chunk_iterator:
-            logging.debug(f"Columns in DataFrame: {chunk.columns.tolist()}")
-            chunk = clean_and_transform_data(chunk)
+        total_rows = rows_loaded
+        total_duplicates = 0
+        current_chunk = start_chunk + 1
+        cur = conn.cursor()
+        # Session-local, unlogged by nature and emptied by every commit
+        cur.execute(f"""
+            CREATE TEMP TABLE {batch_table} (LIKE {table_name}, batch_row BIGSERIAL, kept BOOLEAN NOT NULL DEFAULT false)
+            ON COMMIT DELETE ROWS;
+        """)
+        csv_buffer = StringIO()  # Reused for every chunk
+        chunks = iter_clean_chunks(file_path, batch_size=batch_size, skip_chunks=start_chunk)
+        for chunk_number, (chunk, stats) in enumerate(chunks, start=start_chunk + 1):
+            copy_started = time.perf_counter()
+            chunk["source_year"] = source_year
 
-            csv_buffer = StringIO()
-            chunk.to_csv(csv_buffer, index=False, header=False, sep='\t')
+            csv_buffer.seek(0)
+            csv_buffer.truncate()
+            write_copy_rows(chunk, csv_buffer)
             csv_buffer.seek(0)
 
-            copy_sql = f"""
-                COPY {table_name} (accident_id, lat, lon, location, accident_date, severity, borough, casualties, vehicles)
-                FROM STDIN WITH CSV DELIMITER E'\t' NULL 'NULL' QUOTE '"';
-            """
-            cur = conn.cursor()
             cur.copy_expert(copy_sql, csv_buffer)
+            cur.execute(insert_sql)
+            cur.execute(displace_sql)
+            displaced = cur.rowcount
+            cur.execute(replace_sql)
+            cur.execute(duplicates_sql)
+            duplicates = cur.rowcount
+            total_rows += stats["rows"] - duplicates
+            total_duplicates += duplicates
+            if checkpoint:
+                checkpoint(cur, chunk_number, total_rows)
             conn.commit()
-
-            total_rows += len(chunk)
-            logging.info(f"✅ Uploaded {len(chunk)} rows, Total: {total_rows}")
+            current_chunk = chunk_number + 1
+
+            seconds = stats["seconds"] + time.perf_counter() - copy_started
+            logging.info(
+                f"✅ Chunk {chunk_number}: uploaded {stats['rows'] - duplicates} rows ({duplicates} duplicates), Total: {total_rows} "
+                f"({stats['rows'] / seconds if seconds else 0:,.0f} rows/s, RSS {stats['rss_mb']:,.1f} MB, "
+                f"process peak {stats['process_peak_rss_mb']:,.1f} MB)"
+            )
+            if displaced:
+                logging.warning(
+                    f"⚠️ Chunk {chunk_number}: {displaced} accident_ids loaded for a later year now keep "
+                    f"the {source_year} row; the replaced rows were moved to `{duplicates_table}`."
+                )
 
         cur.close()
-        logging.info(f"🎯 Finished loading `{file_path}`: {total_rows} rows uploaded.")
+        logging.info(
+            f"🎯 Finished loading `{file_path}`: {total_rows} rows uploaded, "
+            f"{total_duplicates} duplicate accident_id rows set aside."
+        )
+        return total_rows
     except Exception as e:
-        logging.error(f"❌ Error loading `{file_path}`: {e}")
+        logging.error(f"❌ Error loading `{file_path}` at chunk {current_chunk}: {e}")
         conn.rollback()
+        if failure:
+            try:
+                failure(current_chunk, e)
+            except Exception as record_error:  # Keep the load's own error
+                logging.warning(f"⚠️ Could not record the failed chunk: {record_error}")
+        raise
     finally:
         conn.close()
 
-def load_tfl_data():
-    """Pipeline to fetch and store raw accident data."""
-    for year in range(START_YEAR, END_YEAR + 1):
-        print(f"📡 Fetching data for {year}...")
-        data = fetch_tfl_data(year)
+def duplicate_summary(conn, year, table_name="public.stg_tfl_accidents"):
+    """Return the duplicate rows of a year grouped by the year holding the accident_id.
+
+    List of {"kept_source_year", "rows", "same_accident"} dicts, logged as a warning when not empty.
+    """
+    cur = conn.cursor()
+    cur.execute(f"""
+        SELECT kept_source_year, COUNT(*), COUNT(*) FILTER (WHERE same_accident)
+        FROM {duplicates_table_name(table_name)}
+        WHERE source_year = %s
+        GROUP BY kept_source_year
+        ORDER BY kept_source_year;
+    """, (year,))
+    summary = [
+        {"kept_source_year": kept_year, "rows": rows, "same_accident": same}
+        for kept_year, rows, same in cur.fetchall()
+    ]
+    cur.close()
+
+    for group in summary:
+        logging.warning(
+            f"⚠️ {group['rows']} rows of {year} reuse an accident_id already loaded from "
+            f"{group['kept_source_year']} ({group['same_accident']} look like the same accident)."
+        )
+    return summary
+
+def year_file_paths(year):
+    """Return the local (JSONL, compressed CSV) paths for a year."""
+    settings = get_settings()
+    jsonl_file_path = os.path.join(settings.raw_jsonl_storage, f"tfl_accidents_{year}.jsonl.gz")
+    csv_file_path = os.path.join(settings.raw_csv_storage, f"tfl_accidents_{year}.csv.gz")
+    return jsonl_file_path, csv_file_path
+
+def fetch_year(year, offline=False):
+    """Fetch one year and store the raw JSONL & CSV files locally.
+
+    With `offline=True` the data comes from the raw payload cache only. Returns the compressed CSV path, or None when there is no data for the year.
+    """
+    print(f"📡 Fetching data for {year}...")
+    data = fetch_tfl_data(year, offline=offline)
+
+    if not data:
+        print(f"⚠️ No data found for {year}. Skipping.")
+        return None
 
-        if not data:
-            print(f"⚠️ No data found for {year}. Skipping.")
-            continue
+    jsonl_file_path, csv_file_path = year_file_paths(year)
+    save_jsonl(data, jsonl_file_path)
+    return save_csv(data, csv_file_path[:-len(".gz")])
+
+def store_year(year):
+    """Upload the raw files of one year to Google Cloud Storage, skipping unchanged objects."""
+    results = get_uploader().upload_many(year_uploads(year))
+    print(f"☁️ GCS uploads for {year}: {results}")
+    return results
+
+def load_year(year, table_name="public.stg_tfl_accidents", batch_size=10000):
+    """Replace the rows of one year in PostgreSQL with the local compressed CSV.
+
+    Every committed batch is checkpointed in the load-state table, so after a failure
+    the next call resumes from the last committed batch of the same file; a batch that fails
+    is recorded there with its error, and reported again by the next runs. Otherwise the
+    rows previously loaded for the year, and its reported duplicates, are deleted first.
+    The load is skipped when the file is identical to the one last loaded for the year.
+    Returns a change report: {"table", "year", "changed", "rows", "duplicates"}.
+    """
+    _, csv_file_path = year_file_paths(year)
+    if not os.path.exists(csv_file_path):
+        raise FileNotFoundError(f"No local CSV for {year}: `{csv_file_path}`")
+
+    source_table = table_name.split(".")[-1]
+    digest = file_digest(csv_file_path)
+    report = {"table": source_table, "year": year, "changed": False, "rows": 0, "duplicates": 0}
 
-        # Store raw JSONL & CSV files
-        jsonl_file_path = os.path.join(RAW_JSONL_STORAGE, f"tfl_accidents_{year}.jsonl.gz")
-        csv_file_path = os.path.join(RAW_CSV_STORAGE, f"tfl_accidents_{year}.csv")
+    conn = connect_db()
+    if not conn:
+        raise RuntimeError("Database connection failed.")
+    try:
+        cur = conn.cursor()
+        if get_loaded_digest(conn, source_table, year) == digest:
+            cur.execute(f"SELECT EXISTS (SELECT 1 FROM {table_name} WHERE source_year = %s);", (year,))
+            if cur.fetchone()[0]:
+                logging.info(f"⏭️ Data for {year} is unchanged since the last load. Skipping.")
+                cur.close()
+                return report
+
+        resume = get_checkpoint(conn, source_table, year, digest, batch_size)
+        if resume:
+            start_chunk, rows_loaded = resume
+            logging.info(f"⏯️ Resuming {year} after chunk {start_chunk} ({rows_loaded} rows already committed).")
+            stuck = get_chunk_failure(conn, source_table, year)
+            if stuck:
+                failed_chunk, failures, last_error = stuck
+                logging.error(
+                    f"❌ {year} failed on chunk {failed_chunk} in the last {failures} run(s): {last_error}. "
+                    f"Retrying; fix `{csv_file_path}` or reload it with --rebuild if it fails again."
+                )
+        else:
+            start_chunk, rows_loaded = 0, 0
+            cur.execute(f"DELETE FROM {table_name} WHERE source_year = %s;", (year,))
+            logging.info(f"🧹 Removed {cur.rowcount} previously loaded rows for {year}.")
+            cur.execute(f"DELETE FROM {duplicates_table_name(table_name)} WHERE source_year = %s;", (year,))
+            start_load(conn, source_table, year, digest, batch_size)
+        cur.close()
+        # The deletes and the 'loading' state row commit together; a resume only read
+        conn.commit()
+
+        def record_failure(chunk, error):
+            record_chunk_failure(conn, source_table, year, chunk, error)
+            conn.commit()
+
+        logging.info(f"📄 Processing `{csv_file_path}`...")
+        rows = load_csv_in_batches(
+            csv_file_path,
+            table_name=table_name,
+            batch_size=batch_size,
+            source_year=year,
+            start_chunk=start_chunk,
+            rows_loaded=rows_loaded,
+            checkpoint=lambda chunk_cur, chunks, total: checkpoint_chunk(chunk_cur, source_table, year, chunks, total),
+            failure=record_failure,
+        )
+        record_load(conn, source_table, year, digest, rows)
+        conn.commit()
+        duplicates = sum(group["rows"] for group in duplicate_summary(conn, year, table_name))
+    finally:
+        conn.close()
 
-        save_jsonl(data, jsonl_file_path)
-        compressed_csv_file_path = save_csv(data, csv_file_path)
+    report.update(changed=True, rows=rows, duplicates=duplicates)
+    return report
 
-        # Upload files to GCS
+def load_tfl_data():
+    """Pipeline to fetch and store raw accident data."""
+    uploads = []
+    for year in get_settings().years:
+        if fetch_year(year):
+            uploads.extend(year_uploads(year))
 
-        upload_to_gcs(data_type="jsonl", file_path=jsonl_file_path, year=year)
-        upload_to_gcs(data_type="csv", file_path=compressed_csv_file_path, year=year)
+    # Upload every fetched year through one concurrent pool
+    results = get_uploader().upload_many(uploads)
+    skipped = sum(1 for status in results.values() if status == "skipped")
+    print(f"☁️ Uploaded {len(results) - skipped} files to GCS, {skipped} unchanged.")
 
     print("🎯 Data ingestion completed successfully!")
 
-def process_pipeline():
-    """End-to-end pipeline: recreate table, process local CSV files, and load them into PostgreSQL."""
-    recreate_table()
+def process_pipeline(replay=False, rebuild=False):
+    """End-to-end pipeline: ensure the table, process local CSV files, and load them into PostgreSQL.
+
+    Years already loaded from the same file are skipped and interrupted years resume from
+    their last committed chunk, so a failed run is simply run again. A failed year does
+    not stop the others, but RuntimeError is raised once they are done. The local files
+    are kept. With `replay=True` they are first rebuilt from the raw payload cache, so the
+    whole load and transform runs without network access. `rebuild=True` drops the table
+    and its load records first, reloading every year.
+    """
+    if replay:
+        for year in get_settings().years:
+            fetch_year(year, offline=True)
+
+    if rebuild:
+        recreate_table()
+    ensure_table()
 
     local_files = get_local_files()
     if not local_files:
         logging.warning("⚠️ No GZipped CSV files found in RAW_CSV_STORAGE.")
         return
 
+    failed_years = []
     for local_file in local_files:
-        local_gz_path = os.path.join(RAW_CSV_STORAGE, local_file)
-        local_csv_path = extract_gz_file(local_gz_path)
-        if not local_csv_path:
-            continue
+        year = int(local_file[len("tfl_accidents_"):-len(".csv.gz")])
+        try:
+            load_year(year)
+        except Exception as e:
+            # Keep going with the remaining years, then fail the run
+            logging.error(f"❌ Loading {year} failed: {e}")
+            failed_years.append(year)
 
-        logging.info(f"📄 Processing `{local_csv_path}`...")
-        load_csv_in_batches(local_csv_path)
-        os.remove(local_csv_path) # Remove CSV file after loading
+    if failed_years:
+        raise RuntimeError(f"Loading failed for {len(failed_years)} years: {sorted(failed_years)}")
 
 if __name__ == "__main__":
+    logging.basicConfig(
+        format='%(asctime)s [%(levelname)s] %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S',
+        level=logging.INFO
+    )
+
+    parser = argparse.ArgumentParser(description="TfL accident ingestion pipeline")
+    parser.add_argument(
+        "--replay",
+        action="store_true",
+        help="Rebuild and load everything from the local raw payload cache, without network access.",
+    )
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Drop the staging table and reload every year instead of resuming.",
+    )
+    args = parser.parse_args()
+
     logging.info("🚀 Starting data ingestion pipeline...")
-    load_tfl_data()
-    process_pipeline()
+    if not args.replay:
+        load_tfl_data()
+    try:
+        process_pipeline(replay=args.replay, rebuild=args.rebuild)
+    except RuntimeError as e:
+        sys.exit(f"❌ {e}")
     logging.info("🎯 Pipeline finished.")
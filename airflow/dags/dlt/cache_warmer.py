@@ -0,0 +1,110 @@
+import logging
+import os
+
+# Aggregate API of the dashboard (dashboard/api_server.py), e.g. http://dashboard_api:8000
+API_URL = os.getenv("DASHBOARD_API_URL", "").rstrip("/")
+# Queries the API runs at the same time while warming
+WARM_CONCURRENCY = int(os.getenv("CACHE_WARM_CONCURRENCY", "4"))
+# Filter selections warmed after each refresh
+WARM_MAX_SELECTIONS = int(os.getenv("CACHE_WARM_MAX_SELECTIONS", "50"))
+# Selections sent per warm request, keeping each request short
+WARM_BATCH_SIZE = 10
+
+DEFAULT_VIEW = {"year": None, "borough": None, "severity": None, "vehicle_type": None}
+
+
+def _selection_key(selection):
+    return tuple(selection.get(key) for key in DEFAULT_VIEW)
+
+
+def popular_selections(session, limit):
+    """Return the filter selections viewed most on the dashboard since the API started."""
+    response = session.get(f"{API_URL}/usage", params={"limit": limit}, timeout=30)
+    response.raise_for_status()
+    return [{key: row[key] for key in DEFAULT_VIEW} for row in response.json()]
+
+
+def catalog_selections(session):
+    """Return every year, every borough, then every year x borough of the dashboard filters."""
+    response = session.get(f"{API_URL}/aggregates/filter_options", params={"format": "json"}, timeout=300)
+    response.raise_for_status()
+    options = response.json()
+    rows = [dict(zip(options["columns"], row)) for row in options["data"]]
+    years = sorted({int(row["year"]) for row in rows if row["year"] is not None}, reverse=True)
+    boroughs = sorted({row["borough"] for row in rows if row["borough"]})
+
+    selections = [dict(DEFAULT_VIEW, year=year) for year in years]
+    selections += [dict(DEFAULT_VIEW, borough=borough) for borough in boroughs]
+    selections += [dict(DEFAULT_VIEW, year=year, borough=borough) for year in years for borough in boroughs]
+    return selections
+
+
+def warm_selections(session, max_selections=WARM_MAX_SELECTIONS):
+    """Selections to warm: the default view, then logged usage, then the catalog."""
+    selections, seen = [], set()
+    candidates = [[DEFAULT_VIEW]]
+    try:
+        candidates.append(popular_selections(session, max_selections))
+    except Exception as e:
+        logging.warning(f"⚠️ Dashboard usage unavailable, warming from the catalog only: {e}")
+    candidates.append(catalog_selections(session))
+
+    for selection in (selection for group in candidates for selection in group):
+        key = _selection_key(selection)
+        if key not in seen:
+            seen.add(key)
+            selections.append(selection)
+        if len(selections) >= max_selections:
+            break
+    return selections
+
+
+def warm_dashboard_cache():
+    """Invalidate the dashboard API cache and precompute the pages of the common selections.
+
+    Best effort: API errors are logged, never raised, so a missing dashboard does not fail
+    the pipeline. Returns a report {"selections", "aggregates", "warmed", "seconds"}.
+    """
+    import requests
+
+    report = {"selections": 0, "aggregates": 0, "warmed": 0, "seconds": 0.0}
+    if not API_URL:
+        logging.info("ℹ️ DASHBOARD_API_URL is not set. Skipping cache warm-up.")
+        return report
+
+    session = requests.Session()
+    try:
+        session.post(f"{API_URL}/cache/invalidate", timeout=30).raise_for_status()
+        logging.info("🧹 Dashboard API cache invalidated.")
+
+        selections = warm_selections(session)
+        for start in range(0, len(selections), WARM_BATCH_SIZE):
+            batch = selections[start:start + WARM_BATCH_SIZE]
+            response = session.post(
+                f"{API_URL}/cache/warm",
+                json={"selections": batch, "concurrency": WARM_CONCURRENCY},
+                timeout=1800,
+            )
+            response.raise_for_status()
+            result = response.json()
+            for key in report:
+                report[key] += result[key]
+            logging.info(
+                f"🔥 Warmed {result['warmed']}/{result['aggregates']} aggregates for "
+                f"{len(batch)} selections in {result['seconds']:.1f}s."
+            )
+    except requests.RequestException as e:
+        logging.warning(f"⚠️ Dashboard cache warm-up stopped: {e}")
+    finally:
+        session.close()
+
+    logging.info(
+        f"✅ Cache warm-up: {report['warmed']} aggregates for {report['selections']} selections "
+        f"in {report['seconds']:.1f}s."
+    )
+    return report
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    warm_dashboard_cache()
@@ -0,0 +1,103 @@
+import hashlib
+import json
+import logging
+import os
+import shlex
+
+# dbt project location inside the Airflow containers
+DBT_PROJECT_DIR = os.getenv("DBT_PROFILES_DIR", "/usr/app/dbt")
+# Artifacts of the last successful run, used for `state:modified` selection
+DBT_STATE_DIR = "state"
+DBT_THREADS = int(os.getenv("DBT_THREADS", "4"))
+
+# Loader tables -> dbt selector covering the source and every model built from it
+SOURCE_SELECTORS = {
+    "stg_tfl_accidents": "source:tfl_data.stg_tfl_accidents+",
+    "london_weather": "source:tfl_data.london_weather+",
+}
+
+
+def project_fingerprint(project_dir=DBT_PROJECT_DIR):
+    """Hash the dbt project files, so model changes can be detected between runs."""
+    digest = hashlib.sha256()
+    paths = [os.path.join(project_dir, "dbt_project.yml")]
+    for folder in ("models", "macros"):
+        for root, _, files in os.walk(os.path.join(project_dir, folder)):
+            paths.extend(os.path.join(root, name) for name in files if name.endswith((".sql", ".yml")))
+
+    for path in sorted(paths):
+        if not os.path.exists(path):
+            continue
+        digest.update(os.path.relpath(path, project_dir).encode())
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def _read_state_fingerprint(project_dir):
+    path = os.path.join(project_dir, DBT_STATE_DIR, "project_fingerprint")
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return f.read().strip()
+
+
+def pending_load_reports(pending):
+    """Turn the loads dbt has not applied yet (load_state.get_dbt_pending) into change reports.
+
+    A dbt run that failed, or a new DAG run after it, rebuilds them even though the
+    loaders now report the same content as unchanged.
+    """
+    reports = []
+    for source_table, partition_key, _ in pending:
+        report = {"table": source_table, "changed": True}
+        if partition_key.isdigit():
+            report["year"] = int(partition_key)
+        reports.append(report)
+    return reports
+
+
+def plan_dbt_run(load_reports, project_dir=DBT_PROJECT_DIR):
+    """Build the `dbt run` command for the sources the loaders changed.
+
+    `load_reports` are the dicts returned by the loaders ({"table", "changed", "year"?}).
+    Returns the shell command, or None when neither the data nor the project changed.
+    """
+    changed = [report for report in load_reports if report and report.get("changed")]
+    changed_tables = sorted({report["table"] for report in changed})
+    changed_years = sorted({report["year"] for report in changed if report.get("year") is not None})
+
+    fingerprint = project_fingerprint(project_dir)
+    has_manifest = os.path.exists(os.path.join(project_dir, DBT_STATE_DIR, "manifest.json"))
+    project_changed = fingerprint != _read_state_fingerprint(project_dir)
+
+    selectors = [SOURCE_SELECTORS[table] for table in changed_tables if table in SOURCE_SELECTORS]
+    if project_changed and has_manifest:
+        selectors.append("state:modified+")
+
+    if not selectors and not (project_changed and not has_manifest):
+        logging.info("⏭️ No source or model changes since the last dbt run.")
+        return None
+
+    command = ["dbt", "run", "--profiles-dir", ".", "--threads", str(DBT_THREADS)]
+    if project_changed and not has_manifest:
+        # First run (or lost artifacts): nothing to compare against, build everything
+        logging.info("🧱 No previous dbt state found, running all models.")
+    else:
+        command += ["--select", *selectors]
+        if "state:modified+" in selectors:
+            command += ["--state", DBT_STATE_DIR]
+    if project_changed:
+        # Incremental models keep rows built by their previous definition (e.g. another key)
+        command.append("--full-refresh")
+    command += ["--vars", json.dumps({"changed_years": changed_years})]
+
+    logging.info(f"🧮 Changed tables: {changed_tables or 'none'}, years: {changed_years or 'none'}")
+    return " && ".join([
+        f"cd {shlex.quote(project_dir)}",
+        " ".join(shlex.quote(part) for part in command),
+        # Keep this run's artifacts as the baseline for the next state comparison
+        f"mkdir -p {DBT_STATE_DIR}",
+        f"cp target/manifest.json {DBT_STATE_DIR}/manifest.json",
+        f"echo {fingerprint} > {DBT_STATE_DIR}/project_fingerprint",
+    ])
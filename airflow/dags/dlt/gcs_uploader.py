@@ -0,0 +1,232 @@
+import base64
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+# Resumable chunks must be multiples of 256 KiB
+CHUNK_UNIT = 256 * 1024
+DEFAULT_CHUNK_SIZE = int(os.getenv("GCS_UPLOAD_CHUNK_MB", "16")) * 1024 * 1024
+# Files above this size go through a persisted resumable session
+RESUMABLE_THRESHOLD = 8 * 1024 * 1024
+DEFAULT_MAX_WORKERS = int(os.getenv("GCS_UPLOAD_WORKERS", "4"))
+
+
+def local_checksums(file_path, block_size=1024 * 1024):
+    """Return the base64 MD5 and CRC32C of a file, in the format GCS reports them.
+
+    CRC32C is None when `google-crc32c` (installed with google-cloud-storage) is unavailable.
+    """
+    try:
+        import google_crc32c
+        crc = google_crc32c.Checksum()
+    except ImportError:
+        crc = None
+
+    md5 = hashlib.md5()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            md5.update(block)
+            if crc is not None:
+                crc.update(block)
+
+    md5_b64 = base64.b64encode(md5.digest()).decode()
+    crc_b64 = base64.b64encode(crc.digest()).decode() if crc is not None else None
+    return md5_b64, crc_b64
+
+
+class GCSBackend:
+    """Uploads to a Google Cloud Storage bucket through one shared client.
+
+    Set STORAGE_EMULATOR_HOST (e.g. http://localhost:4443 for fake-gcs-server) to run
+    against a local emulator with anonymous credentials.
+    """
+
+    def __init__(self, bucket_name):
+        self.bucket_name = bucket_name.strip()
+        self._bucket = None
+        self._lock = threading.Lock()
+
+    @property
+    def bucket(self):
+        with self._lock:
+            if self._bucket is None:
+                from google.cloud import storage
+
+                if os.getenv("STORAGE_EMULATOR_HOST"):
+                    from google.auth.credentials import AnonymousCredentials
+                    client = storage.Client(project="local", credentials=AnonymousCredentials())
+                else:
+                    client = storage.Client()
+                self._bucket = client.bucket(self.bucket_name)
+            return self._bucket
+
+    def remote_checksums(self, blob_name):
+        """Return (md5, crc32c) of an existing object, or None when it does not exist."""
+        blob = self.bucket.get_blob(blob_name)
+        if blob is None:
+            return None
+        return blob.md5_hash, blob.crc32c
+
+    def upload(self, file_path, blob_name, chunk_size):
+        blob = self.bucket.blob(blob_name)
+        blob.chunk_size = chunk_size
+        blob.upload_from_filename(file_path, timeout=300)
+
+    def create_resumable_session(self, blob_name, size):
+        return self.bucket.blob(blob_name).create_resumable_upload_session(size=size, timeout=300)
+
+
+class LocalBackend:
+    """Filesystem stand-in for a bucket (GCS_BUCKET=file:///some/dir), for tests and offline runs."""
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, blob_name):
+        return os.path.join(self.root, blob_name)
+
+    def remote_checksums(self, blob_name):
+        path = self._path(blob_name)
+        if not os.path.exists(path):
+            return None
+        return local_checksums(path)
+
+    def upload(self, file_path, blob_name, chunk_size):
+        path = self._path(blob_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        shutil.copyfile(file_path, tmp_path)
+        os.replace(tmp_path, path)
+
+    def create_resumable_session(self, blob_name, size):
+        return None  # Local copies are atomic, nothing to resume
+
+
+class UploadManager:
+    """Uploads files concurrently, skipping objects whose checksums already match.
+
+    Large uploads use a GCS resumable session whose URL is kept next to the file,
+    so a retried task continues from the last byte the server acknowledged.
+    """
+
+    def __init__(self, backend, max_workers=DEFAULT_MAX_WORKERS, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.backend = backend
+        self.max_workers = max_workers
+        self.chunk_size = max(CHUNK_UNIT, chunk_size // CHUNK_UNIT * CHUNK_UNIT)
+
+    def is_unchanged(self, file_path, blob_name, checksums=None):
+        remote = self.backend.remote_checksums(blob_name)
+        if remote is None:
+            return False
+        md5, crc = checksums or local_checksums(file_path)
+        remote_md5, remote_crc = remote
+        if remote_md5 and md5:
+            return remote_md5 == md5
+        return bool(remote_crc and crc and remote_crc == crc)
+
+    def upload(self, file_path, blob_name):
+        """Upload one file unless the object is identical. Returns "uploaded" or "skipped"."""
+        checksums = local_checksums(file_path)
+        if self.is_unchanged(file_path, blob_name, checksums):
+            logging.info(f"⏭️ `{blob_name}` is unchanged in storage. Skipping upload.")
+            return "skipped"
+
+        size = os.path.getsize(file_path)
+        session_url = None
+        if size > RESUMABLE_THRESHOLD:
+            session_url = self._session_url(file_path, blob_name, size, checksums[0])
+        if session_url:
+            try:
+                self._upload_resumable(file_path, session_url, size)
+            except requests.HTTPError as e:
+                if e.response is not None and e.response.status_code in (404, 410):
+                    # Expired session: drop it so the next attempt starts a new one
+                    os.remove(self._session_file(file_path))
+                raise
+            os.remove(self._session_file(file_path))
+        else:
+            self.backend.upload(file_path, blob_name, self.chunk_size)
+
+        logging.info(f"✅ Uploaded `{file_path}` to `{blob_name}`.")
+        return "uploaded"
+
+    def upload_many(self, uploads):
+        """Upload (file_path, blob_name) pairs in parallel. Returns {blob_name: status}."""
+        uploads = list(uploads)
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(uploads)) or 1) as pool:
+            futures = {blob_name: pool.submit(self.upload, file_path, blob_name) for file_path, blob_name in uploads}
+            return {blob_name: future.result() for blob_name, future in futures.items()}
+
+    @staticmethod
+    def _session_file(file_path):
+        return f"{file_path}.upload-session"
+
+    def _session_url(self, file_path, blob_name, size, md5):
+        """Reuse the persisted session of an interrupted upload of the same content, or start a new one."""
+        session_file = self._session_file(file_path)
+        if os.path.exists(session_file):
+            with open(session_file, "r") as f:
+                session = json.load(f)
+            if session.get("blob") == blob_name and session.get("md5") == md5 and session.get("size") == size:
+                logging.info(f"🔁 Resuming interrupted upload of `{blob_name}`.")
+                return session["url"]
+
+        url = self.backend.create_resumable_session(blob_name, size)
+        if url:
+            with open(session_file, "w") as f:
+                json.dump({"blob": blob_name, "md5": md5, "size": size, "url": url}, f)
+        return url
+
+    def _committed_bytes(self, session_url, size):
+        """Ask GCS how many bytes of the session it has persisted (None: the upload is complete)."""
+        response = requests.put(session_url, headers={"Content-Range": f"bytes */{size}"}, timeout=60)
+        if response.status_code in (200, 201):
+            return None
+        if response.status_code != 308:
+            response.raise_for_status()
+        committed = response.headers.get("Range")  # e.g. "bytes=0-1048575"
+        return int(committed.split("-")[-1]) + 1 if committed else 0
+
+    def _upload_resumable(self, file_path, session_url, size):
+        offset = self._committed_bytes(session_url, size)
+        with open(file_path, "rb") as f:
+            while offset is not None and offset < size:
+                f.seek(offset)
+                data = f.read(self.chunk_size)
+                end = offset + len(data) - 1
+                response = requests.put(
+                    session_url,
+                    data=data,
+                    headers={"Content-Range": f"bytes {offset}-{end}/{size}"},
+                    timeout=300,
+                )
+                if response.status_code in (200, 201):
+                    return
+                if response.status_code != 308:
+                    response.raise_for_status()
+                committed = response.headers.get("Range")
+                offset = int(committed.split("-")[-1]) + 1 if committed else 0
+
+
+_managers = {}
+_managers_lock = threading.Lock()
+
+
+def get_upload_manager(bucket):
+    """Return the shared UploadManager of a bucket (`file://` buckets use the filesystem)."""
+    bucket = bucket.strip()
+    with _managers_lock:
+        if bucket not in _managers:
+            if bucket.startswith("file://"):
+                backend = LocalBackend(bucket[len("file://"):])
+            else:
+                backend = GCSBackend(bucket)
+            _managers[bucket] = UploadManager(backend)
+        return _managers[bucket]
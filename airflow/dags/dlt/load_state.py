@@ -0,0 +1,212 @@
+import hashlib
+import logging
+
+STATE_TABLE = "public.pipeline_load_state"
+
+
+def file_digest(file_path, block_size=1024 * 1024):
+    """Return the SHA-256 hex digest of a file, read in blocks."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# The helpers below only read or write rows and never commit: callers commit them together
+# with their own changes. The table itself is created (and migrated) once per run by
+# ensure_state_table, before the loads start: its ALTERs lock the whole table.
+
+
+def ensure_state_table(conn):
+    """Create the table recording what each loader last loaded, and how far a running load got.
+
+    DDL, run once before the loads (by `ensure_table`), in the caller's transaction.
+    """
+    cur = conn.cursor()
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {STATE_TABLE} (
+            source_table TEXT NOT NULL,
+            partition_key TEXT NOT NULL,  -- e.g. the year, or 'all' for unpartitioned sources
+            content_digest TEXT NOT NULL,
+            row_count BIGINT,
+            loaded_at TIMESTAMP NOT NULL DEFAULT now(),
+            PRIMARY KEY (source_table, partition_key)
+        );
+    """)
+    # Chunk checkpoints of in-progress loads ('loading'), added to tables created before them
+    cur.execute(f"""
+        ALTER TABLE {STATE_TABLE}
+            ADD COLUMN IF NOT EXISTS status TEXT NOT NULL DEFAULT 'loaded',
+            ADD COLUMN IF NOT EXISTS chunks_committed INTEGER NOT NULL DEFAULT 0,
+            ADD COLUMN IF NOT EXISTS batch_size INTEGER;
+    """)
+    # Chunk a running load is stuck on, with its error and how many runs it failed in a row
+    cur.execute(f"""
+        ALTER TABLE {STATE_TABLE}
+            ADD COLUMN IF NOT EXISTS failed_chunk INTEGER,
+            ADD COLUMN IF NOT EXISTS failures INTEGER NOT NULL DEFAULT 0,
+            ADD COLUMN IF NOT EXISTS last_error TEXT,
+            ADD COLUMN IF NOT EXISTS failed_at TIMESTAMP;
+    """)
+    # Loaded content the dbt models were not rebuilt from yet
+    cur.execute(f"ALTER TABLE {STATE_TABLE} ADD COLUMN IF NOT EXISTS dbt_pending BOOLEAN NOT NULL DEFAULT false;")
+    cur.close()
+
+
+def get_loaded_digest(conn, source_table, partition_key):
+    """Return the digest of the content last completely loaded for a partition, or None."""
+    cur = conn.cursor()
+    cur.execute(
+        f"""SELECT content_digest FROM {STATE_TABLE}
+            WHERE source_table = %s AND partition_key = %s AND status = 'loaded';""",
+        (source_table, str(partition_key)),
+    )
+    row = cur.fetchone()
+    cur.close()
+    return row[0] if row else None
+
+
+def forget_loads(conn, source_table):
+    """Drop every load record of a table, e.g. after recreating it."""
+    cur = conn.cursor()
+    cur.execute(f"DELETE FROM {STATE_TABLE} WHERE source_table = %s;", (source_table,))
+    cur.close()
+
+
+def get_checkpoint(conn, source_table, partition_key, content_digest, batch_size):
+    """Return (chunks_committed, row_count) of an interrupted load of the same content, or None.
+
+    Chunk boundaries only match when the file and the batch size are unchanged.
+    """
+    cur = conn.cursor()
+    cur.execute(f"""
+        SELECT chunks_committed, row_count FROM {STATE_TABLE}
+        WHERE source_table = %s AND partition_key = %s AND status = 'loading'
+            AND content_digest = %s AND batch_size = %s;
+    """, (source_table, str(partition_key), content_digest, batch_size))
+    row = cur.fetchone()
+    cur.close()
+    return (row[0], row[1] or 0) if row else None
+
+
+def start_load(conn, source_table, partition_key, content_digest, batch_size):
+    """Mark a partition as being loaded from scratch."""
+    cur = conn.cursor()
+    cur.execute(f"""
+        INSERT INTO {STATE_TABLE}
+            (source_table, partition_key, content_digest, row_count, loaded_at, status, chunks_committed, batch_size)
+        VALUES (%s, %s, %s, 0, now(), 'loading', 0, %s)
+        ON CONFLICT (source_table, partition_key) DO UPDATE
+        SET content_digest = EXCLUDED.content_digest,
+            row_count = 0,
+            loaded_at = EXCLUDED.loaded_at,
+            status = 'loading',
+            chunks_committed = 0,
+            batch_size = EXCLUDED.batch_size,
+            failed_chunk = NULL,
+            failures = 0,
+            last_error = NULL,
+            failed_at = NULL;
+    """, (source_table, str(partition_key), content_digest, batch_size))
+    cur.close()
+
+
+def checkpoint_chunk(cur, source_table, partition_key, chunks_committed, row_count):
+    """Advance the checkpoint of a running load, without committing.
+
+    Executed in the chunk's own transaction, so a chunk and its checkpoint commit together.
+    """
+    cur.execute(f"""
+        UPDATE {STATE_TABLE}
+        SET chunks_committed = %s, row_count = %s, loaded_at = now(),
+            failed_chunk = NULL, failures = 0, last_error = NULL, failed_at = NULL
+        WHERE source_table = %s AND partition_key = %s AND status = 'loading';
+    """, (chunks_committed, row_count, source_table, str(partition_key)))
+
+
+def get_chunk_failure(conn, source_table, partition_key):
+    """Return (failed_chunk, failures, last_error) of a running load stuck on a chunk, or None."""
+    cur = conn.cursor()
+    cur.execute(f"""
+        SELECT failed_chunk, failures, last_error FROM {STATE_TABLE}
+        WHERE source_table = %s AND partition_key = %s AND status = 'loading' AND failed_chunk IS NOT NULL;
+    """, (source_table, str(partition_key)))
+    row = cur.fetchone()
+    cur.close()
+    return row
+
+
+def record_chunk_failure(conn, source_table, partition_key, chunk, error):
+    """Record the chunk a running load failed on and its error.
+
+    Failing on the same chunk again counts one more consecutive failure. Returns that count.
+    """
+    cur = conn.cursor()
+    cur.execute(f"""
+        UPDATE {STATE_TABLE}
+        SET failures = CASE WHEN failed_chunk = %s THEN failures + 1 ELSE 1 END,
+            failed_chunk = %s,
+            last_error = %s,
+            failed_at = now()
+        WHERE source_table = %s AND partition_key = %s AND status = 'loading'
+        RETURNING failures;
+    """, (chunk, chunk, str(error), source_table, str(partition_key)))
+    row = cur.fetchone()
+    cur.close()
+    failures = row[0] if row else 1
+    logging.error(
+        f"❌ Load of `{source_table}` [{partition_key}] failed on chunk {chunk} "
+        f"({failures} run{'s' if failures > 1 else ''} in a row): {error}"
+    )
+    return failures
+
+
+def record_load(conn, source_table, partition_key, content_digest, row_count=None):
+    """Record a successfully loaded partition, pending until dbt is run on it (mark_dbt_applied)."""
+    cur = conn.cursor()
+    cur.execute(f"""
+        INSERT INTO {STATE_TABLE} (source_table, partition_key, content_digest, row_count, loaded_at, status, dbt_pending)
+        VALUES (%s, %s, %s, %s, now(), 'loaded', true)
+        ON CONFLICT (source_table, partition_key) DO UPDATE
+        SET content_digest = EXCLUDED.content_digest,
+            row_count = EXCLUDED.row_count,
+            loaded_at = EXCLUDED.loaded_at,
+            status = 'loaded',
+            dbt_pending = true,
+            failed_chunk = NULL,
+            failures = 0,
+            last_error = NULL,
+            failed_at = NULL;
+    """, (source_table, str(partition_key), content_digest, row_count))
+    cur.close()
+    logging.info(f"📝 Recorded load of `{source_table}` [{partition_key}] ({content_digest[:12]}).")
+
+
+def get_dbt_pending(conn):
+    """Return [source_table, partition_key, content_digest] of the loads dbt has not applied yet."""
+    cur = conn.cursor()
+    cur.execute(f"""
+        SELECT source_table, partition_key, content_digest FROM {STATE_TABLE}
+        WHERE status = 'loaded' AND dbt_pending
+        ORDER BY source_table, partition_key;
+    """)
+    rows = [list(row) for row in cur.fetchall()]
+    cur.close()
+    return rows
+
+
+def mark_dbt_applied(conn, pending):
+    """Clear the pending flag of loads a successful dbt run was planned from.
+
+    Only the same content is cleared: a partition reloaded since stays pending.
+    """
+    cur = conn.cursor()
+    for source_table, partition_key, content_digest in pending:
+        cur.execute(f"""
+            UPDATE {STATE_TABLE}
+            SET dbt_pending = false
+            WHERE source_table = %s AND partition_key = %s AND content_digest = %s AND status = 'loaded';
+        """, (source_table, partition_key, content_digest))
+    cur.close()
+    logging.info(f"📝 dbt applied {len(pending)} loads.")
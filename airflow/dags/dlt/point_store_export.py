@@ -0,0 +1,178 @@
+import json
+import logging
+import os
+import time
+from datetime import datetime, timezone
+
+# Read by the dashboard (dashboard/point_store.py) through a volume shared with Airflow
+POINT_STORE_PATH = os.getenv("POINT_STORE_PATH", "/opt/airflow/point_store/accident_points.bin")
+
+# File layout, version 1 (all integers little-endian):
+#   MAGIC | uint32 header length | JSON header | data: column blocks, each aligned to ALIGNMENT
+# The data starts at the first ALIGNMENT boundary after the header. The header lists every
+# column's dtype and offset in the data, the code tables of the small-int columns, and the
+# [year, borough code, start, stop) row ranges of the year x borough index.
+MAGIC = b"TFLPTS01"
+ALIGNMENT = 64
+FETCH_BATCH_ROWS = 100_000
+MAX_VEHICLE_FLAGS = 32
+TEXT_COLUMNS = ("borough", "severity")
+
+# Vehicle types come from `accident_summary.vehicle_types`, the array the dashboard filters
+# on, so the store's flags match the database filter. Types beyond MAX_VEHICLE_FLAGS get no
+# flag and the dashboard maps them from the database instead.
+VEHICLE_TYPES_SQL = """
+    SELECT vehicle_type
+    FROM accident_summary, UNNEST(vehicle_types) AS vehicle_type
+    GROUP BY vehicle_type
+    ORDER BY COUNT(DISTINCT accident_id) DESC, vehicle_type;
+"""
+
+POINTS_SQL = """
+    SELECT
+        CAST(a.latitude AS REAL) AS lat,
+        CAST(a.longitude AS REAL) AS lon,
+        a.accident_date - DATE '1970-01-01' AS day,
+        CAST(EXTRACT(YEAR FROM a.accident_date) AS INTEGER) AS year,
+        COALESCE(a.borough, 'Unknown') AS borough,
+        COALESCE(a.accident_severity, 'Unknown') AS severity,
+        COALESCE((
+            SELECT BIT_OR(CAST(1 AS BIGINT) << (ARRAY_POSITION(%(vehicle_types)s::TEXT[], vehicle_type) - 1))
+            FROM UNNEST(a.vehicle_types) AS vehicle_type
+            WHERE vehicle_type = ANY(%(vehicle_types)s::TEXT[])
+        ), 0) AS vehicles
+    FROM accident_summary a
+    WHERE a.latitude IS NOT NULL AND a.longitude IS NOT NULL AND a.accident_date IS NOT NULL;
+"""
+
+
+def _fetch_points(conn, vehicle_types):
+    """Fetch every located accident in batches, as one NumPy array per column."""
+    import numpy as np
+
+    names = ("lat", "lon", "day", "year", "borough", "severity", "vehicles")
+    batches = {name: [] for name in names}
+    with conn.cursor(name="point_store_export") as cur:
+        cur.itersize = FETCH_BATCH_ROWS
+        cur.execute(POINTS_SQL, {"vehicle_types": vehicle_types})
+        while True:
+            rows = cur.fetchmany(FETCH_BATCH_ROWS)
+            if not rows:
+                break
+            for name, values in zip(names, zip(*rows)):
+                batches[name].append(np.array(values, dtype=object if name in TEXT_COLUMNS else None))
+
+    return {
+        name: np.concatenate(parts) if parts else np.empty(0, dtype=object if name in TEXT_COLUMNS else np.int64)
+        for name, parts in batches.items()
+    }
+
+
+def build_point_store(columns, vehicle_types):
+    """Encode fetched points into (header, {column: array}), sorted by year, borough and day."""
+    import numpy as np
+
+    boroughs, borough_codes = np.unique(columns["borough"].astype(str), return_inverse=True)
+    severities, severity_codes = np.unique(columns["severity"].astype(str), return_inverse=True)
+    year = columns["year"].astype(np.int16)
+    day = columns["day"].astype(np.int32)
+
+    order = np.lexsort((day, borough_codes, year))
+    arrays = {
+        "lat": columns["lat"].astype(np.float32)[order],
+        "lon": columns["lon"].astype(np.float32)[order],
+        "day": day[order],  # Days since 1970-01-01, i.e. datetime64[D] values
+        "severity": severity_codes.astype(np.min_scalar_type(max(len(severities) - 1, 0)))[order],
+        "borough": borough_codes.astype(np.min_scalar_type(max(len(boroughs) - 1, 0)))[order],
+        # Bit i is set when a vehicle of vehicle_types[i] was involved
+        "vehicles": columns["vehicles"].astype(
+            np.min_scalar_type((1 << max(len(vehicle_types), 1)) - 1)
+        )[order],
+    }
+
+    year, borough_codes = year[order], borough_codes[order]
+    starts = np.flatnonzero(np.diff(year.astype(np.int64) * len(boroughs) + borough_codes) != 0) + 1
+    starts = np.concatenate(([0], starts)) if len(year) else starts
+    stops = np.append(starts[1:], len(year))
+    index = [
+        [int(year[start]), int(borough_codes[start]), int(start), int(stop)]
+        for start, stop in zip(starts, stops)
+    ]
+
+    header = {
+        "rows": int(len(order)),
+        "day_epoch": "1970-01-01",
+        "boroughs": boroughs.tolist(),
+        "severities": severities.tolist(),
+        "vehicle_types": list(vehicle_types),
+        "index": index,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+    return header, arrays
+
+
+def write_point_store(path, header, arrays):
+    """Write the store next to `path`, then swap it in atomically.
+
+    Dashboards that still map the previous file keep reading it until they reopen.
+    """
+    def aligned(offset):
+        return -(-offset // ALIGNMENT) * ALIGNMENT
+
+    columns, offset = [], 0
+    for name, values in arrays.items():
+        columns.append({"name": name, "dtype": values.dtype.newbyteorder("<").str, "offset": offset})
+        offset = aligned(offset + values.nbytes)
+    header_bytes = json.dumps(dict(header, alignment=ALIGNMENT, columns=columns)).encode()
+    data_start = aligned(len(MAGIC) + 4 + len(header_bytes))
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC + len(header_bytes).to_bytes(4, "little") + header_bytes)
+        for column, values in zip(columns, arrays.values()):
+            f.write(b"\0" * (data_start + column["offset"] - f.tell()))
+            f.write(values.astype(column["dtype"], copy=False).tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return os.path.getsize(path)
+
+
+def export_point_store(path=POINT_STORE_PATH):
+    """Export the located accidents from the dbt models into the dashboard's point store.
+
+    Returns a report {"rows", "bytes", "seconds", "path"}.
+    """
+    from accident_data_pipeline import connect_db
+
+    started = time.perf_counter()
+    conn = connect_db()
+    if conn is None:
+        raise RuntimeError("Cannot export the point store without a database connection.")
+    try:
+        cur = conn.cursor()
+        cur.execute(VEHICLE_TYPES_SQL)
+        vehicle_types = [row[0] for row in cur.fetchall()]
+        cur.close()
+        if len(vehicle_types) > MAX_VEHICLE_FLAGS:
+            logging.warning(
+                f"⚠️ {len(vehicle_types)} vehicle types, only the {MAX_VEHICLE_FLAGS} most common get a flag."
+            )
+            vehicle_types = vehicle_types[:MAX_VEHICLE_FLAGS]
+        columns = _fetch_points(conn, vehicle_types)
+    finally:
+        conn.close()
+
+    header, arrays = build_point_store(columns, vehicle_types)
+    size = write_point_store(path, header, arrays)
+    report = {"rows": header["rows"], "bytes": size, "seconds": round(time.perf_counter() - started, 1), "path": path}
+    logging.info(
+        f"🗺️ Point store: {report['rows']:,} accidents, {size / 2**20:.1f} MB in {report['seconds']}s -> {path}"
+    )
+    return report
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    export_point_store()
@@ -0,0 +1,95 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime, timezone
+
+
+class RawPayloadCache:
+    """Content-addressed store of raw TfL API responses.
+
+    Layout under `root`:
+        objects/<aa>/<sha256>.json.gz   raw response bodies, addressed by their SHA-256
+        index/<year>.json               latest digest per year, with the HTTP validators
+                                        (ETag / Last-Modified) used for conditional refreshes
+
+    Identical responses are stored once, and every pipeline stage after the fetch can be
+    replayed from here without network access.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.objects_dir = os.path.join(root, "objects")
+        self.index_dir = os.path.join(root, "index")
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.index_dir, exist_ok=True)
+
+    def _object_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], f"{digest}.json.gz")
+
+    def _index_path(self, year):
+        return os.path.join(self.index_dir, f"{year}.json")
+
+    def lookup(self, year):
+        """Return the index entry of a year ({"digest", "etag", "last_modified", "fetched_at"}) or None."""
+        path = self._index_path(year)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r") as f:
+            entry = json.load(f)
+        if not os.path.exists(self._object_path(entry["digest"])):
+            logging.warning(f"⚠️ Cache index for {year} points to a missing object. Ignoring it.")
+            return None
+        return entry
+
+    def conditional_headers(self, year):
+        """HTTP headers that let the API answer 304 when the cached payload is still current."""
+        entry = self.lookup(year)
+        if not entry:
+            return {}
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def load(self, digest):
+        """Return the decoded payload stored under a digest."""
+        with gzip.open(self._object_path(digest), "rb") as f:
+            return json.loads(f.read())
+
+    def store(self, year, body, etag=None, last_modified=None):
+        """Store a raw response body for a year and point the year's index at it. Returns the digest."""
+        digest = hashlib.sha256(body).hexdigest()
+        object_path = self._object_path(digest)
+        if not os.path.exists(object_path):
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            tmp_path = f"{object_path}.tmp"
+            with gzip.GzipFile(tmp_path, mode="wb", mtime=0) as f:
+                f.write(body)
+            os.replace(tmp_path, object_path)  # Readers never see a partial object
+
+        self._write_index(year, {
+            "digest": digest,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fetched_at": datetime.now(timezone.utc).isoformat(),
+        })
+        return digest
+
+    def touch(self, year):
+        """Mark a year's cached payload as confirmed current by the API (HTTP 304)."""
+        entry = self.lookup(year)
+        if entry:
+            entry["fetched_at"] = datetime.now(timezone.utc).isoformat()
+            self._write_index(year, entry)
+        return entry
+
+    def _write_index(self, year, entry):
+        path = self._index_path(year)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
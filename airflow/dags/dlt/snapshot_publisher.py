@@ -0,0 +1,128 @@
+import logging
+import os
+import time
+
+# Schema the dashboard reads (dashboard/data_loader.py), published after each dbt run.
+# Empty disables publishing, and the dashboard then reads the dbt tables in `public`.
+DASHBOARD_SCHEMA = os.getenv("DASHBOARD_SCHEMA", "dashboard")
+SOURCE_SCHEMA = "public"  # dbt target schema (dbt/profiles.yml)
+
+# dbt models read by the dashboard
+DASHBOARD_TABLES = [
+    "accident_summary",
+    "accident_summary_sample",
+    "vehicles",
+    "casualties",
+    "casualty_age_summary",
+    "hotspots",
+    "accidents_daily",
+    "accidents_weekly",
+    "accidents_monthly",
+    "accidents_yearly",
+]
+
+# How long to wait for the read replica (DB_READ_HOST) to replay the published snapshot
+REPLICA_WAIT_SECONDS = int(os.getenv("REPLICA_WAIT_SECONDS", "300"))
+
+
+def _schema_exists(cur, schema):
+    cur.execute("SELECT 1 FROM pg_namespace WHERE nspname = %s;", (schema,))
+    return cur.fetchone() is not None
+
+
+def copy_table(cur, table, source_schema, target_schema):
+    """Copy a table with its indexes (built after the rows) and statistics. Returns its row count."""
+    cur.execute(f"CREATE TABLE {target_schema}.{table} AS TABLE {source_schema}.{table};")
+    rows = cur.rowcount
+    cur.execute("SELECT indexdef FROM pg_indexes WHERE schemaname = %s AND tablename = %s;", (source_schema, table))
+    for (indexdef,) in cur.fetchall():
+        cur.execute(indexdef.replace(f" ON {source_schema}.{table} ", f" ON {target_schema}.{table} ", 1))
+    cur.execute(f"ANALYZE {target_schema}.{table};")
+    return rows
+
+
+def wait_for_replica(lsn, timeout=REPLICA_WAIT_SECONDS):
+    """Wait until the read replica has replayed the primary's WAL up to `lsn`."""
+    import psycopg2
+
+    from accident_data_pipeline import get_settings
+
+    params = dict(get_settings().db_params, host=os.getenv("DB_READ_HOST"))
+    params["port"] = os.getenv("DB_READ_PORT") or params["port"]
+    deadline = time.monotonic() + timeout
+    conn = psycopg2.connect(**params)
+    conn.autocommit = True
+    try:
+        cur = conn.cursor()
+        while True:
+            cur.execute("SELECT pg_last_wal_replay_lsn() >= %s::pg_lsn;", (lsn,))
+            if cur.fetchone()[0]:
+                logging.info("✅ Read replica caught up with the published snapshot.")
+                return True
+            if time.monotonic() > deadline:
+                logging.warning(f"⚠️ Read replica still behind {lsn} after {timeout}s.")
+                return False
+            time.sleep(1)
+    finally:
+        conn.close()
+
+
+def publish_dashboard_snapshot(schema=DASHBOARD_SCHEMA, source_schema=SOURCE_SCHEMA):
+    """Copy the dashboard tables into `<schema>_next`, then swap it in as `<schema>` atomically.
+
+    Readers resolve table names through `search_path`, so queries started before the swap
+    finish on the old tables and later ones see the new snapshot: neither side waits. The
+    replaced snapshot is kept as `<schema>_previous` until the next publish.
+    Returns a report {"schema", "tables", "rows", "seconds"}.
+    """
+    from accident_data_pipeline import connect_db
+
+    report = {"schema": schema, "tables": 0, "rows": 0, "seconds": 0.0}
+    if not schema:
+        logging.info("ℹ️ DASHBOARD_SCHEMA is empty. The dashboard reads the dbt tables directly.")
+        return report
+
+    started = time.perf_counter()
+    next_schema, previous_schema = f"{schema}_next", f"{schema}_previous"
+    conn = connect_db()
+    if conn is None:
+        raise RuntimeError("Cannot publish the dashboard snapshot without a database connection.")
+    try:
+        cur = conn.cursor()
+        # Nobody reads these two: the previous snapshot had a whole run to drain
+        cur.execute(f"DROP SCHEMA IF EXISTS {previous_schema} CASCADE;")
+        cur.execute(f"DROP SCHEMA IF EXISTS {next_schema} CASCADE;")
+        cur.execute(f"CREATE SCHEMA {next_schema};")
+        for table in DASHBOARD_TABLES:
+            report["rows"] += copy_table(cur, table, source_schema, next_schema)
+            report["tables"] += 1
+        conn.commit()
+
+        # The swap only renames schemas: no table lock, no wait on running queries
+        if _schema_exists(cur, schema):
+            cur.execute(f"ALTER SCHEMA {schema} RENAME TO {previous_schema};")
+        cur.execute(f"ALTER SCHEMA {next_schema} RENAME TO {schema};")
+        conn.commit()
+
+        cur.execute("SELECT pg_current_wal_lsn();")
+        published_lsn = cur.fetchone()[0]
+        cur.close()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    report["seconds"] = round(time.perf_counter() - started, 1)
+    logging.info(
+        f"📦 Published {report['tables']} tables ({report['rows']:,} rows) as schema `{schema}` "
+        f"in {report['seconds']}s."
+    )
+    if os.getenv("DB_READ_HOST"):
+        wait_for_replica(published_lsn)
+    return report
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    publish_dashboard_snapshot()
@@ -1,11 +1,8 @@
-import pandas as pd
-from google.cloud import storage
-import psycopg2
 import os
 import logging
+from load_state import ensure_state_table, file_digest, get_loaded_digest, record_load
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+# pandas, psycopg2 and the GCS client are imported on first use, keeping this module cheap to import
 
 # PostgreSQL Configuration (Local)
 DB_HOST = os.getenv("DB_HOST")
@@ -21,8 +18,47 @@ GCS_CSV_PATH = os.getenv("GCS_CSV_PATH")
 # Local file path
 LOCAL_CSV_PATH = "/opt/airflow/dags/dlt/london_weather_data_1979_to_2023.csv"
 
+def connect_db():
+    """Establish a connection to PostgreSQL."""
+    import psycopg2
+
+    return psycopg2.connect(
+        dbname=DB_NAME,
+        user=DB_USER,
+        password=DB_PASSWORD,
+        host=DB_HOST,
+        port=DB_PORT
+    )
+
+def weather_is_unchanged(digest):
+    """Check whether `london_weather` already holds the CSV with this digest."""
+    conn = connect_db()
+    try:
+        if get_loaded_digest(conn, "london_weather", "all") != digest:
+            return False
+        cursor = conn.cursor()
+        cursor.execute("SELECT to_regclass('public.london_weather') IS NOT NULL;")
+        exists = cursor.fetchone()[0]
+        cursor.close()
+        return exists
+    finally:
+        conn.close()
+
 # Load CSV file
 def load_weather_data():
+    """Load the weather CSV into GCS and PostgreSQL, unless it is unchanged since the last load.
+
+    Returns a change report: {"table", "changed"}.
+    """
+    report = {"table": "london_weather", "changed": False}
+    digest = file_digest(LOCAL_CSV_PATH)
+    if weather_is_unchanged(digest):
+        logging.info("⏭️ Weather CSV is unchanged since the last load. Skipping.")
+        return report
+
+    import pandas as pd
+    from gcs_uploader import get_upload_manager
+
     logging.info("📂 Loading weather data from local CSV file...")
 
     # Load CSV with correct column names
@@ -47,26 +83,25 @@ def load_weather_data():
     }, inplace=True)
 
     # Upload to Google Cloud Storage
-    logging.info("☁️ Uploading CSV file to Google Cloud Storage...")
-    try:
-        storage_client = storage.Client()
-        bucket = storage_client.bucket(GCS_BUCKET)
-        blob = bucket.blob(f"{GCS_CSV_PATH}london_weather_data_1979_to_2023.csv")
-        blob.upload_from_filename(LOCAL_CSV_PATH)
-        logging.info("✅ File uploaded to GCS successfully.")
-    except Exception as e:
-        logging.error(f"❌ Failed to upload to GCS: {e}")
+    uploaded = False
+    if not GCS_BUCKET:
+        # Local and replay setups: there is no upload to retry
+        logging.info("ℹ️ GCS_BUCKET is not set. Skipping the GCS upload.")
+        uploaded = True
+    else:
+        logging.info("☁️ Uploading CSV file to Google Cloud Storage...")
+        try:
+            blob_name = f"{GCS_CSV_PATH}london_weather_data_1979_to_2023.csv"
+            status = get_upload_manager(GCS_BUCKET).upload(LOCAL_CSV_PATH, blob_name)
+            logging.info(f"✅ Weather CSV in GCS is up to date ({status}).")
+            uploaded = True
+        except Exception as e:
+            logging.error(f"❌ Failed to upload to GCS: {e}")
 
     # Load data to PostgreSQL
     logging.info("🗃️ Loading data into PostgreSQL...")
     try:
-        conn = psycopg2.connect(
-            dbname=DB_NAME,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            host=DB_HOST,
-            port=DB_PORT
-        )
+        conn = connect_db()
         cursor = conn.cursor()
 
         # Create table if it doesn't exist
@@ -101,13 +136,28 @@ def load_weather_data():
                 row['radiation'], row['snow_depth'], row['sunshine_duration']
             ))
 
-        conn.commit()
         cursor.close()
+        if uploaded:
+            record_load(conn, "london_weather", "all", digest, len(df))  # Commits with the rows
+        else:
+            # Without a load record the next run loads (and uploads) the file again
+            logging.warning("⚠️ Not recording the weather load until the GCS upload succeeds.")
+        conn.commit()
         conn.close()
         logging.info("✅ Data loaded into PostgreSQL successfully.")
+        report["changed"] = True
 
     except Exception as e:
         logging.error(f"❌ Database operation failed: {e}")
 
+    return report
+
 if __name__ == "__main__":
+    # Configure logging
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    # In the DAG, the prepare_table task creates the load-state table first
+    state_conn = connect_db()
+    ensure_state_table(state_conn)
+    state_conn.commit()
+    state_conn.close()
     load_weather_data()
\ No newline at end of file
@@ -1,11 +1,13 @@
 from airflow import DAG
-from airflow.operators.python import PythonOperator
+from airflow.decorators import task, task_group
+from airflow.exceptions import AirflowSkipException
 from airflow.operators.bash import BashOperator
-from airflow.operators.dummy_operator import DummyOperator
+from airflow.operators.empty import EmptyOperator
+from airflow.utils.trigger_rule import TriggerRule
 from datetime import datetime, timedelta
-import subprocess
 import logging
 import os
+import sys
 
 # Configure logging
 logging.basicConfig(
@@ -14,6 +16,15 @@ logging.basicConfig(
     level=logging.INFO
 )
 
+# Pipeline modules live in `dlt/` next to this file. They are imported inside the
+# tasks so the scheduler does not execute them every time it parses the DAG.
+DLT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dlt")
+if DLT_DIR not in sys.path:
+    sys.path.insert(0, DLT_DIR)
+
+# Maximum number of years fetched from the TfL API at the same time
+FETCH_CONCURRENCY = int(os.getenv("TFL_FETCH_CONCURRENCY", "4"))
+
 # Default arguments
 default_args = {
     'owner': 'airflow',
@@ -31,59 +42,123 @@ with DAG(
     description='ETL + dbt in a single end-to-end pipeline',
     schedule_interval='@daily',
     max_active_runs=1,
+    # Trigger with {"replay": true} to rebuild from the local raw payload cache, without network access
+    params={'replay': False},
 ) as dag:
 
-    start = DummyOperator(task_id='start')
-    end = DummyOperator(task_id='end')
-
-    # Function to run Python scripts
-    def run_script(script_name):
-        logging.info(f"🚀 Running script: {script_name}...")
-        GCS_BUCKET = os.getenv('GCS_BUCKET').strip()
-        logging.info(f"Using bucket name: '{GCS_BUCKET}' (length: {len(GCS_BUCKET)})")
-        
-        process = subprocess.Popen(
-            ["python", f"/usr/app/dlt/{script_name}"],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
-        )
-
-        # Capture stdout
-        while True:
-            output = process.stdout.readline()
-            if output == '' and process.poll() is not None:
-                break
-            if output:
-                logging.info(f"{script_name} [STDOUT]: {output.strip()}")
-
-        # Capture stderr
-        stderr_output = process.stderr.read().strip()
-        if stderr_output:
-            logging.error(f"{script_name} [STDERR]: {stderr_output}")
-
-        exit_code = process.poll()
-        if exit_code != 0:
-            raise Exception(f"❌ Script {script_name} failed with exit code {exit_code}")
-        else:
-            logging.info(f"✅ Script {script_name} executed successfully.")
-
-    # ETL Tasks
-    accident_data_task = PythonOperator(
-        task_id='accident_data_pipeline',
-        python_callable=lambda: run_script('accident_data_pipeline.py'),
-    )
+    start = EmptyOperator(task_id='start')
+    end = EmptyOperator(task_id='end', trigger_rule=TriggerRule.NONE_FAILED)
 
-    weather_task = PythonOperator(
-        task_id='weather_loader',
-        python_callable=lambda: run_script('weather_loader.py'),
-    )
+    @task
+    def list_years():
+        """Years to ingest, as configured in `dlt/config.yaml`."""
+        from accident_data_pipeline import get_settings
+        return list(get_settings().years)
+
+    @task
+    def prepare_table():
+        """Create the staging and load-state tables once, before the loads run in parallel."""
+        from accident_data_pipeline import ensure_table
+        ensure_table()
+
+    # ETL Tasks: one fetch -> store -> load chain per year, retried independently
+    @task_group(group_id='accident_year')
+    def accident_year(year):
+
+        @task(max_active_tis_per_dag=FETCH_CONCURRENCY)
+        def fetch(year, params=None):
+            from accident_data_pipeline import fetch_year
+            if not fetch_year(year, offline=bool(params and params.get('replay'))):
+                raise AirflowSkipException(f"No accident data for {year}.")
+            return year
+
+        @task
+        def store(year, params=None):
+            from accident_data_pipeline import store_year
+            if params and params.get('replay'):
+                logging.info(f"♻️ Replay run, not uploading {year} to GCS.")
+            else:
+                store_year(year)
+            return year
+
+        @task
+        def load(year):
+            from accident_data_pipeline import load_year
+            report = load_year(year)
+            logging.info(f"✅ {year}: changed={report['changed']}, rows={report['rows']}.")
+            return report
+
+        return load(store(fetch(year)))
+
+    @task(task_id='weather_loader')
+    def load_weather():
+        from weather_loader import load_weather_data
+        return load_weather_data()
+
+    # Years without data are skipped, which must not block the run
+    @task(trigger_rule=TriggerRule.NONE_FAILED, multiple_outputs=True)
+    def plan_dbt(accident_reports, weather_report):
+        """Turn the loaders' change reports, and loads dbt has not applied yet, into a selective dbt command."""
+        from accident_data_pipeline import connect_db
+        from dbt_runner import pending_load_reports, plan_dbt_run
+        from load_state import get_dbt_pending
+
+        conn = connect_db()
+        if conn is None:
+            raise RuntimeError("Cannot plan dbt without the load state.")
+        try:
+            pending = get_dbt_pending(conn)
+        finally:
+            conn.close()
+        command = plan_dbt_run(list(accident_reports or []) + [weather_report] + pending_load_reports(pending))
+        if command is None:
+            raise AirflowSkipException("No changed sources or models, nothing for dbt to do.")
+        return {"command": command, "pending": pending}
+
+    @task
+    def mark_dbt_applied(pending):
+        """Clear the loads the successful dbt run was planned from, so later runs skip them."""
+        from accident_data_pipeline import connect_db
+        from load_state import mark_dbt_applied as mark_applied
+
+        conn = connect_db()
+        if conn is None:
+            raise RuntimeError("Cannot update the load state.")
+        try:
+            mark_applied(conn, pending)
+            conn.commit()
+        finally:
+            conn.close()
+
+    @task
+    def publish_snapshot():
+        """Swap the fresh dbt tables into the schema the dashboard reads, atomically."""
+        from snapshot_publisher import publish_dashboard_snapshot
+        return publish_dashboard_snapshot()
+
+    @task
+    def warm_cache():
+        """Refill the dashboard API cache with the fresh results of the common filter selections."""
+        from cache_warmer import warm_dashboard_cache
+        return warm_dashboard_cache()
+
+    @task
+    def export_points():
+        """Export the accident points into the memory-mapped store the dashboard map filters."""
+        from point_store_export import export_point_store
+        return export_point_store()
+
+    accident_data_task = accident_year.expand(year=list_years())
+    weather_task = load_weather()
+    dbt_plan = plan_dbt(accident_data_task, weather_task)
 
     # dbt Transformation
     dbt_run = BashOperator(
         task_id='dbt_run',
-        bash_command='cd /usr/app/dbt && dbt run --profiles-dir .',
+        bash_command="{{ ti.xcom_pull(task_ids='plan_dbt', key='command') }}",
     )
 
     # Task dependencies
-    start >> [accident_data_task, weather_task] >> dbt_run >> end
+    start >> prepare_table() >> [accident_data_task, weather_task]
+    dbt_plan >> dbt_run >> publish_snapshot() >> [warm_cache(), export_points()] >> end
+    dbt_run >> mark_dbt_applied(dbt_plan["pending"]) >> end
@@ -0,0 +1,80 @@
+"""Concurrent load test of the aggregate API (`dashboard/api_server.py`).
+
+Each simulated viewer picks random filters and requests the aggregates one dashboard
+page needs, like a Streamlit session would. Example, with `docker-compose up dashboard_api`:
+
+    python benchmarks/api_loadtest.py --url http://localhost:8000 --users 50 --pages 5
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from loadtest_report import format_latency, latency_summary  # noqa: E402
+
+PAGE_AGGREGATES = [
+    ("monthly_trends", {}),
+    ("borough_summary", {}),
+    ("severity_breakdown", {}),
+    ("transport_mode_distribution", {}),
+    ("weather_accident_trends", {}),
+    ("weather_accident_trends", {"by_severity": "true"}),
+    ("accident_density", {}),
+    ("weekday_vs_weekend_trends", {}),
+    ("high_risk_days", {}),
+    ("accidents_by_age_group", {}),
+    ("fatalities_by_age", {}),
+]
+
+
+def simulate_viewer(url, pages, years, boroughs):
+    session = requests.Session()
+    latencies = []
+    for _ in range(pages):
+        filters = {}
+        if random.random() < 0.7:
+            filters["year"] = random.choice(years)
+        if random.random() < 0.5:
+            filters["borough"] = random.choice(boroughs)
+
+        started = time.perf_counter()
+        for name, params in PAGE_AGGREGATES:
+            response = session.get(f"{url}/aggregates/{name}", params={**filters, **params}, timeout=120)
+            response.raise_for_status()
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the dashboard aggregate API")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--users", type=int, default=20, help="Concurrent simulated viewers")
+    parser.add_argument("--pages", type=int, default=5, help="Page loads per viewer")
+    args = parser.parse_args()
+
+    options = requests.get(f"{args.url}/aggregates/filter_options", timeout=120).json()
+    columns = options["columns"]
+    rows = [dict(zip(columns, row)) for row in options["data"]]
+    years = sorted({int(row["year"]) for row in rows if row["year"] is not None})
+    boroughs = sorted({row["borough"] for row in rows if row["borough"]})
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.users) as pool:
+        results = pool.map(lambda _: simulate_viewer(args.url, args.pages, years, boroughs), range(args.users))
+        latencies = [latency for viewer in results for latency in viewer]
+    elapsed = time.perf_counter() - started
+
+    print(f"📊 {len(latencies)} page loads by {args.users} viewers in {elapsed:.1f}s "
+          f"({len(latencies) / elapsed:.1f} pages/s)")
+    print(f"   {format_latency(latency_summary(latencies), digits=3)}")
+    print(f"   server cache: {requests.get(f'{args.url}/health', timeout=30).json()['cache']}")
+
+
+if __name__ == "__main__":
+    main()
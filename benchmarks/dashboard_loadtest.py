@@ -0,0 +1,287 @@
+"""Concurrent-user load test of the Streamlit dashboard (`dashboard/app.py`).
+
+Every simulated user is a headless Streamlit session (`streamlit.testing.v1.AppTest`) in its
+own process: it loads the page, then changes the year, borough, severity and vehicle filters at
+random, each change rerunning the whole script like a browser session would. Meanwhile the
+harness samples PostgreSQL connections (`pg_stat_activity`) and the CPU and memory of every
+session process, plus of any `streamlit run` server on this host. The report gives latency
+percentiles per interaction, connection counts and per-process resources; `--json` saves it,
+and `--baseline` fails the run when a p95 latency grew by more than `--factor`.
+
+    python benchmarks/seed_db.py --accidents 1000000
+    python benchmarks/dashboard_loadtest.py --users 20 --interactions 10 --json report.json
+    python benchmarks/dashboard_loadtest.py --users 20 --baseline report.json
+
+The sessions query the `--schema` seeded by seed_db.py directly (as DASHBOARD_SCHEMA), or the
+aggregate API when `--api-url` is given. Database settings come from DB_*.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+
+try:
+    import psutil
+except ImportError:
+    sys.exit("❌ psutil is not installed: pip install -r benchmarks/requirements.txt")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DASHBOARD_DIR = os.path.join(ROOT, "dashboard")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from loadtest_report import format_latency, latency_summary  # noqa: E402
+from seed_db import connect_db  # noqa: E402
+
+# Sidebar filter -> label of its selectbox in app.py
+FILTERS = {
+    "year": "Select Year",
+    "borough": "Select Borough",
+    "severity": "Select Severity",
+    "vehicle": "Select Vehicle Type",
+}
+
+CONNECTIONS_SQL = """
+    SELECT
+        COUNT(*) AS total,
+        COUNT(*) FILTER (WHERE state = 'active') AS active,
+        COUNT(*) FILTER (WHERE state = 'idle') AS idle,
+        COUNT(*) FILTER (WHERE state LIKE 'idle in transaction%') AS idle_in_transaction
+    FROM pg_stat_activity
+    WHERE datname = current_database() AND backend_type = 'client backend' AND pid <> pg_backend_pid();
+"""
+
+
+def run_session(session_id, options, results):
+    """One headless dashboard session: a page load, then random filter changes."""
+    sys.path.insert(0, DASHBOARD_DIR)  # app.py imports its sibling modules
+    os.chdir(DASHBOARD_DIR)
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(options["seed"] + session_id)
+    samples = []
+
+    def timed(interaction, run):
+        started = time.perf_counter()
+        try:
+            app = run()
+            error = repr(app.exception[0].value) if app.exception else None
+        except Exception as e:  # e.g. the script did not finish within the timeout
+            app, error = None, repr(e)
+        samples.append({"interaction": interaction, "seconds": time.perf_counter() - started, "error": error})
+        return app
+
+    try:
+        time.sleep(rng.uniform(0, options["ramp_up"]))  # Users do not all arrive at once
+        app = AppTest.from_file(os.path.join(DASHBOARD_DIR, "app.py"), default_timeout=options["timeout"])
+        app = timed("load", app.run)
+
+        for _ in range(options["interactions"] if app is not None else 0):
+            if options["think_time"]:
+                time.sleep(rng.expovariate(1 / options["think_time"]))
+            name = rng.choice(list(FILTERS))
+            selectbox = next(widget for widget in app.selectbox if widget.label == FILTERS[name])
+            index = rng.randrange(len(selectbox.options))
+            app = timed(name, selectbox.select_index(index).run)
+            if app is None:
+                break
+    finally:
+        results.put((session_id, samples))  # The harness waits for every session
+
+
+class ResourceSampler(threading.Thread):
+    """Sample DB connections and process CPU / memory every `interval` seconds."""
+
+    def __init__(self, interval, session_pids):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.connections = []
+        self.processes = {}  # pid -> {"role", "cpu_percent": [...], "rss": [...], "cpu_seconds"}
+        own_pids = {os.getpid(), *session_pids}
+        servers = [
+            process for process in psutil.process_iter(["cmdline"])
+            if process.pid not in own_pids and "streamlit" in " ".join(process.info["cmdline"] or [])
+        ]
+        self._watched = [(psutil.Process(pid), "session") for pid in session_pids]
+        self._watched += [(process, "server") for process in servers]
+        for process, role in self._watched:
+            self.processes[process.pid] = {"role": role, "cpu_percent": [], "rss": [], "cpu_seconds": 0.0}
+            try:
+                process.cpu_percent(None)  # The first call only starts the measurement
+            except psutil.NoSuchProcess:
+                pass
+
+    def run(self):
+        conn = connect_db()
+        conn.autocommit = True
+        cur = conn.cursor()
+        try:
+            while not self.stopped.wait(self.interval):
+                cur.execute(CONNECTIONS_SQL)
+                self.connections.append(dict(zip(("total", "active", "idle", "idle_in_transaction"), cur.fetchone())))
+                for process, _ in self._watched:
+                    stats = self.processes[process.pid]
+                    try:
+                        with process.oneshot():
+                            stats["cpu_percent"].append(process.cpu_percent(None))
+                            stats["rss"].append(process.memory_info().rss)
+                            cpu_times = process.cpu_times()
+                            stats["cpu_seconds"] = cpu_times.user + cpu_times.system
+                    except psutil.NoSuchProcess:
+                        pass  # Session finished
+        finally:
+            cur.close()
+            conn.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def sample_summary(samples):
+    return latency_summary(
+        [sample["seconds"] for sample in samples],
+        errors=sum(sample["error"] is not None for sample in samples),
+    )
+
+
+def build_report(args, samples, sampler, elapsed):
+    """Summarize the run: latencies per interaction, DB connections and process resources."""
+    by_interaction = {}
+    for sample in samples:
+        by_interaction.setdefault(sample["interaction"], []).append(sample)
+    latency = {name: sample_summary(group) for name, group in sorted(by_interaction.items())}
+    latency["all"] = sample_summary(samples)
+
+    connections = {
+        key: {"peak": max(row[key] for row in sampler.connections),
+              "mean": statistics.mean(row[key] for row in sampler.connections)}
+        for key in ("total", "active", "idle", "idle_in_transaction")
+    } if sampler.connections else {}
+
+    processes = {}
+    for role in ("session", "server"):
+        stats = [stats for stats in sampler.processes.values() if stats["role"] == role and stats["rss"]]
+        if stats:
+            processes[role] = {
+                "count": len(stats),
+                "peak_rss_mb": max(max(s["rss"]) for s in stats) / 2**20,
+                "mean_cpu_percent": statistics.mean(statistics.mean(s["cpu_percent"]) for s in stats),
+                "peak_cpu_percent": max(max(s["cpu_percent"]) for s in stats),
+                "cpu_seconds": sum(s["cpu_seconds"] for s in stats),
+            }
+    if "session" in processes:
+        processes["session"]["cpu_seconds_per_interaction"] = processes["session"]["cpu_seconds"] / len(samples)
+
+    return {
+        "config": {
+            "users": args.users, "interactions": args.interactions, "think_time": args.think_time,
+            "schema": None if args.api_url else args.schema, "api_url": args.api_url,
+        },
+        "elapsed_seconds": elapsed,
+        "interactions_per_second": len(samples) / elapsed,
+        "latency": latency,
+        "db_connections": connections,
+        "processes": processes,
+        "errors": sorted({sample["error"] for sample in samples if sample["error"]}),
+    }
+
+
+def print_report(report):
+    config = report["config"]
+    print(f"📊 {report['latency']['all']['count']} interactions by {config['users']} users in "
+          f"{report['elapsed_seconds']:.1f}s ({report['interactions_per_second']:.2f}/s)")
+    for name, stats in report["latency"].items():
+        print(f"   {name:<9} n={stats['count']:<5} {format_latency(stats)}  errors {stats['errors']}")
+    for key, stats in report["db_connections"].items():
+        print(f"🔌 DB connections {key}: peak {stats['peak']}, mean {stats['mean']:.1f}")
+    for role, stats in report["processes"].items():
+        print(f"🖥️ {stats['count']} {role} processes: peak RSS {stats['peak_rss_mb']:.0f} MB, "
+              f"CPU mean {stats['mean_cpu_percent']:.0f}% / peak {stats['peak_cpu_percent']:.0f}%")
+    if "session" in report["processes"]:
+        print(f"   {report['processes']['session']['cpu_seconds_per_interaction']:.2f} CPU-seconds per interaction")
+    for error in report["errors"]:
+        print(f"❌ {error}")
+
+
+def compare(baseline, report, factor):
+    """Return the interactions whose p95 latency grew by more than `factor`."""
+    regressions = []
+    for name, stats in report["latency"].items():
+        before = baseline["latency"].get(name)
+        if before and stats["p95"] > factor * before["p95"]:
+            regressions.append(f"🐢 {name}: p95 {stats['p95']:.2f}s, baseline {before['p95']:.2f}s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Streamlit dashboard with concurrent sessions")
+    parser.add_argument("--users", type=int, default=20, help="Concurrent sessions, one process each")
+    parser.add_argument("--interactions", type=int, default=10, help="Filter changes per session")
+    parser.add_argument("--think-time", type=float, default=2.0, help="Mean seconds between interactions")
+    parser.add_argument("--ramp-up", type=float, default=10.0, help="Seconds over which sessions start")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Seconds allowed per script run")
+    parser.add_argument("--schema", default="plan_benchmark", help="Schema seeded by seed_db.py")
+    parser.add_argument("--api-url", help="Query the aggregate API instead of PostgreSQL")
+    parser.add_argument("--sample-interval", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write the report to this file")
+    parser.add_argument("--baseline", help="Report of an earlier run to compare p95 latencies with")
+    parser.add_argument("--factor", type=float, default=1.5, help="Allowed p95 growth over the baseline")
+    args = parser.parse_args()
+
+    # Inherited by the session processes
+    os.environ["DASHBOARD_API_URL"] = args.api_url or ""
+    if not args.api_url:
+        os.environ["DASHBOARD_SCHEMA"] = args.schema
+
+    options = {
+        "seed": args.seed, "ramp_up": args.ramp_up, "timeout": args.timeout,
+        "interactions": args.interactions, "think_time": args.think_time,
+    }
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    sessions = [context.Process(target=run_session, args=(i, options, results)) for i in range(args.users)]
+
+    started = time.perf_counter()
+    for session in sessions:
+        session.start()
+    sampler = ResourceSampler(args.sample_interval, [session.pid for session in sessions])
+    sampler.start()
+
+    samples = []
+    for _ in sessions:
+        _, session_samples = results.get()
+        samples.extend(session_samples)
+    elapsed = time.perf_counter() - started
+    sampler.stop()
+    for session in sessions:
+        session.join()
+
+    if not samples:
+        sys.exit("❌ No session completed an interaction.")
+    report = build_report(args, samples, sampler, elapsed)
+    print_report(report)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Report written to `{args.json}`.")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(json.load(f), report, args.factor)
+        for line in regressions:
+            print(line)
+        if regressions:
+            sys.exit(f"❌ {len(regressions)} latency regressions.")
+        print("✅ Latencies within the baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Compare the `fetch_data` backends of `dashboard/data_loader.py` on dashboard-sized results.
+
+Each query is fetched with every backend: wall time is the median of `--runs` runs, peak
+memory is traced (tracemalloc, which covers pandas and NumPy buffers) in one extra run,
+and the result size is the DataFrame's deep memory usage. Results the "copy" backend
+cannot decode (text or nullable columns) are marked, since it falls back to "pandas".
+
+    python benchmarks/seed_db.py --accidents 1000000
+    python benchmarks/fetch_benchmark.py --runs 5
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "dashboard"))
+
+import data_loader  # noqa: E402
+
+QUERIES = {
+    # Every plotted point, as the map layers read them
+    "points": """
+        SELECT latitude, longitude
+        FROM accident_summary
+        WHERE latitude IS NOT NULL AND longitude IS NOT NULL;
+    """,
+    # The density grid of get_accident_density
+    "density_cells": """
+        SELECT
+            (FLOOR(latitude / 0.0005) + 0.5) * 0.0005 AS lat,
+            (FLOOR(longitude / 0.0005) + 0.5) * 0.0005 AS lon,
+            COUNT(*) AS weight
+        FROM accident_summary
+        WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+        GROUP BY 1, 2;
+    """,
+    # Mixed fixed-width types: integers, dates and floats
+    "typed_rows": """
+        SELECT accident_id, accident_date, vehicle_count, casualty_count, temperature, precipitation
+        FROM accident_summary;
+    """,
+    # Text columns, which the copy backend leaves to pandas
+    "text_rows": """
+        SELECT location, borough, accident_severity
+        FROM accident_summary;
+    """,
+}
+
+
+def measure(query, backend, runs):
+    """Return (median seconds, peak traced bytes, result bytes, rows) of one query and backend."""
+    data_loader.fetch_data(query, backend=backend)  # Warm-up: connections, caches
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        df = data_loader.fetch_data(query, backend=backend)
+        timings.append(time.perf_counter() - started)
+    result_bytes = int(df.memory_usage(deep=True).sum())
+    rows = len(df)
+    del df
+
+    tracemalloc.start()
+    try:
+        df = data_loader.fetch_data(query, backend=backend)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del df
+    return statistics.median(timings), peak, result_bytes, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the data_loader fetch backends")
+    parser.add_argument("--schema", default="plan_benchmark", help="Schema seeded by seed_db.py")
+    parser.add_argument("--runs", type=int, default=5, help="Timed runs per query and backend")
+    parser.add_argument("--backends", nargs="+", default=list(data_loader.FETCH_BACKENDS),
+                        choices=data_loader.FETCH_BACKENDS)
+    parser.add_argument("--queries", nargs="+", default=list(QUERIES), choices=list(QUERIES))
+    args = parser.parse_args()
+
+    data_loader.get_db_settings()["options"] = f"-c search_path={args.schema}"
+    if "adbc" in args.backends and not data_loader._adbc_available():
+        args.backends.remove("adbc")
+
+    print(f"{'query':<14} {'backend':<8} {'rows':>10} {'seconds':>9} {'peak MB':>9} {'result MB':>10}")
+    for name in args.queries:
+        query = QUERIES[name]
+        for backend in args.backends:
+            seconds, peak, result_bytes, rows = measure(query, backend, args.runs)
+            falls_back = backend == "copy" and data_loader._fetch_binary_copy(query) is None
+            fallback = " (falls back to pandas)" if falls_back else ""
+            print(
+                f"{name:<14} {backend:<8} {rows:>10,} {seconds:>9.3f} "
+                f"{peak / 2**20:>9.1f} {result_bytes / 2**20:>10.1f}{fallback}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Check that the loader writes COPY rows PostgreSQL accepts for incomplete accidents.
+
+A raw chunk with missing coordinates, an unparsable date and malformed casualties /
+vehicles JSON goes through the pipeline's cleaning (`accident_cleaner.py`) and COPY
+serialization. Every missing value must be written as the COPY's NULL marker: an empty
+field is rejected by the JSONB and TIMESTAMP columns and fails the whole chunk. With
+`--db` the rows are also COPied into a temporary staging table (settings from DB_*).
+
+    python benchmarks/loader_check.py --db
+"""
+import argparse
+import io
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "airflow", "dags", "dlt"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pandas as pd  # noqa: E402
+
+from accident_cleaner import (  # noqa: E402
+    ACCIDENT_CSV_DTYPES, COPY_COLUMNS, COPY_NULL, clean_and_transform_data, write_copy_rows,
+)
+
+RAW_CSV = """id,lat,lon,location,date,severity,borough,casualties,vehicles
+1,,,,not a date,Slight,Camden,{'broken': ,[{'type': 'Car'
+2,51.5,-0.12,Strand,2020-01-01T08:30:00Z,Serious,City of Westminster,"[{'$type': 'x', 'age': 34}]","[{'type': 'Car'}]"
+3,51.4,,,2020-01-02T09:00:00Z,Slight,Lambeth,,
+"""
+# Rows of RAW_CSV -> columns that must be NULL
+EXPECTED_NULLS = {
+    0: {"lat", "lon", "location", "accident_date", "casualties", "vehicles"},
+    1: set(),
+    2: {"lon", "location", "casualties", "vehicles"},
+}
+
+
+def copy_rows():
+    """Clean RAW_CSV like the loader does and return its COPY text."""
+    chunk = pd.read_csv(io.StringIO(RAW_CSV), dtype=ACCIDENT_CSV_DTYPES)
+    chunk = clean_and_transform_data(chunk)
+    chunk["source_year"] = 2020
+    buffer = io.StringIO()
+    write_copy_rows(chunk, buffer)
+    return buffer.getvalue()
+
+
+def check_fields(text):
+    """Return the problems of the COPY text: empty fields, or NULLs other than expected."""
+    problems = []
+    for row, line in enumerate(text.splitlines()):
+        fields = dict(zip(COPY_COLUMNS, line.split("\t")))
+        empty = sorted(column for column, value in fields.items() if value == "")
+        if empty:
+            problems.append(f"row {row}: empty fields {empty}")
+        nulls = {column for column, value in fields.items() if value == COPY_NULL}
+        if nulls != EXPECTED_NULLS[row]:
+            problems.append(f"row {row}: NULL in {sorted(nulls)}, expected {sorted(EXPECTED_NULLS[row])}")
+    return problems
+
+
+def check_copy(text):
+    """COPY the rows into a temporary staging table. Returns the number of rows accepted."""
+    from accident_data_pipeline import _create_table_sql
+    from seed_db import connect_db
+
+    conn = connect_db()
+    try:
+        cur = conn.cursor()
+        cur.execute(_create_table_sql("pg_temp.loader_check"))
+        cur.copy_expert(
+            f"""COPY pg_temp.loader_check ({", ".join(COPY_COLUMNS)})
+                FROM STDIN WITH CSV DELIMITER E'\\t' NULL '{COPY_NULL}' QUOTE '"';""",
+            io.StringIO(text),
+        )
+        cur.execute("SELECT COUNT(*) FROM pg_temp.loader_check;")
+        return cur.fetchone()[0]
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the loader's COPY rows for incomplete accidents")
+    parser.add_argument("--db", action="store_true", help="Also COPY the rows into PostgreSQL")
+    args = parser.parse_args()
+
+    text = copy_rows()
+    problems = check_fields(text)
+    for problem in problems:
+        print(f"❌ {problem}")
+    if problems:
+        sys.exit(f"❌ {len(problems)} problems in the COPY rows.")
+    print(f"✅ {len(EXPECTED_NULLS)} rows with missing values written as {COPY_NULL}.")
+
+    if args.db:
+        rows = check_copy(text)
+        print(f"✅ PostgreSQL accepted {rows} rows.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+"""Latency statistics shared by the load tests (`api_loadtest.py`, `dashboard_loadtest.py`)."""
+import statistics
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty sequence."""
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def latency_summary(seconds, errors=0):
+    """Summarize latencies in seconds: {"count", "errors", "mean", "p50", "p95", "p99", "max"}."""
+    return {
+        "count": len(seconds),
+        "errors": errors,
+        "mean": statistics.mean(seconds),
+        "p50": percentile(seconds, 50),
+        "p95": percentile(seconds, 95),
+        "p99": percentile(seconds, 99),
+        "max": max(seconds),
+    }
+
+
+def format_latency(summary, digits=2):
+    """One report line of a latency summary, e.g. "mean 0.41s  p50 0.38s  ...  max 1.20s"."""
+    return "  ".join(f"{key} {summary[key]:.{digits}f}s" for key in ("mean", "p50", "p95", "p99", "max"))
@@ -0,0 +1,237 @@
+"""Query-plan regression harness for the dashboard queries in `dashboard/data_loader.py`.
+
+Every public `get_*` function of data_loader is called with a set of filter combinations,
+and each SQL statement it sends is also run under `EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)`.
+The plan shape, Seq Scans, buffer counts, temp (spilled) blocks and timings are compared
+with a stored baseline. The run fails when a query newly scans a large table sequentially,
+reads more than `--buffer-factor` times its baseline buffers, or starts spilling to disk.
+
+    python benchmarks/seed_db.py --accidents 1000000
+    python benchmarks/query_plans.py --update     # record the baseline
+    python benchmarks/query_plans.py              # compare, exit code 1 on regressions
+"""
+import argparse
+import inspect
+import json
+import os
+import statistics
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "dashboard"))
+
+import data_loader  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmarks", "baselines", "query_plans.json")
+
+# Sidebar selections every filterable function is run with
+FILTER_CASES = {
+    "all": {},
+    "year": {"year": 2015},
+    "year_borough": {"year": 2015, "borough": "Camden"},
+    "severity": {"severity": "Fatal"},
+    "vehicle": {"vehicle_type": "PedalCycle"},
+}
+
+# Extra keyword arguments per function, each run as its own case
+EXTRA_ARGS = {
+    "get_time_series": [{"granularity": granularity} for granularity in data_loader.TIME_SERIES_ROLLUPS],
+    "get_weather_accident_trends": [{}, {"by_severity": True}],
+}
+
+# data_loader helpers that are not dashboard queries
+NOT_QUERIES = {"get_db_settings", "get_pool"}
+
+
+def query_functions():
+    """Return the public data_loader query functions, by name."""
+    return {
+        name: function
+        for name, function in inspect.getmembers(data_loader, inspect.isfunction)
+        if name.startswith("get_") and name not in NOT_QUERIES and function.__module__ == data_loader.__name__
+    }
+
+
+def cases():
+    """Yield (case name, function, kwargs) for every function and argument combination."""
+    for name, function in sorted(query_functions().items()):
+        parameters = inspect.signature(function).parameters
+        takes_filters = "filters" in parameters
+        extras = EXTRA_ARGS.get(name, [{}])
+        if "approximate" in parameters:
+            extras = extras + [dict(extra, approximate=True) for extra in extras]
+        for extra in extras:
+            for filter_name, filters in (FILTER_CASES.items() if takes_filters else [("all", None)]):
+                kwargs = dict(extra, **({"filters": filters} if takes_filters else {}))
+                label = ",".join([filter_name] + [f"{key}={value}" for key, value in extra.items()])
+                yield f"{name}({label})", function, kwargs
+
+
+def explain(query):
+    """Run a query under EXPLAIN ANALYZE on a pooled connection and return the JSON plan."""
+    pool = data_loader.get_pool()
+    conn = pool.getconn()
+    try:
+        cur = conn.cursor()
+        cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + query.strip().rstrip(";"))
+        plan = cur.fetchone()[0][0]
+        cur.close()
+        return plan
+    finally:
+        conn.rollback()
+        pool.putconn(conn)
+
+
+def _walk(node, depth=0):
+    yield depth, node
+    for child in node.get("Plans", []):
+        yield from _walk(child, depth + 1)
+
+
+def summarize(plan, query):
+    """Reduce an EXPLAIN JSON plan to what the regression checks compare."""
+    root = plan["Plan"]
+    shape, seq_scans = [], []
+    for depth, node in _walk(root):
+        relation = node.get("Relation Name")
+        shape.append("  " * depth + node["Node Type"] + (f" on {relation}" if relation else ""))
+        if node["Node Type"] == "Seq Scan":
+            seq_scans.append(relation)
+    return {
+        "query": " ".join(query.split()),
+        "shape": shape,
+        "seq_scans": sorted(seq_scans),
+        # Buffer counts of the root node include every child node
+        "buffers": root.get("Shared Hit Blocks", 0) + root.get("Shared Read Blocks", 0),
+        "temp_blocks": root.get("Temp Read Blocks", 0) + root.get("Temp Written Blocks", 0),
+        "execution_ms": plan["Execution Time"],
+        "planning_ms": plan["Planning Time"],
+    }
+
+
+def capture(runs=3):
+    """Run every case and return {"<case>#<n>": summary} for the n-th query of each case.
+
+    The first run warms the cache; timings are the median of the following `runs`.
+    """
+    original_fetch_data = data_loader.fetch_data
+    captured = []
+
+    def explaining_fetch_data(query, backend=None):
+        captured.append((query, explain(query)))
+        return original_fetch_data(query, backend=backend)
+
+    results = {}
+    data_loader.fetch_data = explaining_fetch_data
+    try:
+        for case, function, kwargs in cases():
+            function(**kwargs)  # Warm-up
+            summaries = []
+            for _ in range(runs):
+                captured.clear()
+                function(**kwargs)
+                summaries.append([summarize(plan, query) for query, plan in captured])
+
+            for index, summary in enumerate(summaries[-1]):
+                summary["execution_ms"] = statistics.median(run[index]["execution_ms"] for run in summaries)
+                summary["planning_ms"] = statistics.median(run[index]["planning_ms"] for run in summaries)
+                results[f"{case}#{index}"] = summary
+            print(f"🔎 {case}: {len(summaries[-1])} queries")
+    finally:
+        data_loader.fetch_data = original_fetch_data
+    return results
+
+
+def table_rows():
+    """Return the planner's row estimate of every table visible on the search path."""
+    df = data_loader.fetch_data(
+        """
+        SELECT c.relname, c.reltuples
+        FROM pg_class c
+        WHERE c.relkind IN ('r', 'p', 'm') AND pg_table_is_visible(c.oid);
+        """
+    )
+    return {row.relname: int(row.reltuples) for row in df.itertuples()}
+
+
+def compare(baseline, current, rows, large_rows, buffer_factor, min_buffers, time_factor=None):
+    """Return (regressions, notes) of the current results against the baseline."""
+    regressions, notes = [], []
+    for key, now in sorted(current.items()):
+        before = baseline.get(key)
+        if before is None:
+            notes.append(f"🆕 {key}: not in the baseline")
+            continue
+        if before["query"] != now["query"]:
+            notes.append(f"✏️ {key}: SQL changed since the baseline")
+
+        for relation in sorted(set(now["seq_scans"]) - set(before["seq_scans"])):
+            if rows.get(relation, 0) >= large_rows:
+                regressions.append(f"🐢 {key}: new Seq Scan on {relation} (~{rows[relation]:,} rows)")
+            else:
+                notes.append(f"ℹ️ {key}: new Seq Scan on small table {relation}")
+
+        if now["buffers"] > buffer_factor * max(before["buffers"], min_buffers):
+            regressions.append(f"📈 {key}: {now['buffers']:,} buffers, baseline {before['buffers']:,}")
+        if now["temp_blocks"] and not before["temp_blocks"]:
+            regressions.append(f"💾 {key}: now spills {now['temp_blocks']:,} temp blocks to disk")
+        if time_factor and now["execution_ms"] > time_factor * before["execution_ms"]:
+            regressions.append(
+                f"⏱️ {key}: {now['execution_ms']:.1f} ms, baseline {before['execution_ms']:.1f} ms"
+            )
+        if before["shape"] != now["shape"]:
+            notes.append(f"🔀 {key}: plan shape changed\n      " + "\n      ".join(now["shape"]))
+
+    for key in sorted(set(baseline) - set(current)):
+        notes.append(f"🗑️ {key}: in the baseline but no longer run")
+    return regressions, notes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check data_loader query plans against a baseline")
+    parser.add_argument("--schema", default="plan_benchmark", help="Schema seeded by seed_db.py")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--update", action="store_true", help="Record the current plans as the baseline")
+    parser.add_argument("--runs", type=int, default=3, help="Measured runs per case")
+    parser.add_argument("--large-rows", type=int, default=50_000, help="Tables from this size must not be Seq Scanned")
+    parser.add_argument("--buffer-factor", type=float, default=2.0)
+    parser.add_argument("--min-buffers", type=int, default=100, help="Ignore buffer growth below this baseline")
+    parser.add_argument("--time-factor", type=float, help="Also fail when execution time grows by this factor")
+    args = parser.parse_args()
+
+    # Every pooled connection, including the EXPLAIN ones, reads the seeded schema
+    data_loader.get_db_settings()["options"] = f"-c search_path={args.schema}"
+
+    rows = table_rows()
+    if not rows.get("accident_summary"):
+        sys.exit(f"❌ No seeded accident_summary in schema `{args.schema}`; run benchmarks/seed_db.py first.")
+
+    current = capture(runs=args.runs)
+    metadata = {"schema": args.schema, "accident_summary_rows": rows["accident_summary"]}
+
+    if args.update:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump({"metadata": metadata, "queries": current}, f, indent=2, sort_keys=True)
+        print(f"💾 Baseline of {len(current)} queries written to `{args.baseline}`.")
+        return
+
+    if not os.path.exists(args.baseline):
+        sys.exit(f"❌ No baseline at `{args.baseline}`; record one with --update.")
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline["metadata"] != metadata:
+        print(f"⚠️ Baseline was recorded on {baseline['metadata']}, this run uses {metadata}.")
+
+    regressions, notes = compare(
+        baseline["queries"], current, rows, args.large_rows, args.buffer_factor, args.min_buffers, args.time_factor
+    )
+    for line in notes + regressions:
+        print(line)
+    if regressions:
+        sys.exit(f"❌ {len(regressions)} query plan regressions.")
+    print(f"✅ {len(current)} queries match the baseline.")
+
+
+if __name__ == "__main__":
+    main()
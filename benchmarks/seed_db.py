@@ -0,0 +1,227 @@
+"""Seed a PostgreSQL schema with synthetic dashboard tables for query-plan benchmarks.
+
+The tables have the columns the dashboard reads from the dbt core models, the indexes
+declared in the models' `config(indexes=...)`, and realistic value distributions, so
+plans match production at a chosen scale. Everything lives in its own schema (default
+`plan_benchmark`), leaving the real tables alone. Connection settings come from DB_*:
+
+    python benchmarks/seed_db.py --accidents 1000000
+"""
+import argparse
+import ast
+import os
+import time
+
+import psycopg2
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CORE_MODELS_DIR = os.path.join(ROOT, "airflow", "dags", "dbt", "models", "core")
+
+BOROUGHS = [
+    "Barking and Dagenham", "Barnet", "Bexley", "Brent", "Bromley", "Camden", "City of London",
+    "City of Westminster", "Croydon", "Ealing", "Enfield", "Greenwich", "Hackney",
+    "Hammersmith and Fulham", "Haringey", "Harrow", "Havering", "Hillingdon", "Hounslow",
+    "Islington", "Kensington and Chelsea", "Kingston", "Lambeth", "Lewisham", "Merton", "Newham",
+    "Redbridge", "Richmond upon Thames", "Southwark", "Sutton", "Tower Hamlets", "Waltham Forest",
+    "Wandsworth",
+]
+VEHICLE_TYPES = ["Car", "PedalCycle", "Motorcycle", "BusOrCoach", "GoodsVehicle", "Taxi", "Other"]
+
+# Model name -> DDL filled from the synthetic accident_summary, in dependency order
+TABLES = {
+    "accident_summary": """
+        CREATE TABLE accident_summary AS
+        WITH accidents AS (
+            SELECT
+                id AS accident_id,
+                DATE '{start_year}-01-01' + (random() * (DATE '{end_year}-12-31' - DATE '{start_year}-01-01'))::INTEGER
+                    AS accident_date,
+                'Street ' || (random() * 20000)::INTEGER AS location,
+                -0.51 + random() * 0.85 AS longitude,
+                51.28 + random() * 0.41 AS latitude,
+                (ARRAY{boroughs})[1 + (random() * {borough_count})::INTEGER % {borough_count}] AS borough,
+                CASE WHEN random() < 0.85 THEN 'Slight' WHEN random() < 0.93 THEN 'Serious' ELSE 'Fatal' END
+                    AS accident_severity,
+                1 + (random() * 2)::INTEGER AS vehicle_count,
+                1 + (random() * 2)::INTEGER AS casualty_count,
+                5 + random() * 20 AS temperature,
+                50 + random() * 50 AS humidity,
+                random() * 10 AS wind_speed,
+                CASE WHEN random() < 0.4 THEN random() * 10 ELSE 0 END AS precipitation,
+                random() * 12 AS sunshine_duration,
+                CASE WHEN random() < 0.01 THEN random() * 5 ELSE 0 END AS snow_depth
+            FROM generate_series(1, {accidents}) AS id
+        )
+        SELECT
+            a.*,
+            ARRAY(
+                SELECT (ARRAY{vehicle_types})[1 + (random() * {vehicle_type_count})::INTEGER % {vehicle_type_count}]
+                FROM generate_series(1, a.vehicle_count)
+                ORDER BY 1
+            ) AS vehicle_types
+        FROM accidents a;
+    """,
+    "vehicles": """
+        CREATE TABLE vehicles AS
+        SELECT
+            CAST(EXTRACT(YEAR FROM a.accident_date) AS VARCHAR) || '-' || CAST(a.accident_id AS VARCHAR)
+                AS unique_accident_id,
+            a.accident_id,
+            vehicle_type
+        FROM accident_summary a, UNNEST(a.vehicle_types) AS vehicle_type;
+    """,
+    "casualty_age_summary": """
+        CREATE TABLE casualty_age_summary AS
+        SELECT
+            CAST(EXTRACT(YEAR FROM a.accident_date) AS INTEGER) AS accident_year,
+            a.borough,
+            a.accident_severity,
+            a.accident_severity AS casualty_severity,
+            (ARRAY['0-10', '11-20', '21-30', '31-40', '41-50', '51-60', '61-70', '70+', 'Unknown'])
+                [1 + (a.accident_id % 9)] AS age_group,
+            SUM(a.casualty_count) AS casualty_count
+        FROM accident_summary a
+        GROUP BY 1, 2, 3, 4, 5;
+    """,
+    "hotspots": """
+        CREATE TABLE hotspots AS
+        SELECT location, borough, COUNT(accident_id) AS accident_count
+        FROM accident_summary
+        GROUP BY location, borough;
+    """,
+    "accident_summary_sample": """
+        CREATE TABLE accident_summary_sample AS
+        WITH ranked AS (
+            SELECT
+                *,
+                CAST(EXTRACT(YEAR FROM accident_date) AS INTEGER) AS accident_year,
+                COUNT(*) OVER strata AS stratum_rows,
+                ROW_NUMBER() OVER (strata ORDER BY MD5(CAST(accident_id AS VARCHAR))) AS stratum_rank
+            FROM accident_summary
+            WINDOW strata AS (PARTITION BY EXTRACT(YEAR FROM accident_date), borough, accident_severity)
+        ), sized AS (
+            SELECT *, LEAST(stratum_rows, GREATEST(30, CEIL(stratum_rows * 0.02))) AS stratum_sample_rows
+            FROM ranked
+        )
+        SELECT
+            accident_id, accident_date, accident_year, location, latitude, longitude, borough,
+            accident_severity, precipitation, snow_depth, sunshine_duration, vehicle_types, stratum_rows,
+            CAST(stratum_sample_rows AS INTEGER) AS stratum_sample_rows,
+            CAST(stratum_rows AS DOUBLE PRECISION) / stratum_sample_rows AS sampling_weight
+        FROM sized
+        WHERE stratum_rank <= stratum_sample_rows;
+    """,
+    "accidents_daily": """
+        CREATE TABLE accidents_daily AS
+        SELECT
+            accident_date AS period_start,
+            CAST(EXTRACT(YEAR FROM accident_date) AS INTEGER) AS accident_year,
+            CAST(EXTRACT(DOW FROM accident_date) AS INTEGER) AS day_of_week,
+            borough,
+            accident_severity,
+            COUNT(accident_id) AS accident_count
+        FROM accident_summary
+        GROUP BY 1, 2, 3, 4, 5;
+    """,
+    "accidents_weekly": """
+        CREATE TABLE accidents_weekly AS
+        SELECT
+            GREATEST(CAST(DATE_TRUNC('week', period_start) AS DATE), MAKE_DATE(accident_year, 1, 1)) AS period_start,
+            accident_year, borough, accident_severity, SUM(accident_count) AS accident_count
+        FROM accidents_daily
+        GROUP BY 1, 2, 3, 4;
+    """,
+    "accidents_monthly": """
+        CREATE TABLE accidents_monthly AS
+        SELECT
+            CAST(DATE_TRUNC('month', period_start) AS DATE) AS period_start,
+            accident_year, borough, accident_severity, SUM(accident_count) AS accident_count
+        FROM accidents_daily
+        GROUP BY 1, 2, 3, 4;
+    """,
+    "accidents_yearly": """
+        CREATE TABLE accidents_yearly AS
+        SELECT accident_year, borough, accident_severity, SUM(accident_count) AS accident_count
+        FROM accidents_daily
+        GROUP BY 1, 2, 3;
+    """,
+}
+
+
+def _sql_array(values):
+    return "[" + ", ".join("'" + value.replace("'", "''") + "'" for value in values) + "]"
+
+
+def model_indexes(model):
+    """Return the `indexes` declared in a core model's `config()`, as dbt would create them."""
+    with open(os.path.join(CORE_MODELS_DIR, f"{model}.sql")) as f:
+        sql = f.read()
+
+    start = sql.find("indexes=")
+    if start == -1:
+        return []
+    start = sql.index("[", start)
+    depth = 0
+    for end in range(start, len(sql)):
+        depth += {"[": 1, "]": -1}.get(sql[end], 0)
+        if depth == 0:
+            return ast.literal_eval(sql[start:end + 1])
+    raise ValueError(f"Unbalanced indexes config in `{model}.sql`")
+
+
+def seed(conn, schema, accidents, start_year, end_year):
+    """(Re)create the benchmark schema and fill every table, with its dbt indexes."""
+    params = {
+        "accidents": int(accidents),
+        "start_year": int(start_year),
+        "end_year": int(end_year),
+        "boroughs": _sql_array(BOROUGHS),
+        "borough_count": len(BOROUGHS),
+        "vehicle_types": _sql_array(VEHICLE_TYPES),
+        "vehicle_type_count": len(VEHICLE_TYPES),
+    }
+    cur = conn.cursor()
+    cur.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE; CREATE SCHEMA {schema}; SET search_path TO {schema};")
+
+    for model, ddl in TABLES.items():
+        started = time.perf_counter()
+        cur.execute(ddl.format(**params))
+        for index in model_indexes(model):
+            columns = ", ".join(index["columns"])
+            unique = "UNIQUE " if index.get("unique") else ""
+            cur.execute(f"CREATE {unique}INDEX ON {model} USING {index.get('type', 'btree')} ({columns});")
+        cur.execute(f"ANALYZE {model};")
+        cur.execute(f"SELECT COUNT(*) FROM {model};")
+        print(f"🌱 {schema}.{model}: {cur.fetchone()[0]:,} rows in {time.perf_counter() - started:.1f}s")
+
+    conn.commit()
+    cur.close()
+
+
+def connect_db():
+    return psycopg2.connect(
+        host=os.getenv("DB_HOST", "localhost"),
+        port=os.getenv("DB_PORT", "5432"),
+        dbname=os.getenv("DB_NAME", "tfl_accidents"),
+        user=os.getenv("DB_USER", "admin"),
+        password=os.getenv("DB_PASSWORD", "admin"),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed synthetic dashboard tables for query-plan benchmarks")
+    parser.add_argument("--schema", default="plan_benchmark", help="Schema to (re)create")
+    parser.add_argument("--accidents", type=int, default=1_000_000, help="Rows of accident_summary")
+    parser.add_argument("--start-year", type=int, default=2005)
+    parser.add_argument("--end-year", type=int, default=2019)
+    args = parser.parse_args()
+
+    conn = connect_db()
+    try:
+        seed(conn, args.schema, args.accidents, args.start_year, args.end_year)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
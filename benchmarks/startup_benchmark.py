@@ -0,0 +1,115 @@
+"""Measure import and DAG-parse cost of the pipeline and dashboard modules.
+
+Every module is imported in a fresh interpreter with no database or cloud settings in the
+environment, so a module that connects, reads config or creates folders at import time
+shows up as slow (or fails) here. Example, from the repository root:
+
+    python benchmarks/startup_benchmark.py --repeat 5 --top 10
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DAGS_DIR = os.path.join(ROOT, "airflow", "dags")
+DLT_DIR = os.path.join(DAGS_DIR, "dlt")
+DASHBOARD_DIR = os.path.join(ROOT, "dashboard")
+
+# Module name -> directory it is imported from
+MODULES = {
+    "accident_data_pipeline": DLT_DIR,
+    "accident_cleaner": DLT_DIR,
+    "weather_loader": DLT_DIR,
+    "gcs_uploader": DLT_DIR,
+    "dbt_runner": DLT_DIR,
+    "data_loader": DASHBOARD_DIR,
+    "api_client": DASHBOARD_DIR,
+}
+
+# Only what an interpreter needs: no DB_*, GCS_* or DASHBOARD_API_URL settings
+KEEP_ENV = ("PATH", "HOME", "LANG", "LC_ALL", "VIRTUAL_ENV", "CONDA_PREFIX", "AIRFLOW_HOME")
+
+
+def _clean_env():
+    return {key: value for key, value in os.environ.items() if key in KEEP_ENV}
+
+
+def _run(code, cwd, extra_args=()):
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, *extra_args, "-c", code], cwd=cwd, env=_clean_env(), capture_output=True, text=True
+    )
+    return time.perf_counter() - started, result
+
+
+def time_import(module, cwd, repeat):
+    """Return the wall-clock times of `import module` in fresh interpreters, or the error."""
+    code = f"import sys; sys.path.insert(0, {cwd!r}); import {module}"
+    timings = []
+    for _ in range(repeat):
+        elapsed, result = _run(code, cwd)
+        if result.returncode != 0:
+            return None, result.stderr.strip().splitlines()[-1]
+        timings.append(elapsed)
+    return timings, None
+
+
+def top_imports(module, cwd, top):
+    """Return the `top` slowest imports (cumulative microseconds) reported by `-X importtime`."""
+    code = f"import sys; sys.path.insert(0, {cwd!r}); import {module}"
+    _, result = _run(code, cwd, extra_args=("-X", "importtime"))
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line.split("|", 2)
+        rows.append((int(cumulative_us), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def time_dag_parse(repeat):
+    """Return the wall-clock times of parsing the DAG folder with a DagBag, or the error."""
+    code = (
+        "from airflow.models import DagBag; "
+        f"bag = DagBag({DAGS_DIR!r}, include_examples=False); "
+        "assert not bag.import_errors, bag.import_errors"
+    )
+    timings = []
+    for _ in range(repeat):
+        elapsed, result = _run(code, DAGS_DIR)
+        if result.returncode != 0:
+            return None, result.stderr.strip().splitlines()[-1]
+        timings.append(elapsed)
+    return timings, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark module import and DAG parse time")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per module")
+    parser.add_argument("--top", type=int, default=5, help="Slowest imports to list per module")
+    args = parser.parse_args()
+
+    baseline, _ = _run("pass", ROOT)
+    print(f"🐍 Bare interpreter start: {baseline:.3f}s")
+
+    for module, cwd in MODULES.items():
+        timings, error = time_import(module, cwd, args.repeat)
+        if error:
+            print(f"❌ {module}: {error}")
+            continue
+        print(f"📦 {module}: median {statistics.median(timings):.3f}s, min {min(timings):.3f}s")
+        for cumulative_us, name in top_imports(module, cwd, args.top):
+            print(f"     {cumulative_us / 1000:8.1f} ms  {name}")
+
+    timings, error = time_dag_parse(args.repeat)
+    if error:
+        print(f"⚠️ DAG parse not measured: {error}")
+    else:
+        print(f"🗂️ DagBag parse: median {statistics.median(timings):.3f}s, min {min(timings):.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import os
+from io import BytesIO, StringIO
+
+import numpy as np
+import pandas as pd
+import requests
+
+# ✅ Aggregate API (api_server.py). When unset the dashboard queries PostgreSQL directly.
+API_URL = os.getenv("DASHBOARD_API_URL", "").rstrip("/")
+API_TIMEOUT = int(os.getenv("DASHBOARD_API_TIMEOUT", "60"))
+# Address of the same API as seen from the viewer's browser, for download links
+PUBLIC_API_URL = os.getenv("DASHBOARD_API_PUBLIC_URL", "http://localhost:8000" if API_URL else "").rstrip("/")
+
+try:
+    import pyarrow  # noqa: F401
+    RESPONSE_FORMAT = "arrow"
+except ImportError:
+    RESPONSE_FORMAT = "json"
+
+_session = requests.Session()
+
+
+def fetch_aggregate(name, filters=None, **params):
+    """Fetch one aggregate from the API as a DataFrame (empty on failure, like `fetch_data`)."""
+    query = {key: value for key, value in (filters or {}).items() if value is not None}
+    query.update({key: str(value).lower() if isinstance(value, bool) else value for key, value in params.items()})
+    query["format"] = RESPONSE_FORMAT
+    try:
+        response = _session.get(f"{API_URL}/aggregates/{name}", params=query, timeout=API_TIMEOUT)
+        response.raise_for_status()
+    except requests.RequestException as e:
+        print(f"Aggregate API error: {e}")
+        return pd.DataFrame()
+
+    if RESPONSE_FORMAT == "arrow":
+        import pyarrow as pa
+        return pa.ipc.open_stream(BytesIO(response.content)).read_pandas()
+    return pd.read_json(StringIO(response.text), orient="split")
+
+
+def export_url(filters=None, fmt="csv"):
+    """Download link of the filtered accidents streamed by the API, or None without an API."""
+    if not PUBLIC_API_URL:
+        return None
+    query = {key: value for key, value in (filters or {}).items() if value is not None}
+    query["format"] = fmt
+    return requests.Request("GET", f"{PUBLIC_API_URL}/export", params=query).prepare().url
+
+
+if API_URL:
+    def get_filter_options():
+        return fetch_aggregate("filter_options")
+
+    def get_time_series(granularity, filters=None):
+        return fetch_aggregate("time_series", filters, granularity=granularity)
+
+    def get_monthly_trends(filters=None):
+        return fetch_aggregate("monthly_trends", filters)
+
+    def get_top_hotspots():
+        return fetch_aggregate("top_hotspots")
+
+    def get_top_accident_prone_streets():
+        return fetch_aggregate("top_accident_prone_streets")
+
+    def get_severity_breakdown(filters=None, approximate=False):
+        return fetch_aggregate("severity_breakdown", filters, approximate=approximate)
+
+    def get_transport_mode_distribution(filters=None, approximate=False):
+        return fetch_aggregate("transport_mode_distribution", filters, approximate=approximate)
+
+    def get_borough_summary(filters=None, approximate=False):
+        return fetch_aggregate("borough_summary", filters, approximate=approximate)
+
+    def get_accident_density(filters=None, approximate=False):
+        df = fetch_aggregate("accident_density", filters, approximate=approximate)
+        if df.empty:
+            empty = np.empty(0, dtype=np.float32)
+            return empty, empty, empty
+        return tuple(df[column].to_numpy(dtype=np.float32) for column in ("lat", "lon", "weight"))
+
+    def get_weather_accident_trends(filters=None, by_severity=False, approximate=False):
+        return fetch_aggregate("weather_accident_trends", filters, by_severity=by_severity, approximate=approximate)
+
+    def get_weekday_vs_weekend_trends(filters=None):
+        return fetch_aggregate("weekday_vs_weekend_trends", filters)
+
+    def get_high_risk_days(filters=None):
+        return fetch_aggregate("high_risk_days", filters)
+
+    def get_accidents_by_age_group(filters=None):
+        return fetch_aggregate("accidents_by_age_group", filters)
+
+    def get_fatalities_by_age(filters=None):
+        return fetch_aggregate("fatalities_by_age", filters)
+else:
+    from data_loader import (  # noqa: F401
+        get_filter_options,
+        get_time_series,
+        get_monthly_trends,
+        get_top_hotspots,
+        get_top_accident_prone_streets,
+        get_severity_breakdown,
+        get_transport_mode_distribution,
+        get_borough_summary,
+        get_accident_density,
+        get_weather_accident_trends,
+        get_weekday_vs_weekend_trends,
+        get_high_risk_days,
+        get_accidents_by_age_group,
+        get_fatalities_by_age,
+    )
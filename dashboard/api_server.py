@@ -0,0 +1,363 @@
+"""Aggregate API serving the dashboard queries to every Streamlit session.
+
+One process holds one connection pool (data_loader) and one result cache, and
+identical requests arriving together are answered by a single query.
+
+Run with: uvicorn api_server:app --host 0.0.0.0 --port 8000
+"""
+import asyncio
+import functools
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+import pandas as pd
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+from starlette.background import BackgroundTask
+from pydantic import BaseModel
+
+import data_loader
+
+# Results only change when the pipeline runs, which invalidates and re-warms the cache
+CACHE_TTL_SECONDS = int(os.getenv("API_CACHE_TTL", "86400"))
+CACHE_MAX_ENTRIES = int(os.getenv("API_CACHE_MAX_ENTRIES", "2048"))
+# Streamed exports each hold a pooled connection for their whole duration
+EXPORT_MAX_CONCURRENT = int(os.getenv("API_EXPORT_MAX_CONCURRENT", "2"))
+
+
+def _approximate(params):
+    return params.get("approximate") == "true"
+
+
+def _density_frame(filters, params):
+    lat, lon, weights = data_loader.get_accident_density(filters, approximate=_approximate(params))
+    return pd.DataFrame({"lat": lat, "lon": lon, "weight": weights})
+
+
+# Endpoint name -> function(filters, params) returning a DataFrame
+AGGREGATES = {
+    "filter_options": lambda filters, params: data_loader.get_filter_options(),
+    "time_series": lambda filters, params: data_loader.get_time_series(params.get("granularity", "year"), filters),
+    "monthly_trends": lambda filters, params: data_loader.get_monthly_trends(filters),
+    "top_hotspots": lambda filters, params: data_loader.get_top_hotspots(),
+    "top_accident_prone_streets": lambda filters, params: data_loader.get_top_accident_prone_streets(),
+    "severity_breakdown": lambda filters, params: data_loader.get_severity_breakdown(
+        filters, approximate=_approximate(params)
+    ),
+    "transport_mode_distribution": lambda filters, params: data_loader.get_transport_mode_distribution(
+        filters, approximate=_approximate(params)
+    ),
+    "borough_summary": lambda filters, params: data_loader.get_borough_summary(
+        filters, approximate=_approximate(params)
+    ),
+    "accident_density": _density_frame,
+    "weather_accident_trends": lambda filters, params: data_loader.get_weather_accident_trends(
+        filters, by_severity=params.get("by_severity") == "true", approximate=_approximate(params)
+    ),
+    "weekday_vs_weekend_trends": lambda filters, params: data_loader.get_weekday_vs_weekend_trends(filters),
+    "high_risk_days": lambda filters, params: data_loader.get_high_risk_days(filters),
+    "accidents_by_age_group": lambda filters, params: data_loader.get_accidents_by_age_group(filters),
+    "fatalities_by_age": lambda filters, params: data_loader.get_fatalities_by_age(filters),
+}
+
+# Query parameters that change the result besides the filters
+AGGREGATE_PARAMS = ("granularity", "by_severity", "approximate")
+
+# Aggregates that ignore the filters, cached once for every selection
+UNFILTERED_AGGREGATES = {"filter_options", "top_hotspots", "top_accident_prone_streets"}
+
+# Requested once per dashboard page view, so its requests count the views per selection
+PAGE_VIEW_AGGREGATE = "monthly_trends"
+
+
+def page_aggregates(filters):
+    """Yield the (name, params) requests app.py makes for one page with these filters."""
+    yield "filter_options", {}
+    yield "monthly_trends", {}
+    yield "top_accident_prone_streets", {}
+    yield "weekday_vs_weekend_trends", {}
+    yield "high_risk_days", {}
+    yield "accidents_by_age_group", {}
+    yield "fatalities_by_age", {}
+    full_table = ["severity_breakdown", "transport_mode_distribution", "accident_density"]
+    if not filters["borough"]:
+        full_table.append("borough_summary")
+    variants = [{}, {"by_severity": "true"}]
+    for approximate in ([False, True] if filters["year"] is None else [False]):  # Fast preview
+        extra = {"approximate": "true"} if approximate else {}
+        for name in full_table:
+            yield name, dict(extra)
+        for params in variants:
+            yield "weather_accident_trends", dict(params, **extra)
+
+
+class ResultCache:
+    """LRU cache of query results with a TTL, collapsing concurrent identical requests."""
+
+    def __init__(self, ttl=CACHE_TTL_SECONDS, max_entries=CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (stored_at, DataFrame)
+        self._in_flight = {}  # key -> asyncio.Future shared by every waiting request
+        self._generation = 0  # Bumped by clear(), so results computed before it are not stored
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, value = entry
+        if time.monotonic() - stored_at > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _put(self, key, value):
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_or_compute(self, key, compute):
+        """Return the cached value, or run `compute` in the executor once for all concurrent callers."""
+        value = self._get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        if key in self._in_flight:
+            self.hits += 1
+            return await asyncio.shield(self._in_flight[key])
+
+        self.misses += 1
+        generation = self._generation
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(executor, compute)
+        self._in_flight[key] = future
+        try:
+            value = await future
+            # Failed queries come back as frames without columns: don't pin them. Empty
+            # results are cached like any other, they are the cheapest to serve again.
+            if len(value.columns) and generation == self._generation:
+                self._put(key, value)
+            return value
+        finally:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+    def clear(self):
+        self._entries.clear()
+        self._in_flight.clear()
+        self._generation += 1
+
+    def stats(self):
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+# Queries run in threads, never more than the connection pool can serve
+executor = ThreadPoolExecutor(max_workers=data_loader.DB_POOL_MAX)
+cache = ResultCache()
+usage = Counter()  # (year, borough, severity, vehicle_type) -> page views since the API started
+export_slots = threading.BoundedSemaphore(EXPORT_MAX_CONCURRENT)  # Leave connections to the dashboard
+app = FastAPI(title="TfL accidents aggregate API")
+
+
+def _filters(
+    year: Optional[int] = None,
+    borough: Optional[str] = None,
+    severity: Optional[str] = None,
+    vehicle_type: Optional[str] = None,
+):
+    return {"year": year, "borough": borough or None, "severity": severity or None, "vehicle_type": vehicle_type or None}
+
+
+def _cache_key(name, filters, params):
+    """Normalize a request into its cache key and the (filters, params) to compute it with."""
+    if name in UNFILTERED_AGGREGATES:
+        filters = _filters()
+    params = {key: value for key, value in params.items() if value != "false"}  # Same as absent
+    return (name, tuple(sorted(filters.items())), tuple(sorted(params.items()))), filters, params
+
+
+def _cached_aggregate(name, filters, params):
+    """Return an aggregate through the shared cache."""
+    key, filters, params = _cache_key(name, filters, params)
+    return cache.get_or_compute(key, functools.partial(AGGREGATES[name], filters, params))
+
+
+class Selection(BaseModel):
+    year: Optional[int] = None
+    borough: Optional[str] = None
+    severity: Optional[str] = None
+    vehicle_type: Optional[str] = None
+
+
+class WarmRequest(BaseModel):
+    selections: List[Selection]
+    concurrency: int = 4
+
+
+def _serialize(df, fmt):
+    if fmt == "arrow":
+        import pyarrow as pa
+
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return Response(sink.getvalue().to_pybytes(), media_type="application/vnd.apache.arrow.stream")
+    return Response(df.to_json(orient="split", index=False, date_format="iso"), media_type="application/json")
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok", "cache": cache.stats()}
+
+
+@app.get("/usage")
+async def get_usage(limit: int = 50):
+    """Most viewed filter selections since the API started."""
+    return [
+        {"year": year, "borough": borough, "severity": severity, "vehicle_type": vehicle_type, "views": views}
+        for (year, borough, severity, vehicle_type), views in usage.most_common(limit)
+    ]
+
+
+@app.post("/cache/invalidate")
+async def invalidate_cache():
+    """Drop every cached result, e.g. after the pipeline rebuilt the tables."""
+    cache.clear()
+    return cache.stats()
+
+
+@app.post("/cache/warm")
+async def warm_cache(request: WarmRequest):
+    """Compute every aggregate of the dashboard page for each selection into the cache.
+
+    At most `concurrency` queries run at once; already cached results are not recomputed.
+    """
+    aggregates = {}  # Cache key -> (name, filters, params), each computed once
+    for selection in request.selections:
+        filters = _filters(selection.year, selection.borough, selection.severity, selection.vehicle_type)
+        for name, params in page_aggregates(filters):
+            key, _, _ = _cache_key(name, filters, params)
+            aggregates[key] = (name, filters, params)
+
+    semaphore = asyncio.Semaphore(max(1, request.concurrency))
+
+    async def warm(name, filters, params):
+        async with semaphore:
+            return not (await _cached_aggregate(name, filters, params)).empty
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(warm(*aggregate) for aggregate in aggregates.values()))
+    return {
+        "selections": len(request.selections),
+        "aggregates": len(results),
+        "warmed": sum(results),
+        "seconds": round(time.perf_counter() - started, 3),
+        "cache": cache.stats(),
+    }
+
+
+@app.get("/aggregates")
+async def list_aggregates():
+    return sorted(AGGREGATES)
+
+
+@app.get("/aggregates/{name}")
+async def get_aggregate(
+    name: str,
+    request: Request,
+    year: Optional[int] = None,
+    borough: Optional[str] = None,
+    severity: Optional[str] = None,
+    vehicle_type: Optional[str] = None,
+    format: str = "json",
+):
+    if name not in AGGREGATES:
+        raise HTTPException(status_code=404, detail=f"Unknown aggregate '{name}'")
+    if format not in ("json", "arrow"):
+        raise HTTPException(status_code=400, detail="format must be 'json' or 'arrow'")
+
+    filters = _filters(year, borough, severity, vehicle_type)
+    params = {key: request.query_params[key] for key in AGGREGATE_PARAMS if key in request.query_params}
+    if name == PAGE_VIEW_AGGREGATE:
+        usage[(filters["year"], filters["borough"], filters["severity"], filters["vehicle_type"])] += 1
+
+    df = await _cached_aggregate(name, filters, params)
+    return _serialize(df, format)
+
+
+EXPORT_FORMATS = {
+    "csv": (data_loader.stream_csv, "text/csv"),
+    "parquet": (data_loader.stream_parquet, "application/vnd.apache.parquet"),
+}
+
+
+class _ExportSlot:
+    """An acquired export slot, released exactly once however its response ends.
+
+    The stream releases it when it ends or is closed, the response's background task once
+    it is sent, and garbage collection when neither ran (e.g. the body never started).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._released = False
+
+    def release(self):
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        export_slots.release()
+
+    def __del__(self):
+        self.release()
+
+
+def _locked_stream(stream, slot):
+    """Run an export generator, releasing its export slot when it ends or is closed."""
+    try:
+        yield from stream
+    finally:
+        stream.close()
+        slot.release()
+
+
+@app.get("/export")
+def export_accidents(
+    year: Optional[int] = None,
+    borough: Optional[str] = None,
+    severity: Optional[str] = None,
+    vehicle_type: Optional[str] = None,
+    format: str = "csv",
+):
+    """Stream every accident matching the filters as CSV or Parquet, in constant memory."""
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {sorted(EXPORT_FORMATS)}")
+    if not export_slots.acquire(blocking=False):
+        raise HTTPException(status_code=429, detail="Too many exports running, try again shortly")
+
+    slot = _ExportSlot()
+
+    try:
+        stream, media_type = EXPORT_FORMATS[format]
+        filters = _filters(year, borough, severity, vehicle_type)
+        name = "_".join(["tfl_accidents"] + [str(value).replace(" ", "_") for value in filters.values() if value])
+        return StreamingResponse(
+            _locked_stream(stream(filters), slot),
+            media_type=media_type,
+            headers={"Content-Disposition": f'attachment; filename="{name}.{format}"'},
+            background=BackgroundTask(slot.release),
+        )
+    except Exception:
+        slot.release()
+        raise
@@ -2,22 +2,25 @@ import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
 import plotly.express as px
-from data_loader import (
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from api_client import (
     get_filter_options, 
     get_severity_breakdown, 
     get_transport_mode_distribution, 
     get_borough_summary, 
     get_monthly_trends, 
     get_top_accident_prone_streets, 
-    get_accident_locations, 
+    get_accident_density, 
     get_weather_accident_trends,
     get_weekday_vs_weekend_trends,
     get_high_risk_days,
     get_accidents_by_age_group,
-    get_fatalities_by_age 
+    get_fatalities_by_age,
+    export_url,
 )
 from streamlit_folium import folium_static
-from folium.plugins import HeatMap
+from heatmap import density_overlay
+from point_store import get_point_store
 import folium
 
 # ✅ Set Wide Layout & Theme
@@ -65,20 +68,83 @@ selected_borough = st.sidebar.selectbox("Select Borough", borough_options)
 severity_options = ["All"] + sorted(filter_data["accident_severity"].dropna().unique())
 selected_severity = st.sidebar.selectbox("Select Severity", severity_options)
 
-# ✅ Apply Filters to Queries
-filters = []
-if selected_year != "All Years":
-    filters.append(f"EXTRACT(YEAR FROM accident_date) = {selected_year}")
-if selected_borough != "All":
-    filters.append(f"borough = '{selected_borough}'")
-if selected_severity != "All":
-    filters.append(f"accident_severity = '{selected_severity}'")
+# ✅ Vehicle Type Filter: accidents involving at least one vehicle of this type
+vehicle_options = ["All"] + sorted(filter_data["vehicle_type"].dropna().unique())
+selected_vehicle = st.sidebar.selectbox("Select Vehicle Type", vehicle_options)
 
-# ✅ Combine Filters into a WHERE Clause
-where_clause = "WHERE " + " AND ".join(filters) if filters else ""
+# ✅ Apply Filters to Queries
+filters = {
+    "year": None if selected_year == "All Years" else int(selected_year),
+    "borough": None if selected_borough == "All" else selected_borough,
+    "severity": None if selected_severity == "All" else selected_severity,
+    "vehicle_type": None if selected_vehicle == "All" else selected_vehicle,
+}
+
+# ✅ Download the filtered accidents, streamed by the API
+if export_url(filters):
+    st.sidebar.markdown(
+        f"📥 Export filtered accidents: [CSV]({export_url(filters, 'csv')}) · [Parquet]({export_url(filters, 'parquet')})"
+    )
+else:
+    st.sidebar.caption("📥 Export: run `python export.py --help` next to the dashboard.")
+
+# ✅ Fast preview: all-years views first render estimates from the sampled accidents,
+# then refresh to the exact counts, which are fetched in the background meanwhile
+fast_preview = st.sidebar.checkbox(
+    "⚡ Fast preview",
+    value=True,
+    help="For all-years views, show approximate counts first and refresh them to exact values.",
+)
+use_preview = fast_preview and filters["year"] is None
+
+def get_exact_executor():
+    """This session's pool for the exact queries, reused by every rerun.
+
+    Its idle threads exit once the session ends and its state, the pool's only owner, is dropped.
+    """
+    if "exact_executor" not in st.session_state:
+        st.session_state.exact_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="exact")
+    return st.session_state.exact_executor
+
+# A rerun stops the previous script before it waited for its exact results: drop the unstarted ones
+for stale_future in st.session_state.get("pending_exact", {}):
+    stale_future.cancel()
+pending_exact = {}  # Future of the exact result -> (placeholder, render function)
+st.session_state.pending_exact = pending_exact
+
+def fill_exact(wait=False):
+    """Replace the previews whose exact result has arrived, or with `wait` every preview as its result arrives."""
+    done = as_completed(list(pending_exact)) if wait else [future for future in list(pending_exact) if future.done()]
+    for future in done:
+        placeholder, render = pending_exact.pop(future)
+        with placeholder.container():
+            render(future.result(), approximate=False)
+
+def show_progressively(render, fetch, *args, **kwargs):
+    """Display `render(fetch(...), approximate)`, as a preview first when fast preview applies.
+
+    Elements can only be written by the script thread, so the exact results that arrived
+    meanwhile are swapped in between sections, and the rest at the end of the script.
+    """
+    if not use_preview:
+        render(fetch(*args, **kwargs), approximate=False)
+        return
+    fill_exact()
+    future = get_exact_executor().submit(fetch, *args, **kwargs)
+    placeholder = st.empty()
+    with placeholder.container():
+        render(fetch(*args, approximate=True, **kwargs), approximate=True)
+    pending_exact[future] = (placeholder, render)
+
+def preview_caption(df, measure):
+    """Caption of an approximate result: its overall 95% margin of error."""
+    estimate = df[measure].sum()
+    margin = ((df[f"{measure}_high"] - df[f"{measure}_low"]) / 2).sum()
+    relative = f"±{100 * margin / estimate:.1f}%" if estimate else "unknown"
+    st.caption(f"⚡ Preview from a sample of accidents ({relative} at 95% confidence). Refreshing to exact values…")
 
 # Display monthly trends
-df_monthly_trends = get_monthly_trends(where_clause)
+df_monthly_trends = get_monthly_trends(filters)
 if selected_year != "All Years":
     st.subheader(f"Monthly Accident Trends in {selected_year}")
 else:
@@ -97,84 +163,97 @@ else:
     st.warning("No monthly data available.")
 
 # ✅ Display Borough-Wise Summary Only When "All" Boroughs Are Selected
-if selected_borough == "All":
-    df_borough = get_borough_summary(where_clause)
-    df_borough.reset_index(drop=True, inplace=True)
-    df_borough.index += 1
-
+def render_borough_summary(df_borough, approximate):
     st.subheader("Borough-Wise Accident Summary")
     if not df_borough.empty:
-        st.dataframe(df_borough.style.format({
+        df_table = df_borough[
+            ["borough", "total_accidents", "slight_accidents", "serious_accidents", "fatal_accidents"]
+        ].reset_index(drop=True)
+        df_table.index += 1
+        st.dataframe(df_table.style.format({
             "total_accidents": "{:,}",
             "slight_accidents": "{:,}",
             "serious_accidents": "{:,}",
             "fatal_accidents": "{:,}"
         }))
+        if approximate:
+            preview_caption(df_borough, "total_accidents")
     else:
         st.warning("No accident data available for selected filters.")
 
-# ✅ Fetch filtered data
-df_severity = get_severity_breakdown(where_clause)
-df_transport = get_transport_mode_distribution(where_clause)
+if selected_borough == "All":
+    show_progressively(render_borough_summary, get_borough_summary, filters)
 
 st.subheader("Accident Breakdown")
 
 col1, col2 = st.columns([4, 4])
 
 # ✅ Severity Breakdown Pie Chart (Interactive)
-with col1:
+def render_severity(df_severity, approximate):
     st.subheader("Severity Breakdown")
     if not df_severity.empty:
         fig_severity = px.pie(df_severity, 
                                names="accident_severity", 
                                values="count",
-                               title="Accident Severity Distribution",
+                               title="Accident Severity Distribution" + (" (preview)" if approximate else ""),
                                color_discrete_sequence=px.colors.qualitative.Set2,
                                hole=0.3,
                                width=600,  
                                height=500)  
         fig_severity.update_traces(textinfo="percent+label")
         st.plotly_chart(fig_severity, use_container_width=True)
+        if approximate:
+            preview_caption(df_severity, "count")
     else:
         st.warning("No severity data available.")
 
-with col2:
-    # ✅ Fetch Weather-Based Accident Data
-    df_weather = get_weather_accident_trends(where_clause)
-
+# ✅ Weather-Based Accident Data
+def render_weather(df_weather, approximate):
     st.subheader("🌦️ Impact of Weather on Accidents")
 
     if not df_weather.empty:
         fig_weather = px.pie(df_weather, 
                             names="weather_category", 
                             values="accident_count",
-                            title="Accidents by Weather Condition",
+                            title="Accidents by Weather Condition" + (" (preview)" if approximate else ""),
                             color_discrete_sequence=px.colors.qualitative.Set2,
                             hole=0.3,  # Creates a donut-style pie chart
                             width=600,
                             height=500)
         fig_weather.update_traces(textinfo="percent+label")
         st.plotly_chart(fig_weather, use_container_width=True)
+        if approximate:
+            preview_caption(df_weather, "accident_count")
     else:
         st.warning("No weather accident data available.")
 
-# ✅ Fetch Weather vs. Severity Breakdown
-df_weather_severity = get_weather_accident_trends(where_clause, by_severity=True)
-st.subheader("🌦️ Weather vs. Severity Breakdown")
-
-if not df_weather_severity.empty:
-    fig_weather_severity = px.bar(df_weather_severity, 
-                                  x="weather_category", 
-                                  y="accident_count",
-                                  color="accident_severity",
-                                  title="Accident Severity by Weather Condition",
-                                  barmode="stack",  # ✅ Stacked bar chart
-                                  color_discrete_sequence=px.colors.qualitative.Set2,
-                                  labels={"accident_count": "Number of Accidents", "weather_category": "Weather Condition"})
-    
-    st.plotly_chart(fig_weather_severity, use_container_width=True)
-else:
-    st.warning("No weather severity data available.")
+with col1:
+    show_progressively(render_severity, get_severity_breakdown, filters)
+
+with col2:
+    show_progressively(render_weather, get_weather_accident_trends, filters)
+
+# ✅ Weather vs. Severity Breakdown
+def render_weather_severity(df_weather_severity, approximate):
+    st.subheader("🌦️ Weather vs. Severity Breakdown")
+
+    if not df_weather_severity.empty:
+        fig_weather_severity = px.bar(df_weather_severity, 
+                                      x="weather_category", 
+                                      y="accident_count",
+                                      color="accident_severity",
+                                      title="Accident Severity by Weather Condition" + (" (preview)" if approximate else ""),
+                                      barmode="stack",  # ✅ Stacked bar chart
+                                      color_discrete_sequence=px.colors.qualitative.Set2,
+                                      labels={"accident_count": "Number of Accidents", "weather_category": "Weather Condition"})
+        
+        st.plotly_chart(fig_weather_severity, use_container_width=True)
+        if approximate:
+            preview_caption(df_weather_severity, "accident_count")
+    else:
+        st.warning("No weather severity data available.")
+
+show_progressively(render_weather_severity, get_weather_accident_trends, filters, by_severity=True)
 
 # ✅ Display Top 10 Accident-Prone Streets
 st.subheader(" Top 10 Accident-Prone Streets")
@@ -186,58 +265,68 @@ if not df_top_streets.empty:
 else:
     st.warning("No data available for top accident-prone streets.")
 
-# ✅ Fetch accident locations & total count
-result = get_accident_locations(where_clause)
+# ✅ Accident density: points from the local point store, else pre-aggregated on a grid by the database
+def render_density(density, approximate):
+    lat, lon, weights = density
+    total_accidents = len(lat) if weights is None else int(weights.sum())
 
-# ✅ Unpack safely to avoid errors
-if isinstance(result, tuple) and len(result) == 2:
-    df_locations, total_accidents = result
-else:
-    df_locations, total_accidents = pd.DataFrame(), 0  # Prevents crash if function fails
+    st.subheader("🔥 Accident Density Heatmap")
 
-st.subheader("🔥 Accident Density Heatmap")
+    if total_accidents:
+        # ✅ Dynamically Adjust Blur Based on Data Size
+        if total_accidents < 1000:
+            sigma = 1.0
+        elif total_accidents < 5000:
+            sigma = 1.5
+        else:
+            sigma = 2.0  # For very large datasets
 
-if not df_locations.empty:
-    # ✅ Dynamically Adjust Radius Based on Data Size
-    if total_accidents < 1000:
-        radius = 5
-    elif total_accidents < 5000:
-        radius = 8
-    else:
-        radius = 12  # For very large datasets
-    
-    m = folium.Map(location=[51.5074, -0.1278], zoom_start=11, tiles="cartodbpositron")
+        m = folium.Map(location=[51.5074, -0.1278], zoom_start=11, tiles="cartodbpositron")
 
-    # ✅ Convert DataFrame to List of [lat, lon] Pairs
-    heat_data = df_locations[["latitude", "longitude"]].values.tolist()
+        # ✅ Rendered server-side into one PNG overlay, so the page size does not grow with the data
+        density_overlay(lat, lon, weights, sigma=sigma).add_to(m)
 
-    # ✅ Apply Scaling to Intensity
-    HeatMap(heat_data, radius=radius, blur=15, min_opacity=0.2).add_to(m)
+        folium_static(m, width=1200, height=850)
+        if approximate:
+            st.caption(f"⚡ Preview from a sample: ≈{total_accidents:,} accidents. Refreshing to exact values…")
+        else:
+            st.caption(f"{total_accidents:,} accidents")
+    else:
+        st.warning("No accident location data available for selected filters.")
 
-    folium_static(m, width=1200, height=850)
-else:
-    st.warning("No accident location data available for selected filters.")
-
-
-st.subheader("Transport Mode Breakdown")
-if not df_transport.empty:
-    fig_transport = px.pie(df_transport, 
-                            names="vehicle_type", 
-                            values="count",
-                            title="Accidents by Transport Mode",
-                            color_discrete_sequence=px.colors.qualitative.Pastel,
-                            hole=0.2,
-                            width=1000,  
-                            height=750)  
-    fig_transport.update_traces(textinfo="percent+label")
-    st.plotly_chart(fig_transport, use_container_width=True)
+point_store = get_point_store()
+if point_store is not None and point_store.covers(filters):
+    # ✅ Filtered in memory from the memory-mapped store exported after each dbt run
+    render_density((*point_store.points(filters), None), approximate=False)
 else:
-    st.warning("No transport mode data available.")
+    # No store yet, or a vehicle type too rare to have a flag in it
+    show_progressively(render_density, get_accident_density, filters)
+
+
+def render_transport(df_transport, approximate):
+    st.subheader("Transport Mode Breakdown")
+    if not df_transport.empty:
+        fig_transport = px.pie(df_transport, 
+                                names="vehicle_type", 
+                                values="count",
+                                title="Accidents by Transport Mode" + (" (preview)" if approximate else ""),
+                                color_discrete_sequence=px.colors.qualitative.Pastel,
+                                hole=0.2,
+                                width=1000,  
+                                height=750)  
+        fig_transport.update_traces(textinfo="percent+label")
+        st.plotly_chart(fig_transport, use_container_width=True)
+        if approximate:
+            preview_caption(df_transport, "count")
+    else:
+        st.warning("No transport mode data available.")
+
+show_progressively(render_transport, get_transport_mode_distribution, filters)
 
 
 # ✅ Fetch Weekday vs. Weekend Trends
-df_weekday_weekend = get_weekday_vs_weekend_trends(where_clause)
-df_high_risk_days = get_high_risk_days(where_clause)
+df_weekday_weekend = get_weekday_vs_weekend_trends(filters)
+df_high_risk_days = get_high_risk_days(filters)
 
 st.subheader("High-Risk Days & Weekday vs. Weekend Trends")
 
@@ -282,7 +371,7 @@ else:
     st.warning("No data available. Adjust filters and try again.")
 
 # ✅ Fetch Accidents by Age Group Data
-df_age_group = get_accidents_by_age_group(where_clause)
+df_age_group = get_accidents_by_age_group(filters)
 
 st.subheader("👶🧑‍🦳 Accidents by Age Group")
 
@@ -326,7 +415,7 @@ else:
 
 
 # ✅ Fetch Fatalities by Age Data
-df_fatalities_age = get_fatalities_by_age(where_clause)
+df_fatalities_age = get_fatalities_by_age(filters)
 
 st.subheader("Fatalities by Age Group")
 
@@ -343,3 +432,6 @@ if not df_fatalities_age.empty:
 else:
     st.warning("No fatality data available. Adjust filters and try again.")
 
+
+# ✅ Replace the remaining previews with the exact results as they arrive
+fill_exact(wait=True)
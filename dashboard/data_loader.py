@@ -1,85 +1,429 @@
+import calendar
+import contextlib
+import functools
+import io
 import os
-import pandas as pd
-import psycopg2
-import sqlalchemy
-from sqlalchemy import create_engine
-from dotenv import load_dotenv
+import queue
+import threading
 
-# ✅ Load environment variables
-load_dotenv("/usr/app/.env")
+# pandas, NumPy and psycopg2 are imported on first use, and settings are read lazily,
+# so importing this module is cheap and works without a database or `.env`.
 
-# ✅ Database connection settings
-DB_HOST = os.getenv("DB_HOST", "postgres_db_tfl_accident_data")  
-DB_PORT = os.getenv("DB_PORT", "5432")  
-DB_NAME = os.getenv("DB_NAME", "tfl_accidents")
-DB_USER = os.getenv("DB_USER", "odiurdigital")
-DB_PASSWORD = os.getenv("DB_PASSWORD", "local")
+@functools.lru_cache(maxsize=None)
+def get_db_settings():
+    """Database connection settings, read from `.env` / the environment on first use.
 
-# ✅ Create SQLAlchemy engine
-engine = create_engine(f"postgresql+psycopg2://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}")
+    The dashboard only reads, so it connects to the read replica DB_READ_HOST / DB_READ_PORT
+    when one is configured, else to the primary. Tables resolve in the DASHBOARD_SCHEMA
+    snapshot published after each dbt run, then in `public` (e.g. before the first publish),
+    so the pipeline's drops, COPYs and dbt rebuilds never touch what the dashboard reads.
+    """
+    from dotenv import load_dotenv
+
+    # ✅ Load environment variables
+    load_dotenv("/usr/app/.env")
+    settings = {
+        "host": os.getenv("DB_HOST", "postgres_db_tfl_accident_data"),
+        "port": os.getenv("DB_PORT", "5432"),
+        "database": os.getenv("DB_NAME", "tfl_accidents"),
+        "user": os.getenv("DB_USER", "odiurdigital"),
+        "password": os.getenv("DB_PASSWORD", "local"),
+    }
+    if os.getenv("DB_READ_HOST"):
+        settings["host"] = os.getenv("DB_READ_HOST")
+        settings["port"] = os.getenv("DB_READ_PORT") or settings["port"]
+    schema = os.getenv("DASHBOARD_SCHEMA", "dashboard")
+    if schema:
+        settings["options"] = f"-c search_path={schema},public"
+    return settings
+
+# ✅ Connection pool shared by every query of this process
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "8"))
+_pool = None
+_pool_lock = threading.Lock()
+_pool_slots = threading.BoundedSemaphore(DB_POOL_MAX)  # Wait for a free connection instead of failing
+
+def get_pool():
+    """Return the process-wide PostgreSQL connection pool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            from psycopg2.pool import ThreadedConnectionPool
+            _pool = ThreadedConnectionPool(1, DB_POOL_MAX, **get_db_settings())
+        return _pool
+
+@contextlib.contextmanager
+def pooled_connection():
+    """Borrow a pooled connection for longer work than one query, e.g. a streamed export.
+
+    The connection is rolled back before it returns to the pool, and closed if it broke.
+    """
+    import psycopg2
+
+    with _pool_slots:
+        pool = get_pool()
+        conn = pool.getconn()
+        broken = False
+        try:
+            yield conn
+        except psycopg2.OperationalError:
+            broken = True
+            raise
+        finally:
+            if not broken:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    broken = True
+            pool.putconn(conn, close=broken)
+
+# ✅ Result fetch backends, selectable per query (see `fetch_data`)
+FETCH_BACKENDS = ("pandas", "copy", "adbc")
+FETCH_BACKEND = os.getenv("DB_FETCH_BACKEND", "pandas")
+
+# Fixed-width PostgreSQL types -> NumPy dtype of their binary COPY encoding (big-endian)
+BINARY_COPY_TYPES = {
+    16: "?",      # boolean
+    21: ">i2",    # smallint
+    23: ">i4",    # integer
+    20: ">i8",    # bigint
+    700: ">f4",   # real
+    701: ">f8",   # double precision
+    1082: ">i4",  # date: days since 2000-01-01
+    1114: ">i8",  # timestamp: microseconds since 2000-01-01
+}
+BINARY_COPY_SIGNATURE = b"PGCOPY\n\xff\r\n\x00"
+POSTGRES_EPOCH = "2000-01-01"
 
 # ✅ Function to fetch data from PostgreSQL
-def fetch_data(query):
-    """Execute SQL query and return results as a Pandas DataFrame."""
+def fetch_data(query, backend=None):
+    """Execute SQL query and return results as a Pandas DataFrame.
+
+    `backend` (default `DB_FETCH_BACKEND`) picks how rows are fetched:
+    - "pandas": `pd.read_sql`, one Python object per value.
+    - "copy": binary COPY decoded straight into typed NumPy columns. Only for results of
+      fixed-width columns without NULLs; anything else falls back to "pandas".
+    - "adbc": the ADBC PostgreSQL driver's Arrow result, if `adbc-driver-postgresql` is
+      installed; otherwise falls back to "pandas".
+    """
+    import pandas as pd
+    import psycopg2
+
+    backend = backend or FETCH_BACKEND
+    if backend not in FETCH_BACKENDS:
+        raise ValueError(f"Unknown fetch backend {backend!r}, expected one of {FETCH_BACKENDS}")
+
     try:
-        conn = psycopg2.connect(
-            host=DB_HOST,
-            port=DB_PORT,
-            database=DB_NAME,
-            user=DB_USER,
-            password=DB_PASSWORD
-        )
-        df = pd.read_sql(query, conn)
-        conn.close()
-        return df
+        if backend == "copy":
+            df = _fetch_binary_copy(query)
+            if df is not None:
+                return df
+        elif backend == "adbc" and _adbc_available():
+            return _fetch_adbc(query)
     except psycopg2.OperationalError as e:
         print(f"Database connection error: {e}")
         return pd.DataFrame()
 
+    with _pool_slots:
+        try:
+            pool = get_pool()
+            conn = pool.getconn()
+        except psycopg2.OperationalError as e:
+            print(f"Database connection error: {e}")
+            return pd.DataFrame()
+
+        broken = False
+        try:
+            return pd.read_sql(query, conn)
+        except psycopg2.OperationalError as e:
+            broken = True
+            print(f"Database connection error: {e}")
+            return pd.DataFrame()
+        finally:
+            if not broken:
+                try:
+                    conn.rollback()  # Return the connection idle, outside any transaction
+                except psycopg2.Error:
+                    broken = True
+            pool.putconn(conn, close=broken)
+
+def _fetch_binary_copy(query):
+    """Fetch a result through `COPY ... TO STDOUT (FORMAT binary)` into NumPy columns.
+
+    With only fixed-width, non-NULL columns every row has the same byte layout, so the
+    whole body is read by one structured `np.frombuffer` view, with no per-row work.
+    Returns None when the result does not have that layout.
+    """
+    import numpy as np
+    import pandas as pd
+
+    query = query.strip().rstrip(";")
+    buffer = io.BytesIO()
+    with pooled_connection() as conn:
+        cur = conn.cursor()
+        cur.execute(f"SELECT * FROM ({query}) AS result LIMIT 0;")
+        columns = [(column.name, column.type_code) for column in cur.description]
+        if any(type_code not in BINARY_COPY_TYPES for _, type_code in columns):
+            cur.close()
+            return None
+        cur.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT binary)", buffer)
+        cur.close()
+
+    data = buffer.getbuffer()
+    if bytes(data[:11]) != BINARY_COPY_SIGNATURE:
+        raise ValueError("Unexpected binary COPY header")
+    header_size = 19 + int.from_bytes(data[15:19], "big")  # Signature, flags, extension length
+    body = data[header_size:len(data) - 2]  # Without the -1 trailer
+
+    row_dtype = np.dtype(
+        [("fields", ">i2")]
+        + [
+            field
+            for index, (_, type_code) in enumerate(columns)
+            for field in ((f"length{index}", ">i4"), (f"value{index}", BINARY_COPY_TYPES[type_code]))
+        ]
+    )
+    if len(body) % row_dtype.itemsize:
+        return None  # A NULL shortened some rows
+    rows = np.frombuffer(body, dtype=row_dtype)
+    if not (rows["fields"] == len(columns)).all() or any(
+        not (rows[f"length{index}"] == row_dtype[f"value{index}"].itemsize).all()
+        for index in range(len(columns))
+    ):
+        return None
+
+    result = {}
+    for index, (name, type_code) in enumerate(columns):
+        values = rows[f"value{index}"]
+        if type_code == 1082:
+            values = np.datetime64(POSTGRES_EPOCH, "D") + values.astype(np.int64)
+        elif type_code == 1114:
+            values = np.datetime64(POSTGRES_EPOCH, "us") + values.astype(np.int64)
+        else:
+            values = values.astype(values.dtype.newbyteorder("="))
+        result[name] = values
+    return pd.DataFrame(result, columns=[name for name, _ in columns])
+
+@functools.lru_cache(maxsize=None)
+def _adbc_available():
+    try:
+        import adbc_driver_postgresql.dbapi  # noqa: F401
+    except ImportError:
+        print("⚠️ adbc-driver-postgresql is not installed; the adbc fetch backend uses pandas.")
+        return False
+    return True
+
+_adbc_local = threading.local()  # ADBC connections are not thread-safe: one per thread
+
+def _fetch_adbc(query):
+    """Fetch a result as an Arrow table with the ADBC PostgreSQL driver."""
+    import adbc_driver_postgresql.dbapi
+    from urllib.parse import quote
+
+    conn = getattr(_adbc_local, "conn", None)
+    if conn is None:
+        settings = get_db_settings()
+        uri = (
+            f"postgresql://{quote(settings['user'], safe='')}:{quote(settings['password'], safe='')}"
+            f"@{settings['host']}:{settings['port']}/{settings['database']}"
+        )
+        if settings.get("options"):
+            uri += f"?options={quote(settings['options'], safe='')}"
+        conn = _adbc_local.conn = adbc_driver_postgresql.dbapi.connect(uri)
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute(query.strip().rstrip(";"))
+            table = cur.fetch_arrow_table()
+        conn.rollback()
+    except Exception:
+        _adbc_local.conn = None
+        conn.close()
+        raise
+    return table.to_pandas()
+
+def _sql_literal(value):
+    """Quote a value as a SQL string literal."""
+    return "'" + str(value).replace("'", "''") + "'"
+
+def build_where_clause(filters=None, year_column=None, extra_conditions=()):
+    """Build a WHERE clause from the dashboard filters.
+
+    `filters` holds the sidebar selections {"year", "borough", "severity", "vehicle_type"},
+    None meaning all. Aggregate tables that store the year as a column pass it as `year_column`.
+    The vehicle type needs the `vehicle_types` array of `accident_summary` (and its sample);
+    aggregates without it fall back to `accident_summary` when that filter is set.
+    """
+    filters = filters or {}
+    conditions = []
+    if filters.get("year") is not None:
+        year = int(filters["year"])
+        if year_column:
+            conditions.append(f"{year_column} = {year}")
+        else:
+            # A date range rather than EXTRACT(YEAR ...), so an index on accident_date applies
+            conditions.append(f"accident_date >= DATE '{year}-01-01' AND accident_date < DATE '{year + 1}-01-01'")
+    if filters.get("borough"):
+        conditions.append(f"borough = {_sql_literal(filters['borough'])}")
+    if filters.get("severity"):
+        conditions.append(f"accident_severity = {_sql_literal(filters['severity'])}")
+    if filters.get("vehicle_type"):
+        # Array containment, served by the GIN index on vehicle_types
+        conditions.append(f"vehicle_types @> ARRAY[{_sql_literal(filters['vehicle_type'])}]::TEXT[]")
+    conditions.extend(extra_conditions)
+    return "WHERE " + " AND ".join(conditions) if conditions else ""
+
+# ✅ Approximate previews from the stratified `accident_summary_sample` model.
+# Its strata (year x borough x severity) are the filter dimensions, so filters select whole strata.
+SAMPLE_STRATA = ("accident_year", "borough", "accident_severity")
+CONFIDENCE_Z = 1.96  # 95% confidence bounds
+
+def approximate_totals(units_sql, group_columns, measures):
+    """Estimate per-group totals from the stratified sample, with 95% confidence bounds.
+
+    `units_sql` returns one row per sampled unit with the SAMPLE_STRATA, `stratum_rows`,
+    `stratum_sample_rows`, `group_columns` and one numeric column per name in `measures`.
+    Returns the group columns and, per measure, its scaled estimate and `<measure>_low` /
+    `<measure>_high` bounds (stratified estimator with finite population correction).
+    """
+    groups = ", ".join(group_columns)
+    strata = ", ".join([groups] + [column for column in SAMPLE_STRATA if column not in group_columns])
+    sums = ", ".join(
+        f"SUM({measure})::FLOAT AS {measure}_sum, SUM({measure} * {measure})::FLOAT AS {measure}_squares"
+        for measure in measures
+    )
+    estimates = ", ".join(
+        f"""SUM(stratum_rows * {measure}_sum / stratum_sample_rows) AS {measure},
+            {CONFIDENCE_Z} * SQRT(SUM(CASE WHEN stratum_sample_rows > 1 THEN
+                stratum_rows * stratum_rows * (1 - stratum_sample_rows / stratum_rows)
+                * ({measure}_squares - {measure}_sum * {measure}_sum / stratum_sample_rows)
+                / (stratum_sample_rows - 1) / stratum_sample_rows
+            ELSE 0 END)) AS {measure}_margin"""
+        for measure in measures
+    )
+    query = f"""
+        WITH units AS ({units_sql}),
+        strata AS (
+            SELECT {strata},
+                MAX(stratum_rows)::FLOAT AS stratum_rows,
+                MAX(stratum_sample_rows)::FLOAT AS stratum_sample_rows,
+                {sums}
+            FROM units
+            GROUP BY {strata}
+        )
+        SELECT {groups}, {estimates}
+        FROM strata
+        GROUP BY {groups};
+    """
+    df = fetch_data(query)
+    if df.empty:
+        return df
+    for measure in measures:
+        margin = df.pop(f"{measure}_margin")
+        df[f"{measure}_low"] = (df[measure] - margin).clip(lower=0).round().astype("int64")
+        df[f"{measure}_high"] = (df[measure] + margin).round().astype("int64")
+        df[measure] = df[measure].round().astype("int64")
+    return df
+
+def _sample_units(columns, filters=None):
+    """SELECT of the sampled accidents matching the filters, with the estimator columns."""
+    where_clause = build_where_clause(filters, year_column="accident_year")
+    return f"""
+        SELECT {", ".join(SAMPLE_STRATA)}, stratum_rows, stratum_sample_rows, {", ".join(columns)}
+        FROM accident_summary_sample
+        {where_clause}
+    """
+
 # ✅ Example Queries (can be used inside app.py)
 
-def get_yearly_trends(where_clause=""):
-    """Retrieve accident counts per year, supporting 'All Years'."""
+# Time buckets served by the rollup models: granularity -> (table, bucket expression)
+TIME_SERIES_ROLLUPS = {
+    "day": ("accidents_daily", "period_start"),
+    "week": ("accidents_weekly", "period_start"),
+    "month": ("accidents_monthly", "period_start"),
+    "quarter": ("accidents_monthly", "CAST(DATE_TRUNC('quarter', period_start) AS DATE)"),
+    "year": ("accidents_yearly", "accident_year"),
+    "month_of_year": ("accidents_monthly", "CAST(EXTRACT(MONTH FROM period_start) AS INTEGER)"),
+    "day_of_week": ("accidents_daily", "day_of_week"),  # 0 = Sunday
+}
+
+# The same buckets computed from `accident_summary`, for filters the rollups cannot apply
+TIME_SERIES_BUCKETS = {
+    "day": "accident_date",
+    "week": "GREATEST(CAST(DATE_TRUNC('week', accident_date) AS DATE), "
+            "MAKE_DATE(CAST(EXTRACT(YEAR FROM accident_date) AS INTEGER), 1, 1))",
+    "month": "CAST(DATE_TRUNC('month', accident_date) AS DATE)",
+    "quarter": "CAST(DATE_TRUNC('quarter', accident_date) AS DATE)",
+    "year": "CAST(EXTRACT(YEAR FROM accident_date) AS INTEGER)",
+    "month_of_year": "CAST(EXTRACT(MONTH FROM accident_date) AS INTEGER)",
+    "day_of_week": "CAST(EXTRACT(DOW FROM accident_date) AS INTEGER)",
+}
+
+def get_time_series(granularity, filters=None):
+    """Retrieve accident counts per time bucket by summing the rollup tables.
+
+    `granularity` is one of TIME_SERIES_ROLLUPS; returns columns `period` and `accident_count`.
+    """
+    if granularity not in TIME_SERIES_ROLLUPS:
+        raise ValueError(f"Unknown granularity '{granularity}', expected one of {list(TIME_SERIES_ROLLUPS)}")
+    if filters and filters.get("vehicle_type"):
+        # The rollups have no vehicle types: count the matching accidents instead
+        query = f"""
+            SELECT {TIME_SERIES_BUCKETS[granularity]} AS period, COUNT(accident_id) AS accident_count
+            FROM accident_summary
+            {build_where_clause(filters)}
+            GROUP BY period
+            ORDER BY period;
+        """
+        return fetch_data(query)
+
+    table, bucket = TIME_SERIES_ROLLUPS[granularity]
+    where_clause = build_where_clause(filters, year_column="accident_year")
     query = f"""
-        SELECT EXTRACT(YEAR FROM accident_date) AS accident_year, 
-               COUNT(accident_id) AS accident_count
-        FROM accident_summary
-        {where_clause}  -- Applies the filters dynamically
-        GROUP BY accident_year
-        ORDER BY accident_year;
+        SELECT {bucket} AS period, SUM(accident_count) AS accident_count
+        FROM {table}
+        {where_clause}
+        GROUP BY period
+        ORDER BY period;
     """
     return fetch_data(query)
 
+def get_yearly_trends(filters=None):
+    """Retrieve accident counts per year, supporting 'All Years'."""
+    df = get_time_series("year", filters)
+    return df.rename(columns={"period": "accident_year"})
+
 def get_global_quarterly_trends():
-    """Retrieve accident counts grouped by quarters across all years."""
-    query = """
-        SELECT 
-            TO_CHAR(accident_date, 'YYYY') AS quarter_label,
-            COUNT(accident_id) AS accident_count
-        FROM accident_summary
-        GROUP BY quarter_label
-        ORDER BY quarter_label;
-    """
-    return fetch_data(query)
+    """Retrieve accident counts grouped by quarters across all years.
 
-def get_monthly_trends(where_clause=""):
-    query = """
-    SELECT TO_CHAR(accident_date, 'Month') AS month_name, 
-           EXTRACT(MONTH FROM accident_date) AS month_number, 
-           COUNT(accident_id) AS accident_count 
-    FROM accident_summary
+    Kept for existing callers: despite its name, `quarter_label` is the year ('YYYY').
+    See get_quarterly_trends for real quarters.
     """
-    if where_clause:
-        query += f" {where_clause}"
-    query += " GROUP BY month_name, month_number ORDER BY month_number;"
-    
-    try:
-        df = pd.read_sql(query, con=engine)
+    df = get_time_series("year")
+    if df.empty:
         return df
-    except sqlalchemy.exc.DatabaseError as e:
-        print(f"Database error: {e}")
-        return pd.DataFrame()
+    df["period"] = df["period"].astype(str)
+    return df.rename(columns={"period": "quarter_label"})
 
+def get_quarterly_trends(filters=None):
+    """Retrieve accident counts per calendar quarter, labelled 'YYYY-Qn'."""
+    df = get_time_series("quarter", filters)
+    if df.empty:
+        return df
+    import pandas as pd
+
+    periods = pd.to_datetime(df.pop("period"))
+    df.insert(0, "quarter_label", periods.dt.year.astype(str) + "-Q" + periods.dt.quarter.astype(str))
+    return df
+
+def get_monthly_trends(filters=None):
+    """Retrieve accident counts per calendar month, combining the selected years."""
+    df = get_time_series("month_of_year", filters)
+    if df.empty:
+        return df
+    df = df.rename(columns={"period": "month_number"})
+    df.insert(0, "month_name", df["month_number"].map(lambda month: calendar.month_name[int(month)]))
+    return df
 
 def get_top_hotspots():
     """Retrieve top accident-prone locations."""
@@ -106,13 +450,21 @@ def get_filter_options():
             accident_severity,
             vehicle_type
         FROM accident_summary
-        LEFT JOIN vehicles ON accident_summary.accident_id = vehicles.accident_id
+        LEFT JOIN LATERAL UNNEST(vehicle_types) AS vehicle_type ON TRUE
         ORDER BY year DESC;
     """
     return fetch_data(query)
 
-def get_severity_breakdown(where_clause=""):
-    """Retrieve accident counts by severity dynamically based on filters."""
+def get_severity_breakdown(filters=None, approximate=False):
+    """Retrieve accident counts by severity dynamically based on filters.
+
+    With `approximate=True` the counts are estimated from the sample, with `count_low` / `count_high` bounds.
+    """
+    if approximate:
+        df = approximate_totals(_sample_units(["1 AS count"], filters), ["accident_severity"], ["count"])
+        return df.sort_values("count", ascending=False, ignore_index=True) if not df.empty else df
+
+    where_clause = build_where_clause(filters)
     query = f"""
         SELECT accident_severity, COUNT(accident_id) AS count
         FROM accident_summary
@@ -122,20 +474,50 @@ def get_severity_breakdown(where_clause=""):
     """
     return fetch_data(query)
 
-def get_transport_mode_distribution(where_clause=""):
-    """Retrieve accident counts by transport type dynamically based on filters."""
+def get_transport_mode_distribution(filters=None, approximate=False):
+    """Retrieve accident counts by transport type dynamically based on filters.
+
+    With `approximate=True` the vehicles of the sampled accidents are scaled up, with `count_low` / `count_high` bounds.
+    """
+    if approximate:
+        strata = ", ".join(SAMPLE_STRATA)
+        units_sql = f"""
+            SELECT {strata}, stratum_rows, stratum_sample_rows, vehicle_type, COUNT(*) AS count
+            FROM accident_summary_sample, UNNEST(vehicle_types) AS vehicle_type
+            {build_where_clause(filters, year_column="accident_year")}
+            GROUP BY accident_id, {strata}, stratum_rows, stratum_sample_rows, vehicle_type
+        """
+        df = approximate_totals(units_sql, ["vehicle_type"], ["count"])
+        return df.sort_values("count", ascending=False, ignore_index=True) if not df.empty else df
+
+    # One row per vehicle, unnested from the accident's vehicle_types: no join with `vehicles`
+    where_clause = build_where_clause(filters)
     query = f"""
-        SELECT vehicles.vehicle_type, COUNT(vehicles.accident_id) AS count
-        FROM vehicles
-        LEFT JOIN accident_summary ON vehicles.accident_id = accident_summary.accident_id
+        SELECT vehicle_type, COUNT(*) AS count
+        FROM accident_summary, UNNEST(vehicle_types) AS vehicle_type
         {where_clause}  -- Applies the filters dynamically
-        GROUP BY vehicles.vehicle_type
+        GROUP BY vehicle_type
         ORDER BY count DESC;
     """
     return fetch_data(query)
 
-def get_borough_summary(where_clause=""):
-    """Retrieve borough-wise accident summary with severity breakdown."""
+def get_borough_summary(filters=None, approximate=False):
+    """Retrieve borough-wise accident summary with severity breakdown.
+
+    With `approximate=True` every count is estimated from the sample, with `_low` / `_high` bounds.
+    """
+    if approximate:
+        measures = {
+            "total_accidents": "1",
+            "slight_accidents": "CASE WHEN accident_severity = 'Slight' THEN 1 ELSE 0 END",
+            "serious_accidents": "CASE WHEN accident_severity = 'Serious' THEN 1 ELSE 0 END",
+            "fatal_accidents": "CASE WHEN accident_severity = 'Fatal' THEN 1 ELSE 0 END",
+        }
+        units_sql = _sample_units([f"{expression} AS {name}" for name, expression in measures.items()], filters)
+        df = approximate_totals(units_sql, ["borough"], list(measures))
+        return df.sort_values("total_accidents", ascending=False, ignore_index=True) if not df.empty else df
+
+    where_clause = build_where_clause(filters)
     
     query = f"""
         SELECT 
@@ -151,8 +533,9 @@ def get_borough_summary(where_clause=""):
     """
     return fetch_data(query)
 
-def get_accident_locations(where_clause=""):
+def get_accident_locations(filters=None, backend="copy"):
     """Retrieve accident latitude & longitude, automatically limiting large datasets."""
+    where_clause = build_where_clause(filters)
     
     query_count = f"SELECT COUNT(*) AS total FROM accident_summary {where_clause};"
     df_count = fetch_data(query_count)
@@ -163,30 +546,85 @@ def get_accident_locations(where_clause=""):
     # ✅ Adjust limit based on total data size
     limit = 5000 if total_accidents > 10000 else total_accidents  
 
+    # Only points the map can place, so the coordinates have no NULLs to fetch
+    located_where_clause = build_where_clause(
+        filters, extra_conditions=["latitude IS NOT NULL", "longitude IS NOT NULL"]
+    )
     query = f"""
         SELECT latitude, longitude
         FROM accident_summary
-        {where_clause}
+        {located_where_clause}
         ORDER BY accident_date DESC
         LIMIT {limit};
     """
-    df_locations = fetch_data(query)
+    df_locations = fetch_data(query, backend=backend)
 
     return df_locations, total_accidents
 
-def get_weather_accident_trends(where_clause="", by_severity=False):
+def get_accident_density(filters=None, cell_size=0.0005, approximate=False, backend="copy"):
+    """Retrieve accident counts aggregated on a lat/lon grid (~50 m cells by default).
+
+    Returns (lat, lon, weights) as compact NumPy arrays of cell centres and counts. Every
+    accident is included, and the result size is bounded by the number of occupied cells.
+    With `approximate=True` the cells hold the sampling weights of the sampled accidents.
+    The cells are fetched in columnar form with the "copy" backend by default.
+    """
+    where_clause = build_where_clause(
+        filters,
+        year_column="accident_year" if approximate else None,
+        extra_conditions=["latitude IS NOT NULL", "longitude IS NOT NULL"],
+    )
+    query = f"""
+        SELECT 
+            (FLOOR(latitude / {cell_size}) + 0.5) * {cell_size} AS lat,
+            (FLOOR(longitude / {cell_size}) + 0.5) * {cell_size} AS lon,
+            {"SUM(sampling_weight)" if approximate else "COUNT(*)"} AS weight
+        FROM {"accident_summary_sample" if approximate else "accident_summary"}
+        {where_clause}
+        GROUP BY 1, 2;
+    """
+    import numpy as np
+
+    df = fetch_data(query, backend=backend)
+    if df.empty:
+        empty = np.empty(0, dtype=np.float32)
+        return empty, empty, empty
+    return (
+        df["lat"].to_numpy(dtype=np.float32),
+        df["lon"].to_numpy(dtype=np.float32),
+        df["weight"].to_numpy(dtype=np.float32),
+    )
+
+WEATHER_CATEGORY = """
+    CASE 
+        WHEN precipitation > 0 THEN 'Rainy'
+        WHEN snow_depth > 0 THEN 'Snowy'
+        WHEN sunshine_duration > 3 THEN 'Sunny'
+        ELSE 'Cloudy'
+    END
+"""
+
+def get_weather_accident_trends(filters=None, by_severity=False, approximate=False):
     """Retrieve accident trends based on weather conditions. 
-    If `by_severity=True`, the query groups by severity level."""
+    If `by_severity=True`, the query groups by severity level.
+    With `approximate=True` the counts are estimated from the sample, with bounds."""
+
+    if approximate:
+        groups = ["weather_category", "accident_severity"] if by_severity else ["weather_category"]
+        units_sql = _sample_units([f"{WEATHER_CATEGORY} AS weather_category", "1 AS accident_count"], filters)
+        df = approximate_totals(units_sql, groups, ["accident_count"])
+        if df.empty:
+            return df
+        if by_severity:
+            return df.sort_values(groups, ignore_index=True)
+        return df.sort_values("accident_count", ascending=False, ignore_index=True)
+
+    where_clause = build_where_clause(filters)
 
     if by_severity:
         query = f"""
             SELECT 
-                CASE 
-                    WHEN precipitation > 0 THEN 'Rainy'
-                    WHEN snow_depth > 0 THEN 'Snowy'
-                    WHEN sunshine_duration > 3 THEN 'Sunny'
-                    ELSE 'Cloudy'
-                END AS weather_category,
+                {WEATHER_CATEGORY} AS weather_category,
                 accident_severity,
                 COUNT(accident_id) AS accident_count
             FROM accident_summary
@@ -197,12 +635,7 @@ def get_weather_accident_trends(where_clause="", by_severity=False):
     else:
         query = f"""
             SELECT 
-                CASE 
-                    WHEN precipitation > 0 THEN 'Rainy'
-                    WHEN snow_depth > 0 THEN 'Snowy'
-                    WHEN sunshine_duration > 3 THEN 'Sunny'
-                    ELSE 'Cloudy'
-                END AS weather_category,
+                {WEATHER_CATEGORY} AS weather_category,
                 COUNT(accident_id) AS accident_count
             FROM accident_summary
             {where_clause}
@@ -212,91 +645,240 @@ def get_weather_accident_trends(where_clause="", by_severity=False):
 
     return fetch_data(query)
 
-def get_weekday_vs_weekend_trends(where_clause=""):
+WEEKDAY_NAMES = ["Sunday", "Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"]
+
+def get_weekday_vs_weekend_trends(filters=None):
     """Fetch and compare weekday vs. weekend accident counts."""
+    df = get_time_series("day_of_week", filters)
+    if df.empty:
+        return df
+    df["day_type"] = df["period"].map(lambda day: "Weekend" if day in (0, 6) else "Weekday")
+    return (
+        df.groupby("day_type", as_index=False)["accident_count"].sum()
+        .sort_values("accident_count", ascending=False, ignore_index=True)
+    )
 
+def get_high_risk_days(filters=None):
+    """Fetch and rank accident occurrences by weekday."""
+    df = get_time_series("day_of_week", filters)
+    if df.empty:
+        return df
+    df.insert(0, "weekday", df.pop("period").map(lambda day: WEEKDAY_NAMES[int(day)]))
+    return df.sort_values("accident_count", ascending=False, ignore_index=True)
+
+AGE_GROUP = """
+    CASE 
+        WHEN age BETWEEN 0 AND 10 THEN '0-10'
+        WHEN age BETWEEN 11 AND 20 THEN '11-20'
+        WHEN age BETWEEN 21 AND 30 THEN '21-30'
+        WHEN age BETWEEN 31 AND 40 THEN '31-40'
+        WHEN age BETWEEN 41 AND 50 THEN '41-50'
+        WHEN age BETWEEN 51 AND 60 THEN '51-60'
+        WHEN age BETWEEN 61 AND 70 THEN '61-70'
+        WHEN age > 70 THEN '70+'
+        ELSE 'Unknown'
+    END
+"""
+
+def _casualties_by_age_group(filters, count_column, extra_conditions=()):
+    """Casualties per age group from `casualty_age_summary`, or from the casualties of the
+    matching accidents when filtering by vehicle type, which that aggregate does not keep."""
+    if filters and filters.get("vehicle_type"):
+        query = f"""
+            SELECT {AGE_GROUP} AS age_group, COUNT(*) AS {count_column}
+            FROM (
+                SELECT accident_id, CASE WHEN age ~ '^[0-9]+$' THEN CAST(age AS INTEGER) END AS age
+                FROM casualties
+            ) c
+            JOIN accident_summary ON accident_summary.accident_id = c.accident_id
+            {build_where_clause(filters, extra_conditions=extra_conditions)}
+            GROUP BY age_group
+            ORDER BY age_group;
+        """
+        return fetch_data(query)
+
+    where_clause = build_where_clause(filters, year_column="accident_year", extra_conditions=extra_conditions)
     query = f"""
-        SELECT 
-            CASE 
-                WHEN EXTRACT(DOW FROM accident_date) IN (0, 6) THEN 'Weekend'
-                ELSE 'Weekday'
-            END AS day_type,
-            COUNT(*) AS accident_count
-        FROM accident_summary
+        SELECT age_group, SUM(casualty_count) AS {count_column}
+        FROM casualty_age_summary
         {where_clause}
-        GROUP BY day_type
-        ORDER BY accident_count DESC;
+        GROUP BY age_group
+        ORDER BY age_group;
     """
-
     return fetch_data(query)
 
-def get_high_risk_days(where_clause=""):
-    """Fetch and rank accident occurrences by weekday."""
-    
-    query = f"""
-        SELECT 
-            CASE EXTRACT(DOW FROM accident_date)
-                WHEN 0 THEN 'Sunday'
-                WHEN 1 THEN 'Monday'
-                WHEN 2 THEN 'Tuesday'
-                WHEN 3 THEN 'Wednesday'
-                WHEN 4 THEN 'Thursday'
-                WHEN 5 THEN 'Friday'
-                WHEN 6 THEN 'Saturday'
-            END AS weekday,
-            COUNT(*) AS accident_count
+def get_accidents_by_age_group(filters=None):
+    """Fetch casualty count per age group for the active filters, from the `casualty_age_summary` aggregate."""
+    return _casualties_by_age_group(filters, "accident_count")
+
+def get_fatalities_by_age(filters=None):
+    """Retrieve casualty counts of fatal accidents grouped by age group, for the active filters."""
+    return _casualties_by_age_group(filters, "fatality_count", extra_conditions=["accident_severity = 'Fatal'"])
+
+# ✅ Streaming export of the filtered accidents, in constant memory
+EXPORT_COLUMNS = [
+    "accident_id", "accident_date", "location", "latitude", "longitude", "borough", "accident_severity",
+    "vehicle_count", "casualty_count", "temperature", "humidity", "wind_speed", "precipitation",
+    "sunshine_duration", "snow_depth",
+]
+EXPORT_CHUNK_BYTES = 1024 * 1024
+EXPORT_BATCH_ROWS = 50000
+
+def export_query(filters=None):
+    """SELECT of the accidents matching the dashboard filters, in a stable order."""
+    return f"""
+        SELECT {", ".join(EXPORT_COLUMNS)}
         FROM accident_summary
-        {where_clause}
-        GROUP BY weekday
-        ORDER BY accident_count DESC;
+        {build_where_clause(filters)}
+        ORDER BY accident_date, accident_id
     """
-    
-    return fetch_data(query)
 
-def get_accidents_by_age_group(where_clause=""):
-    """Fetch accident count per age group from casualties table."""
+class _QueueWriter:
+    """File-like target of COPY that hands bounded chunks to the consuming generator."""
 
-    query = """
-    SELECT 
-        CASE 
-                WHEN CAST(age AS INTEGER) BETWEEN 0 AND 10 THEN '0-10'
-                WHEN CAST(age AS INTEGER) BETWEEN 11 AND 20 THEN '11-20'
-                WHEN CAST(age AS INTEGER) BETWEEN 21 AND 30 THEN '21-30'
-                WHEN CAST(age AS INTEGER) BETWEEN 31 AND 40 THEN '31-40'
-                WHEN CAST(age AS INTEGER) BETWEEN 41 AND 50 THEN '41-50'
-                WHEN CAST(age AS INTEGER) BETWEEN 51 AND 60 THEN '51-60'
-                WHEN CAST(age AS INTEGER) BETWEEN 61 AND 70 THEN '61-70'
-                WHEN CAST(age AS INTEGER) > 70 THEN '70+'
-                ELSE 'Unknown'
-            END AS age_group,
-            COUNT(*) AS accident_count
-        FROM casualties
-        GROUP BY age_group
-        ORDER BY age_group;
+    def __init__(self, chunks, chunk_bytes, cancelled):
+        self.chunks = chunks
+        self.chunk_bytes = chunk_bytes
+        self.cancelled = cancelled
+        self.buffer = bytearray()
+
+    def write(self, data):
+        self.buffer += data.encode() if isinstance(data, str) else data
+        if len(self.buffer) >= self.chunk_bytes:
+            self.flush()
+
+    def put(self, item):
+        """Queue an item, blocking while the consumer is behind; raise once it went away."""
+        while True:
+            if self.cancelled.is_set():
+                raise RuntimeError("Export cancelled by the consumer.")
+            try:
+                self.chunks.put(item, timeout=1)
+                return
+            except queue.Full:
+                continue
+
+    def flush(self):
+        if self.buffer:
+            self.put(bytes(self.buffer))
+            self.buffer.clear()
+
+def stream_csv(filters=None, chunk_bytes=EXPORT_CHUNK_BYTES):
+    """Yield the filtered accidents as CSV (with header) byte chunks, using `COPY ... TO STDOUT`.
+
+    COPY runs in a helper thread writing into a small bounded queue, so memory stays at a
+    few chunks whatever the export size. Closing the generator early aborts the COPY.
     """
-    
-    return fetch_data(query)
+    chunks = queue.Queue(maxsize=4)
+    cancelled = threading.Event()
+    writer = _QueueWriter(chunks, chunk_bytes, cancelled)
+    done = object()
+    errors = []
 
-def get_fatalities_by_age(where_clause):
-    """Retrieve fatality counts grouped by age group."""
-    query = """
-        SELECT 
-            CASE 
-                WHEN CAST(c.age AS INTEGER) BETWEEN 0 AND 10 THEN '0-10'
-                WHEN CAST(c.age AS INTEGER) BETWEEN 11 AND 20 THEN '11-20'
-                WHEN CAST(c.age AS INTEGER) BETWEEN 21 AND 30 THEN '21-30'
-                WHEN CAST(c.age AS INTEGER) BETWEEN 31 AND 40 THEN '31-40'
-                WHEN CAST(c.age AS INTEGER) BETWEEN 41 AND 50 THEN '41-50'
-                WHEN CAST(c.age AS INTEGER) BETWEEN 51 AND 60 THEN '51-60'
-                WHEN CAST(c.age AS INTEGER) BETWEEN 61 AND 70 THEN '61-70'
-                WHEN CAST(c.age AS INTEGER) > 70 THEN '70+'
-                ELSE 'Unknown'
-            END AS age_group,
-            COUNT(*) AS fatality_count
-        FROM casualties c
-        JOIN accidents a ON c.accident_id = a.accident_id
-        WHERE a.accident_severity = 'Fatal'
-        GROUP BY age_group
-        ORDER BY age_group;
+    def copy():
+        try:
+            with pooled_connection() as conn:
+                conn.cursor().copy_expert(f"COPY ({export_query(filters)}) TO STDOUT WITH CSV HEADER", writer)
+                writer.flush()
+        except Exception as e:
+            errors.append(e)
+        finally:
+            try:
+                writer.put(done)
+            except RuntimeError:
+                pass  # Nobody is waiting any more
+
+    thread = threading.Thread(target=copy, daemon=True)
+    thread.start()
+    try:
+        while True:
+            chunk = chunks.get()
+            if chunk is done:
+                break
+            yield chunk
+    finally:
+        cancelled.set()
+        thread.join()
+    if errors:
+        raise errors[0]
+
+class _ChunkSink:
+    """Writable file collecting the Parquet bytes written since the last `take()`."""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.buffer += data
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self):
+        return True
+
+    def take(self):
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        return data
+
+def _arrow_column(values, type_code):
+    """Arrow array of one fetched PostgreSQL column, typed by its type OID."""
+    import pyarrow as pa
+
+    arrow_type = {
+        16: pa.bool_(),
+        20: pa.int64(), 21: pa.int64(), 23: pa.int64(),
+        700: pa.float64(), 701: pa.float64(), 1700: pa.float64(),
+        1082: pa.date32(),
+        1114: pa.timestamp("us"),
+    }.get(type_code)
+    if arrow_type is None:  # Text, and anything else, exported as its text form
+        return pa.array([None if value is None else str(value) for value in values], type=pa.string())
+    if type_code == 1700:  # NUMERIC arrives as Decimal
+        values = [None if value is None else float(value) for value in values]
+    return pa.array(values, type=arrow_type)
+
+def stream_parquet(filters=None, batch_rows=EXPORT_BATCH_ROWS):
+    """Yield the filtered accidents as Parquet byte chunks, one row group per batch.
+
+    Rows come from a server-side cursor `batch_rows` at a time, so memory is bounded by
+    one batch whatever the export size.
     """
-    return fetch_data(query)
\ No newline at end of file
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    with pooled_connection() as conn:
+        cur = conn.cursor(name="accident_export")  # Server-side cursor
+        cur.itersize = batch_rows
+        cur.execute(export_query(filters))
+
+        sink = _ChunkSink()
+        writer = None
+        while True:
+            rows = cur.fetchmany(batch_rows)
+            names = [column.name for column in cur.description]
+            type_codes = [column.type_code for column in cur.description]
+            columns = list(zip(*rows)) if rows else [[] for _ in names]
+            batch = pa.RecordBatch.from_arrays(
+                [_arrow_column(values, type_code) for values, type_code in zip(columns, type_codes)], names=names
+            )
+            if writer is None:
+                writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), batch.schema, compression="snappy")
+            if not rows:
+                break
+            writer.write_batch(batch)
+            yield sink.take()
+        writer.close()
+        yield sink.take()
+        cur.close()
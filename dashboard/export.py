@@ -0,0 +1,43 @@
+"""Export the accidents matching the dashboard filters to CSV or Parquet, in constant memory.
+
+Rows are streamed from PostgreSQL (`COPY ... TO STDOUT` for CSV, a server-side cursor for
+Parquet) straight into the output file. Examples:
+
+    python export.py --year 2015 --borough Camden -o camden_2015.csv
+    python export.py --format parquet -o all_accidents.parquet
+"""
+import argparse
+import sys
+import time
+
+from data_loader import stream_csv, stream_parquet
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export filtered accidents to CSV or Parquet")
+    parser.add_argument("--year", type=int)
+    parser.add_argument("--borough")
+    parser.add_argument("--severity")
+    parser.add_argument("--vehicle-type", help="Only accidents involving this vehicle type, e.g. PedalCycle")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("-o", "--output", help="Output file (default: standard output)")
+    args = parser.parse_args()
+
+    filters = {"year": args.year, "borough": args.borough, "severity": args.severity, "vehicle_type": args.vehicle_type}
+    stream = stream_csv(filters) if args.format == "csv" else stream_parquet(filters)
+
+    started = time.perf_counter()
+    written = 0
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for chunk in stream:
+            out.write(chunk)
+            written += len(chunk)
+    finally:
+        if args.output:
+            out.close()
+    print(f"✅ Exported {written / 1024 / 1024:,.1f} MB in {time.perf_counter() - started:.1f}s.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
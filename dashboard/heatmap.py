@@ -0,0 +1,67 @@
+import base64
+from io import BytesIO
+
+import numpy as np
+
+# Area rendered by the heatmap: Greater London with a small margin
+LONDON_BOUNDS = ((51.28, -0.52), (51.70, 0.34))  # (south, west), (north, east)
+
+
+def _gaussian_kernel(sigma):
+    radius = max(1, int(3 * sigma))
+    x = np.arange(-radius, radius + 1, dtype=np.float32)
+    kernel = np.exp(-(x ** 2) / (2 * sigma ** 2))
+    return kernel / kernel.sum()
+
+
+def _blur(grid, sigma):
+    """Separable gaussian blur of a 2D grid."""
+    kernel = _gaussian_kernel(sigma)
+    grid = np.apply_along_axis(np.convolve, 0, grid, kernel, mode="same")
+    return np.apply_along_axis(np.convolve, 1, grid, kernel, mode="same")
+
+
+def render_density_png(lat, lon, weights=None, bounds=LONDON_BOUNDS, width=900, sigma=2.0, min_opacity=0.2):
+    """Rasterize (optionally weighted) points into a transparent heatmap PNG.
+
+    The image size depends only on `width`, not on the number of points, so the
+    payload sent to the browser stays constant for any date range.
+    """
+    (south, west), (north, east) = bounds
+    height = int(width * (north - south) / ((east - west) * np.cos(np.radians((north + south) / 2))))
+
+    grid, _, _ = np.histogram2d(
+        lat, lon,
+        bins=(height, width),
+        range=((south, north), (west, east)),
+        weights=weights,
+    )
+    grid = _blur(grid.astype(np.float32), sigma)[::-1]  # Row 0 is the northern edge of the image
+
+    # Log scaling keeps isolated accidents visible next to dense junctions
+    intensity = np.log1p(grid)
+    peak = intensity.max()
+    if peak > 0:
+        intensity /= peak
+
+    from matplotlib import colormaps
+    rgba = colormaps["YlOrRd"](intensity)
+    rgba[..., 3] = np.where(intensity > 0.01, np.clip(intensity, min_opacity, 1.0), 0.0)
+
+    from matplotlib import pyplot as plt
+    buffer = BytesIO()
+    plt.imsave(buffer, rgba, format="png")
+    return buffer.getvalue()
+
+
+def density_overlay(lat, lon, weights=None, bounds=LONDON_BOUNDS, **render_kwargs):
+    """Build a folium image overlay of the heatmap, embedded as a compact PNG data URL."""
+    from folium.raster_layers import ImageOverlay
+
+    png = render_density_png(lat, lon, weights, bounds=bounds, **render_kwargs)
+    return ImageOverlay(
+        image="data:image/png;base64," + base64.b64encode(png).decode(),
+        bounds=[list(bounds[0]), list(bounds[1])],
+        opacity=0.85,
+        interactive=False,
+    )
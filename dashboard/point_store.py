@@ -0,0 +1,136 @@
+import json
+import mmap
+import os
+import threading
+
+import numpy as np
+
+# Written by the pipeline after each dbt run (airflow/dags/dlt/point_store_export.py)
+POINT_STORE_PATH = os.getenv("POINT_STORE_PATH", "/usr/app/point_store/accident_points.bin")
+MAGIC = b"TFLPTS01"
+
+
+class PointStore:
+    """Read-only view of the accident point store, filtered without database queries.
+
+    Rows are sorted by year, borough and day, with a year x borough index of row ranges.
+    Every column is a NumPy array over one read-only mmap of the file, so the Streamlit
+    processes of a host share the same pages through the OS page cache.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"`{path}` is not a point store (version {MAGIC.decode()})")
+            header_size = int.from_bytes(f.read(4), "little")
+            self.header = json.loads(f.read(header_size))
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        alignment = self.header["alignment"]
+        data_start = -(-(len(MAGIC) + 4 + header_size) // alignment) * alignment
+        rows = self.header["rows"]
+        self.columns = {
+            column["name"]: (
+                np.frombuffer(self._mmap, dtype=column["dtype"], count=rows, offset=data_start + column["offset"])
+                if rows else np.empty(0, dtype=column["dtype"])
+            )
+            for column in self.header["columns"]
+        }
+        self.borough_codes = {name: code for code, name in enumerate(self.header["boroughs"])}
+        self.severity_codes = {name: code for code, name in enumerate(self.header["severities"])}
+        self.vehicle_bits = {name: 1 << bit for bit, name in enumerate(self.header["vehicle_types"])}
+
+    def __len__(self):
+        return self.header["rows"]
+
+    def ranges(self, year=None, borough=None):
+        """Row ranges [start, stop) of a year and/or borough, merged where contiguous."""
+        borough_code = None
+        if borough is not None:
+            borough_code = self.borough_codes.get(borough)
+            if borough_code is None:
+                return []
+
+        ranges = []
+        for entry_year, entry_borough, start, stop in self.header["index"]:
+            if (year is None or entry_year == int(year)) and (borough_code is None or entry_borough == borough_code):
+                if ranges and ranges[-1][1] == start:
+                    ranges[-1] = (ranges[-1][0], stop)
+                else:
+                    ranges.append((start, stop))
+        return ranges
+
+    def covers(self, filters=None):
+        """Whether the store can answer the filters: its vehicle flags only cover the most common types."""
+        vehicle_type = (filters or {}).get("vehicle_type")
+        return vehicle_type is None or vehicle_type in self.vehicle_bits
+
+    def select(self, filters=None, columns=("lat", "lon")):
+        """Return {column: array} of the points matching the dashboard filters.
+
+        The index picks the year/borough row ranges; severity and vehicle type are vectorized
+        masks over them. A single range without a mask is returned as zero-copy views.
+        """
+        filters = filters or {}
+        ranges = self.ranges(filters.get("year"), filters.get("borough"))
+
+        severity_code = vehicle_bit = None
+        if filters.get("severity") is not None:
+            severity_code = self.severity_codes.get(filters["severity"])
+            if severity_code is None:
+                ranges = []
+        if filters.get("vehicle_type") is not None:
+            vehicle_bit = self.vehicle_bits.get(filters["vehicle_type"])
+            if vehicle_bit is None:
+                ranges = []
+
+        masks = []
+        for start, stop in ranges:
+            mask = None
+            if severity_code is not None:
+                mask = self.columns["severity"][start:stop] == severity_code
+            if vehicle_bit is not None:
+                involved = (self.columns["vehicles"][start:stop] & vehicle_bit) != 0
+                mask = involved if mask is None else mask & involved
+            masks.append(mask)
+
+        result = {}
+        for name in columns:
+            values = self.columns[name]
+            parts = [
+                values[start:stop] if mask is None else values[start:stop][mask]
+                for (start, stop), mask in zip(ranges, masks)
+            ]
+            if len(parts) == 1:
+                result[name] = parts[0]
+            else:
+                result[name] = np.concatenate(parts) if parts else np.empty(0, dtype=values.dtype)
+        return result
+
+    def points(self, filters=None):
+        """Return the (lat, lon) float32 arrays of the matching accidents."""
+        selected = self.select(filters)
+        return selected["lat"], selected["lon"]
+
+
+_store = None  # (file identity, PointStore)
+_store_lock = threading.Lock()
+
+
+def get_point_store(path=POINT_STORE_PATH):
+    """Return this process's PointStore of `path`, or None when none was exported yet.
+
+    The pipeline replaces the file atomically, so a new inode or mtime means a new export:
+    it is mapped on the next call, and readers of the previous one keep their old mapping.
+    """
+    global _store
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+
+    identity = (path, stat.st_ino, stat.st_mtime_ns)
+    with _store_lock:
+        if _store is None or _store[0] != identity:
+            _store = (identity, PointStore(path))
+        return _store[1]
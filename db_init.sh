@@ -12,3 +12,6 @@ psql -v ON_ERROR_STOP=1 --username "$DB_USER" <<-EOSQL
     CREATE USER airflow WITH PASSWORD '$AIRFLOW_POSTGRES_PASSWORD';
     GRANT ALL PRIVILEGES ON DATABASE $DB_NAME TO airflow;
 EOSQL
+
+# Let the optional read replica (docker-compose --profile replica) stream WAL from this server
+echo "host replication $DB_USER all scram-sha-256" >> "$PGDATA/pg_hba.conf"
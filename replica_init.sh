@@ -0,0 +1,23 @@
+#!/bin/bash
+set -e
+
+# Stand-in read replica of postgres_db_tfl_accident_data (docker-compose --profile replica).
+# On first start it clones the primary with pg_basebackup, then streams its WAL as a hot standby.
+if [ ! -s "$PGDATA/PG_VERSION" ]; then
+    until pg_isready -h "$PRIMARY_HOST" -U "$DB_USER"; do
+        echo "Waiting for the primary at $PRIMARY_HOST..."
+        sleep 2
+    done
+    mkdir -p "$PGDATA"
+    chown postgres:postgres "$PGDATA"
+    chmod 700 "$PGDATA"
+    # -R writes standby.signal and primary_conninfo, so the server starts as a standby
+    gosu postgres env PGPASSWORD="$DB_PASSWORD" \
+        pg_basebackup -h "$PRIMARY_HOST" -U "$DB_USER" -D "$PGDATA" -R -X stream -P
+fi
+
+# Let dashboard queries finish before replaying the pipeline's table drops
+exec docker-entrypoint.sh postgres \
+    -c hot_standby=on \
+    -c hot_standby_feedback=on \
+    -c max_standby_streaming_delay=300s